@@ -0,0 +1,309 @@
+from types import GeneratorType
+
+from tokens import TokenType
+
+# Árvore sintática abstrata (AST) do C.R.I.A. O SintaticoCria monta a árvore
+# numa passada só; a análise semântica e a geração de código são visitantes
+# que percorrem a mesma árvore, sem analisar os tokens de novo. Os nodos usam
+# __slots__ e guardam variáveis pelo ID do identificador (ver
+# tokens.Identificadores), então a árvore ocupa pouca memória.
+
+class Nodo:
+    __slots__ = ()
+    metodo = None  # Nome do método do visitante que trata o nodo
+
+# Programa inteiro: variáveis do BAGULHOS e o bloco principal
+class Programa(Nodo):
+    __slots__ = ('declaracoes', 'bloco', 'identificadores')
+    metodo = 'visitar_programa'
+
+    def __init__(self, declaracoes, bloco, identificadores):
+        self.declaracoes = declaracoes  # Lista de Declaracao, na ordem da fonte
+        self.bloco = bloco
+        self.identificadores = identificadores  # Tabela dos IDs usados nos nodos
+
+# Variável declarada no BAGULHOS
+class Declaracao(Nodo):
+    __slots__ = ('simbolo', 'linha', 'coluna')
+    metodo = 'visitar_declaracao'
+
+    def __init__(self, simbolo, linha, coluna):
+        self.simbolo = simbolo
+        self.linha = linha
+        self.coluna = coluna
+
+# Sequência de comandos
+class Bloco(Nodo):
+    __slots__ = ('comandos',)
+    metodo = 'visitar_bloco'
+
+    def __init__(self, comandos):
+        self.comandos = comandos
+
+# Comandos guardam a linha do seu primeiro token
+class Comando(Nodo):
+    __slots__ = ('linha',)
+
+# alvo <- valor;
+class Atribuicao(Comando):
+    __slots__ = ('alvo', 'valor')
+    metodo = 'visitar_atribuicao'
+
+    def __init__(self, alvo, valor, linha):
+        self.alvo = alvo
+        self.valor = valor
+        self.linha = linha
+
+# SEPA (condicao) entao [NÃOFOI senao] FIMSEPA
+class Se(Comando):
+    __slots__ = ('condicao', 'entao', 'senao')
+    metodo = 'visitar_se'
+
+    def __init__(self, condicao, entao, senao, linha):
+        self.condicao = condicao
+        self.entao = entao
+        self.senao = senao  # None se não houver NÃOFOI
+        self.linha = linha
+
+# MANDAENQUANTO (condicao) corpo PARAMANDA
+class Enquanto(Comando):
+    __slots__ = ('condicao', 'corpo')
+    metodo = 'visitar_enquanto'
+
+    def __init__(self, condicao, corpo, linha):
+        self.condicao = condicao
+        self.corpo = corpo
+        self.linha = linha
+
+# MANDALEMBRAR (variavel <- inicio; condicao; alvo_incremento <- incremento) corpo DESENCANA
+class Para(Comando):
+    __slots__ = ('variavel', 'inicio', 'condicao', 'alvo_incremento', 'incremento', 'corpo')
+    metodo = 'visitar_para'
+
+    def __init__(self, variavel, inicio, condicao, alvo_incremento, incremento, corpo, linha):
+        self.variavel = variavel
+        self.inicio = inicio
+        self.condicao = condicao
+        self.alvo_incremento = alvo_incremento
+        self.incremento = incremento
+        self.corpo = corpo
+        self.linha = linha
+
+# for variavel in range(inicio, fim, passo): um MANDALEMBRAR já traduzido
+# pelo lacos.py (passo é um int diferente de 0); não vem da fonte
+class ParaIntervalo(Comando):
+    __slots__ = ('variavel', 'inicio', 'fim', 'passo', 'corpo')
+    metodo = 'visitar_para_intervalo'
+
+    def __init__(self, variavel, inicio, fim, passo, corpo, linha):
+        self.variavel = variavel
+        self.inicio = inicio
+        self.fim = fim
+        self.passo = passo
+        self.corpo = corpo
+        self.linha = linha
+
+# ParaIntervalo cujo corpo só faz reduções "alvo <- alvo + expressao" (ou
+# -, *), gerado com NumPy pelo vetorizador.py; não vem da fonte. reducoes são
+# tuplas (alvo, operador, expressao). Se limite não é None, o laço vetorizado
+# só roda quando as expressões guardadas estão entre -limite e limite; senão
+# roda o escalar (o ParaIntervalo original).
+class ParaVetorizado(Comando):
+    __slots__ = ('variavel', 'inicio', 'fim', 'passo', 'reducoes', 'limite', 'guardadas', 'escalar')
+    metodo = 'visitar_para_vetorizado'
+
+    def __init__(self, variavel, inicio, fim, passo, reducoes, limite, guardadas, escalar, linha):
+        self.variavel = variavel
+        self.inicio = inicio
+        self.fim = fim
+        self.passo = passo
+        self.reducoes = reducoes
+        self.limite = limite
+        self.guardadas = guardadas  # Expressões conferidas antes do laço
+        self.escalar = escalar
+        self.linha = linha
+
+# OLHA (variavel);
+class Ler(Comando):
+    __slots__ = ('variavel',)
+    metodo = 'visitar_ler'
+
+    def __init__(self, variavel, linha):
+        self.variavel = variavel
+        self.linha = linha
+
+# FALA (valor); com valor sendo um Texto ou uma expressão
+class Escrever(Comando):
+    __slots__ = ('valor',)
+    metodo = 'visitar_escrever'
+
+    def __init__(self, valor, linha):
+        self.valor = valor
+        self.linha = linha
+
+# Literal numérico, guardado como escrito na fonte
+class Numero(Nodo):
+    __slots__ = ('lexema',)
+    metodo = 'visitar_numero'
+
+    def __init__(self, lexema):
+        self.lexema = lexema
+
+# Valor (int, float ou bool) calculado pelo otimizador no lugar de uma
+# expressão constante; não vem da fonte
+class Constante(Nodo):
+    __slots__ = ('valor',)
+    metodo = 'visitar_constante'
+
+    def __init__(self, valor):
+        self.valor = valor
+
+# Valor Python de um literal numérico (ValueError se o Python não o entende)
+def valor_numero(lexema):
+    try:
+        return int(lexema)
+    except ValueError:
+        return float(lexema)
+
+# Literal de string (só aparece no FALA), sem as aspas
+class Texto(Nodo):
+    __slots__ = ('lexema',)
+    metodo = 'visitar_texto'
+
+    def __init__(self, lexema):
+        self.lexema = lexema
+
+# Uso de variável, com a posição do identificador para as mensagens de erro
+class Variavel(Nodo):
+    __slots__ = ('simbolo', 'linha', 'coluna')
+    metodo = 'visitar_variavel'
+
+    def __init__(self, simbolo, linha, coluna):
+        self.simbolo = simbolo
+        self.linha = linha
+        self.coluna = coluna
+
+# Operação binária, aritmética ou relacional; operador é o TokenType do símbolo
+class Binaria(Nodo):
+    __slots__ = ('operador', 'esquerda', 'direita')
+    metodo = 'visitar_binaria'
+
+    def __init__(self, operador, esquerda, direita):
+        self.operador = operador
+        self.esquerda = esquerda
+        self.direita = direita
+
+# Expressão entre parênteses, mantida para o código gerado seguir a fonte
+class Parenteses(Nodo):
+    __slots__ = ('expressao',)
+    metodo = 'visitar_parenteses'
+
+    def __init__(self, expressao):
+        self.expressao = expressao
+
+OPERADORES_ARITMETICOS = frozenset({TokenType.T_MAIS, TokenType.T_MENOS, TokenType.T_VEZES,
+                                    TokenType.T_DIVIDIDO, TokenType.T_RESTO, TokenType.T_ELEVADO})
+OPERADORES_RELACIONAIS = frozenset({TokenType.T_MAIOR, TokenType.T_MENOR, TokenType.T_MAIOR_IGUAL,
+                                    TokenType.T_MENOR_IGUAL, TokenType.T_IGUAL, TokenType.T_DIFERENTE})
+
+# Visitante da árvore: visitar(nodo) chama o método visitar_<tipo> do nodo.
+# Um método que precisa visitar filhos é um gerador: cada "yield filho"
+# visita o filho e devolve o valor que o método dele retornou. Os geradores
+# ficam numa pilha explícita, então nem expressões com milhares de operadores
+# nem blocos muito aninhados dependem do limite de recursão do Python. Por
+# padrão cada método só visita os filhos, em ordem de fonte, e uma subclasse
+# só precisa tratar os nodos que lhe interessam.
+class Visitante:
+    def visitar(self, nodo):
+        pendentes = []  # Geradores esperando o resultado de um filho
+        resultado = getattr(self, nodo.metodo)(nodo)
+        while True:
+            if isinstance(resultado, GeneratorType):
+                pendentes.append(resultado)
+                resultado = None
+            while True:
+                if not pendentes:
+                    return resultado
+                try:
+                    filho = pendentes[-1].send(resultado)
+                    break
+                except StopIteration as fim:
+                    pendentes.pop()
+                    resultado = fim.value
+            resultado = getattr(self, filho.metodo)(filho)
+
+    def visitar_programa(self, nodo):
+        for declaracao in nodo.declaracoes:
+            yield declaracao
+        yield nodo.bloco
+
+    def visitar_declaracao(self, nodo):
+        pass
+
+    def visitar_bloco(self, nodo):
+        for comando in nodo.comandos:
+            yield comando
+
+    def visitar_atribuicao(self, nodo):
+        yield nodo.alvo
+        yield nodo.valor
+
+    def visitar_se(self, nodo):
+        yield nodo.condicao
+        yield nodo.entao
+        if nodo.senao is not None:
+            yield nodo.senao
+
+    def visitar_enquanto(self, nodo):
+        yield nodo.condicao
+        yield nodo.corpo
+
+    def visitar_para(self, nodo):
+        yield nodo.variavel
+        yield nodo.inicio
+        yield nodo.condicao
+        yield nodo.alvo_incremento
+        yield nodo.incremento
+        yield nodo.corpo
+
+    def visitar_para_intervalo(self, nodo):
+        yield nodo.variavel
+        yield nodo.inicio
+        yield nodo.fim
+        yield nodo.corpo
+
+    def visitar_para_vetorizado(self, nodo):
+        yield nodo.variavel
+        for expressao in nodo.guardadas:
+            yield expressao
+        yield nodo.inicio
+        yield nodo.fim
+        for alvo, _, expressao in nodo.reducoes:
+            yield alvo
+            yield expressao
+        yield nodo.escalar
+
+    def visitar_ler(self, nodo):
+        yield nodo.variavel
+
+    def visitar_escrever(self, nodo):
+        yield nodo.valor
+
+    def visitar_numero(self, nodo):
+        pass
+
+    def visitar_texto(self, nodo):
+        pass
+
+    def visitar_constante(self, nodo):
+        pass
+
+    def visitar_variavel(self, nodo):
+        pass
+
+    def visitar_binaria(self, nodo):
+        yield nodo.esquerda
+        yield nodo.direita
+
+    def visitar_parenteses(self, nodo):
+        yield nodo.expressao
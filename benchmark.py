@@ -0,0 +1,589 @@
+import contextlib
+import gc
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from compilador import compilar, executar_codigo
+from lexico import DUAL_SYMBOLS, PALAVRAS_RESERVADAS, SINGLE_SYMBOLS, LexicoCria, Token, TokenType
+from tokens import carregar_lex
+
+# Benchmarks do compilador C.R.I.A
+# Uso: python benchmark.py [nome] [parâmetros...]
+
+
+# Analisador léxico original, caractere a caractere, mantido apenas como
+# referência de desempenho e de resultado para o scanner baseado em regex
+class LexicoCaractere:
+    def __init__(self, fonte):
+        # Inicializa o analisador léxico com o arquivo fonte
+        self.fonte = fonte
+        self.linhas = []
+        # Lê todas as linhas do arquivo fonte
+        with open(fonte, encoding="utf-8") as f:
+            self.linhas = f.readlines()
+        self.linha = 0  # Linha atual no arquivo
+        self.coluna = 0  # Coluna atual na linha
+        self.atual = ''  # Caractere atual sendo processado
+        self.fim = False  # Indicador de fim do arquivo
+        self.tokens = []  # Lista para armazenar os tokens gerados
+        self.erro = None  # Armazena mensagem de erro léxico, se houver
+
+    # Avança para o próximo caractere no arquivo fonte
+    def avancar(self):
+        if self.fim:
+            self.atual = ''
+            return
+        if self.linha >= len(self.linhas):
+            self.atual = ''
+            self.fim = True
+            return
+        if self.coluna >= len(self.linhas[self.linha]):
+            self.linha += 1
+            self.coluna = 0
+            if self.linha >= len(self.linhas):
+                self.atual = ''
+                self.fim = True
+                return
+        if self.linha < len(self.linhas) and self.coluna < len(self.linhas[self.linha]):
+            self.atual = self.linhas[self.linha][self.coluna]
+            self.coluna += 1
+        else:
+            self.atual = ''
+            self.fim = True
+
+    # Retorna o próximo caractere sem avançar a posição
+    def look(self):
+        if self.fim or self.linha >= len(self.linhas):
+            return ''
+        if self.coluna < len(self.linhas[self.linha]):
+            return self.linhas[self.linha][self.coluna]
+        return ''
+
+    # Gera o próximo token a partir do código fonte
+    def proximo_token(self):
+        # Ignora espaços em branco e caracteres vazios
+        while not self.fim and (self.atual.isspace() or self.atual == ''):
+            self.avancar()
+
+        # Se chegou ao fim do arquivo, retorna token de fim de fonte
+        if self.fim:
+            return Token(TokenType.T_FIM_FONTE, '<EOF>', self.linha+1, self.coluna+1)
+
+        inicio_linha = self.linha
+        inicio_coluna = self.coluna
+
+        # --- SUPORTE A STRING LITERAL ---
+        # Processa strings literais delimitadas por aspas
+        if self.atual == '"':
+            lex = ''
+            inicio_linha_str = self.linha
+            inicio_coluna_str = self.coluna
+            self.avancar()
+            while not self.fim and self.atual != '"':
+                lex += self.atual
+                self.avancar()
+            if self.atual == '"':
+                self.avancar()
+                return Token(TokenType.T_STRING, lex, inicio_linha_str+1, inicio_coluna_str)
+            self.erro = f"Erro Léxico: String não fechada (linha {inicio_linha_str+1}, coluna {inicio_coluna_str})"
+            return Token(TokenType.T_ERRO_LEX, lex, inicio_linha_str+1, inicio_coluna_str)
+
+        # Identificador ou palavra reservada
+        if (self.atual.isalpha() or self.atual in 'ÉÁÍÓÚÃÇÕÊÂÔÀÑ'):
+            lex = self.atual
+            self.avancar()
+            # Continua coletando caracteres válidos para identificadores
+            while not self.fim and (self.atual.isalnum() or self.atual == '_' or self.atual in 'ÇÃÕÉÍÓÚÊÂÔÀÑ'):
+                lex += self.atual
+                self.avancar()
+            # Verifica se é uma palavra reservada ou um identificador
+            tipo_token = PALAVRAS_RESERVADAS.get(lex.upper(), TokenType.T_ID)
+            return Token(tipo_token, lex, inicio_linha+1, inicio_coluna)
+
+        # Número (inteiro ou decimal)
+        if self.atual.isdigit():
+            lex = self.atual
+            self.avancar()
+            # Coleta dígitos para números inteiros
+            while not self.fim and self.atual.isdigit():
+                lex += self.atual
+                self.avancar()
+            # Verifica se há parte decimal
+            if not self.fim and self.atual == '.':
+                lex += self.atual
+                self.avancar()
+                while not self.fim and self.atual.isdigit():
+                    lex += self.atual
+                    self.avancar()
+            return Token(TokenType.T_NUMERO, lex, inicio_linha+1, inicio_coluna)
+
+        # Símbolos de dois caracteres
+        lookahead = self.look()
+        if self.atual + lookahead in DUAL_SYMBOLS:
+            lex = self.atual + lookahead
+            tipo_token = DUAL_SYMBOLS[lex]
+            self.avancar()
+            self.avancar()
+            return Token(tipo_token, lex, inicio_linha+1, inicio_coluna)
+
+        # Símbolos de um caractere
+        if self.atual in SINGLE_SYMBOLS:
+            tipo_token = SINGLE_SYMBOLS[self.atual]
+            lex = self.atual
+            self.avancar()
+            return Token(tipo_token, lex, inicio_linha+1, inicio_coluna)
+
+        # Operadores relacionais unitários e símbolos compostos
+        if self.atual == '>':
+            self.avancar()
+            if self.atual == '=':
+                self.avancar()
+                return Token(TokenType.T_MAIOR_IGUAL, '>=', inicio_linha+1, inicio_coluna)
+            return Token(TokenType.T_MAIOR, '>', inicio_linha+1, inicio_coluna)
+        if self.atual == '<':
+            self.avancar()
+            if self.atual == '-':
+                self.avancar()
+                return Token(TokenType.T_SETA, '<-', inicio_linha+1, inicio_coluna)
+            elif self.atual == '=':
+                self.avancar()
+                return Token(TokenType.T_MENOR_IGUAL, '<=', inicio_linha+1, inicio_coluna)
+            elif self.atual == '>':
+                self.avancar()
+                return Token(TokenType.T_DIFERENTE, '<>', inicio_linha+1, inicio_coluna)
+            return Token(TokenType.T_MENOR, '<', inicio_linha+1, inicio_coluna)
+        if self.atual == '=':
+            self.avancar()
+            if self.atual == '=':
+                self.avancar()
+                return Token(TokenType.T_IGUAL, '==', inicio_linha+1, inicio_coluna)
+            return Token(TokenType.T_IGUAL, '=', inicio_linha+1, inicio_coluna)
+
+        # Potência **
+        if self.atual == '*':
+            self.avancar()
+            if self.atual == '*':
+                self.avancar()
+                return Token(TokenType.T_ELEVADO, '**', inicio_linha+1, inicio_coluna)
+            return Token(TokenType.T_VEZES, '*', inicio_linha+1, inicio_coluna)
+
+        # Caso nenhum padrão seja reconhecido, retorna erro léxico
+        erro_lexema = self.atual
+        self.avancar()
+        self.erro = f"Erro Léxico na linha {inicio_linha+1}, coluna {inicio_coluna}: símbolo inválido: {erro_lexema}"
+        return Token(TokenType.T_ERRO_LEX, erro_lexema, inicio_linha+1, inicio_coluna)
+
+
+    # Gera todos os tokens até o fim do arquivo ou ao primeiro erro léxico
+    def tokenizar(self):
+        self.avancar()
+        while True:
+            token = self.proximo_token()
+            yield token
+            if token.tipo == TokenType.T_FIM_FONTE or token.tipo == TokenType.T_ERRO_LEX:
+                break
+
+# Token como era antes do módulo tokens: objeto comum, com __dict__
+class TokenComDict:
+    def __init__(self, tipo, lexema, linha, coluna):
+        self.tipo = tipo
+        self.lexema = lexema
+        self.linha = linha
+        self.coluna = coluna
+
+# Bloco de código .cria usado para montar fontes grandes
+BLOCO_CRIA = '''SEPA (x{n} > y)
+    FALA("Linha {n} de um literal de string razoavelmente longo para o benchmark");
+NÃOFOI
+    resultado <- (resultado + x{n}) * 2 ** 3 - y / 4 % 7;
+FIMSEPA
+MANDALEMBRAR (i <- 1; i <= {n}; i <- i + 1)
+    resultado <- resultado + i * 3.25;
+DESENCANA
+MANDAENQUANTO (x{n} <> 100)
+    x{n} <- x{n} + 10;
+PARAMANDA
+'''
+
+# Gera um programa .cria com aproximadamente o tamanho pedido (em bytes)
+def gerar_fonte(tamanho):
+    partes = ["ÉNOIS\nBAGULHOS x, y, resultado, i;\n"]
+    total = 0
+    n = 0
+    while total < tamanho:
+        bloco = BLOCO_CRIA.format(n=n)
+        partes.append(bloco)
+        total += len(bloco.encode('utf-8'))
+        n += 1
+    partes.append("PARTIU\n")
+    return ''.join(partes)
+
+# Converte um token em tupla comparável
+def como_tupla(token):
+    return (token.tipo.name, token.lexema, token.linha, token.coluna)
+
+# Mede o scanner por regex contra o analisador caractere a caractere
+def bench_lexico(megabytes='4'):
+    tamanho = int(float(megabytes) * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'bench.cria')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(gerar_fonte(tamanho))
+        tamanho_mb = os.path.getsize(caminho) / (1024 * 1024)
+
+        gc.disable()
+        inicio = time.perf_counter()
+        legado = list(LexicoCaractere(caminho).tokenizar())
+        tempo_legado = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        novo = list(LexicoCria(caminho).iter_tokens())
+        tempo_novo = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        por_offset = list(LexicoCria(caminho, offsets=True).iter_tokens())
+        tempo_offsets = time.perf_counter() - inicio
+        gc.enable()
+
+    print(f"Fonte: {tamanho_mb:.2f} MB, {len(novo)} tokens")
+    print(f"Caractere a caractere: {tempo_legado:.3f} s ({tamanho_mb / tempo_legado:.2f} MB/s)")
+    print(f"Regex mestre:          {tempo_novo:.3f} s ({tamanho_mb / tempo_novo:.2f} MB/s)")
+    print(f"Regex com offsets:     {tempo_offsets:.3f} s ({tamanho_mb / tempo_offsets:.2f} MB/s)")
+    print(f"Ganho: {tempo_legado / tempo_novo:.1f}x (offsets: {tempo_legado / tempo_offsets:.1f}x)")
+    esperado = list(map(como_tupla, legado))
+    if esperado != list(map(como_tupla, novo)) or esperado != list(map(como_tupla, por_offset)):
+        print("ERRO: os fluxos de tokens são diferentes!")
+        sys.exit(1)
+    print("Fluxos de tokens idênticos.")
+
+# Mede a memória retida por uma estrutura criada por construir(), em bytes
+def memoria_retida(construir):
+    gc.collect()
+    tracemalloc.start()
+    resultado = construir()
+    gc.collect()
+    usado = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resultado, usado
+
+# Compara os bytes por token de uma lista de objetos Token com o BufferTokens
+def bench_memoria(quantidade='1000000'):
+    quantidade = int(quantidade)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'bench.cria')
+        # Cada token do BLOCO_CRIA ocupa em média uns 5 bytes de fonte
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(gerar_fonte(quantidade * 5))
+
+        lista, bytes_lista = memoria_retida(
+            lambda: [TokenComDict(t.tipo, t.lexema, t.linha, t.coluna) for t in LexicoCria(caminho).iter_tokens()])
+        total = len(lista)
+        del lista
+        lista, bytes_slots = memoria_retida(lambda: list(LexicoCria(caminho).iter_tokens()))
+        del lista
+        buffer, bytes_buffer = memoria_retida(lambda: LexicoCria(caminho, offsets=True).carregar_tokens())
+
+    print(f"Tokens: {total}")
+    print(f"Lista de Token com __dict__:   {bytes_lista / total:6.1f} bytes/token ({bytes_lista / 2**20:.1f} MB)")
+    print(f"Lista de Token com __slots__:  {bytes_slots / total:6.1f} bytes/token ({bytes_slots / 2**20:.1f} MB)")
+    print(f"BufferTokens (arrays):         {bytes_buffer / total:6.1f} bytes/token ({bytes_buffer / 2**20:.1f} MB)")
+    print(f"Lexemas distintos internados:  {len(buffer.tabela_lexemas)}")
+
+# Compara o carregamento de um .lex em formato texto e em formato binário
+def bench_carga(megabytes='4'):
+    tamanho = int(float(megabytes) * 1024 * 1024)
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'bench.cria')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(gerar_fonte(tamanho))
+        tempos = {}
+        for formato, texto in (('texto', True), ('binário', False)):
+            saida = os.path.join(pasta, f'bench_{formato}.lex')
+            LexicoCria(caminho).analisar(saida, ecoar=False, texto=texto)
+            inicio = time.perf_counter()
+            tokens = carregar_lex(saida)
+            tempos[formato] = time.perf_counter() - inicio
+            print(f"{formato:8} {os.path.getsize(saida) / 2**20:7.2f} MB em disco, "
+                  f"{len(tokens)} tokens carregados em {tempos[formato]:.3f} s")
+    print(f"Ganho: {tempos['texto'] / tempos['binário']:.1f}x")
+
+# Tempo médio, em milissegundos, de aplicar as edições ao documento
+def tempo_edicoes(documento, edicoes):
+    inicio = time.perf_counter()
+    for edicao in edicoes:
+        documento.editar(*edicao)
+        documento.diagnosticos()
+    return (time.perf_counter() - inicio) * 1000 / len(edicoes)
+
+# Mede o servidor de linguagem: abertura do documento, edições dentro de
+# uma linha e edições que criam ou apagam linhas, contra compilar() do texto todo
+def bench_lsp(megabytes='1', edicoes='200'):
+    from servidor_lsp import DocumentoCria
+    tamanho = int(float(megabytes) * 1024 * 1024)
+    edicoes = int(edicoes)
+    fonte = gerar_fonte(tamanho)
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        esperado = compilar(fonte).diagnosticos
+        tempo_compilar = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    documento = DocumentoCria(fonte)
+    tempo_abrir = time.perf_counter() - inicio
+
+    # Linhas "resultado <- resultado + i * 3.25;" espalhadas pelo documento
+    alvos = [k for k, linha in enumerate(documento.linhas) if linha.texto.endswith('i * 3.25;')]
+    alvos = [alvos[k * len(alvos) // edicoes] for k in range(edicoes)]
+    coluna = len('    resultado <- resultado + i * ')
+    # Troca 3.25 por 4.25 e volta
+    na_linha = [(k, coluna, k, coluna + 1, '4') for k in alvos] + [(k, coluna, k, coluna + 1, '3') for k in alvos]
+    tempo_linha = tempo_edicoes(documento, na_linha)
+    # Quebra a linha depois do ';' e junta de novo
+    quebras = [(k, len(documento.linhas[k].texto), k, len(documento.linhas[k].texto), '\n') for k in reversed(alvos)]
+    juntas = [(k, len(documento.linhas[k].texto), k + 1, 0, '') for k in alvos]
+    tempo_quebra = tempo_edicoes(documento, quebras + juntas)
+
+    print(f"Fonte: {len(fonte.encode('utf-8')) / 2**20:.2f} MB, {len(documento.linhas)} linhas")
+    print(f"compilar() do texto todo: {tempo_compilar * 1000:9.1f} ms")
+    print(f"Abrir o documento:        {tempo_abrir * 1000:9.1f} ms")
+    print(f"Edição dentro da linha:   {tempo_linha:9.3f} ms/edição")
+    print(f"Edição que muda linhas:   {tempo_quebra:9.3f} ms/edição")
+    if documento.texto() != fonte or [d[0] for d in documento.diagnosticos()] != esperado:
+        print("ERRO: os diagnósticos incrementais são diferentes dos de compilar()!")
+        sys.exit(1)
+    print("Diagnósticos idênticos aos de compilar().")
+
+# Compila muitos arquivos pequenos: um processo por arquivo (como o
+# lin_exec.sh), o lote.py num processo só e o lote.py com o pool
+def bench_lote(arquivos='1000', trabalhadores=None):
+    from lote import compilar_lote
+    arquivos = int(arquivos)
+    trabalhadores = int(trabalhadores) if trabalhadores else os.cpu_count()
+    with tempfile.TemporaryDirectory() as pasta:
+        caminhos = []
+        for k in range(arquivos):
+            caminho = os.path.join(pasta, f'prog{k}.cria')
+            with open(caminho, 'w', encoding='utf-8') as f:
+                f.write(gerar_fonte(500 + 50 * (k % 40)))
+            caminhos.append(caminho)
+
+        # Um processo por arquivo é lento demais para o lote todo: mede uma amostra
+        amostra = caminhos[:max(1, arquivos // 20)]
+        compilador = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'compilador.py')
+        inicio = time.perf_counter()
+        for caminho in amostra:
+            subprocess.run([sys.executable, compilador, caminho], stdout=subprocess.DEVNULL)
+        tempo_processos = (time.perf_counter() - inicio) / len(amostra)
+
+        tempos = {}
+        for quantidade in (1, trabalhadores):
+            inicio = time.perf_counter()
+            compilar_lote(caminhos, quantidade)
+            tempos[quantidade] = time.perf_counter() - inicio
+
+    print(f"Arquivos: {arquivos}")
+    print(f"Um processo por arquivo:   {1 / tempo_processos:8.1f} arquivos/s (amostra de {len(amostra)})")
+    for quantidade, tempo in tempos.items():
+        print(f"lote.py com {quantidade:2} processo(s): {arquivos / tempo:8.1f} arquivos/s")
+
+# Programas com muitas voltas de laço para comparar a máquina de bytecode
+# com o Python gerado; {n} é trocado pelo tamanho dos laços
+PROGRAMAS_LACOS = {
+    'somas aninhadas': '''ÉNOIS
+BAGULHOS n, i, j, soma;
+n <- {n};
+MANDALEMBRAR (i <- 0; i < n; i <- i + 1)
+    MANDALEMBRAR (j <- 0; j < 100; j <- j + 1)
+        soma <- soma + i * j % 7;
+    DESENCANA
+DESENCANA
+FALA(soma);
+PARTIU
+''',
+    'collatz': '''ÉNOIS
+BAGULHOS n, k, x, passos;
+n <- {n};
+k <- 1;
+MANDAENQUANTO (k < n)
+    x <- k;
+    MANDAENQUANTO (x > 1)
+        SEPA (x % 2 == 0)
+            x <- x / 2;
+        NÃOFOI
+            x <- 3 * x + 1;
+        FIMSEPA
+        passos <- passos + 1;
+    PARAMANDA
+    k <- k + 1;
+PARAMANDA
+FALA(passos);
+PARTIU
+''',
+    'contagem': '''ÉNOIS
+BAGULHOS n, i, pares, impares;
+n <- {n};
+i <- 0;
+MANDAENQUANTO (i < n * 100)
+    SEPA (i % 2 == 0)
+        pares <- pares + 1;
+    NÃOFOI
+        impares <- impares + 1;
+    FIMSEPA
+    i <- i + 1;
+PARAMANDA
+FALA(pares - impares);
+PARTIU
+''',
+}
+
+# Tempo e saída de uma execução do programa compilado, com a saída capturada
+def executar_medindo(resultado):
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        inicio = time.perf_counter()
+        executar_codigo(resultado)
+        tempo = time.perf_counter() - inicio
+    return tempo, saida.getvalue()
+
+# Compara a máquina de bytecode (maquina.py) com o Python gerado (objeto de
+# código do gerador_ast) em programas dominados por laços, no nível de
+# otimização pedido (o nível 3 trocaria parte dos laços pela fórmula fechada)
+def bench_vm(n='3000', nivel='2'):
+    from maquina import codificar_bytecode, decodificar_bytecode
+    for nome, modelo in PROGRAMAS_LACOS.items():
+        fonte = modelo.format(n=int(n))
+        python = compilar(fonte, gerador='ast', otimizacao=int(nivel))
+        bytecode = compilar(fonte, gerador='bytecode', otimizacao=int(nivel))
+        dados = codificar_bytecode(bytecode.bytecode)
+        inicio = time.perf_counter()
+        bytecode.bytecode = decodificar_bytecode(dados)
+        tempo_carga = time.perf_counter() - inicio
+        tempo_python, saida_python = executar_medindo(python)
+        tempo_vm, saida_vm = executar_medindo(bytecode)
+        print(f"{nome}: {len(bytecode.bytecode)} instruções, {len(dados)} bytes, carregado em "
+              f"{tempo_carga * 1000:.2f} ms")
+        print(f"    Python gerado: {tempo_python:7.3f} s")
+        print(f"    Bytecode:      {tempo_vm:7.3f} s ({tempo_vm / tempo_python:.1f}x o tempo do Python)")
+        if saida_python != saida_vm:
+            print("ERRO: as saídas são diferentes!")
+            sys.exit(1)
+    print("Saídas idênticas.")
+
+# Laço de reduções que o vetorizador.py troca por contas do NumPy
+PROGRAMA_REDUCOES = '''ÉNOIS
+BAGULHOS n, i, restos, quadrados;
+n <- {n};
+MANDALEMBRAR (i <- 0; i < n; i <- i + 1)
+    restos <- restos + i * i % 7;
+    quadrados <- quadrados + (i * i) / 3 - i;
+DESENCANA
+FALA(restos);
+FALA(quadrados);
+PARTIU
+'''
+
+# Compara o Python gerado com e sem --numpy num laço de n voltas
+def bench_numpy(n='10000000', nivel='2'):
+    fonte = PROGRAMA_REDUCOES.format(n=int(n))
+    escalar = compilar(fonte, gerador='ast', otimizacao=int(nivel))
+    vetorizado = compilar(fonte, gerador='ast', otimizacao=int(nivel), numpy=True)
+    for otimizacao_feita in vetorizado.otimizacoes:
+        print(otimizacao_feita)
+    tempo_escalar, saida_escalar = executar_medindo(escalar)
+    tempo_numpy, saida_numpy = executar_medindo(vetorizado)
+    print(f"Laço escalar: {tempo_escalar:7.3f} s")
+    print(f"NumPy:        {tempo_numpy:7.3f} s ({tempo_escalar / tempo_numpy:.1f}x mais rápido)")
+    if saida_escalar != saida_numpy:
+        print("ERRO: as saídas são diferentes!")
+        sys.exit(1)
+    print("Saídas idênticas.")
+
+# Programa que lê n valores e escreve uma linha por valor
+PROGRAMA_ENTRADA_SAIDA = '''ÉNOIS
+BAGULHOS n, i, x;
+OLHA(n);
+MANDALEMBRAR (i <- 0; i < n; i <- i + 1)
+    OLHA(x);
+    FALA(x * 2 + 1);
+DESENCANA
+PARTIU
+'''
+
+# Compara o .py gerado com e sem --io-rapido lendo n valores de um arquivo
+# e escrevendo num pipe, como num lote, cada um num processo próprio (a
+# saída interativa tem as perguntas do OLHA, que são tiradas na comparação)
+def bench_io(n='1000000', nivel='2'):
+    n = int(n)
+    with tempfile.TemporaryDirectory() as pasta:
+        entrada = os.path.join(pasta, 'entrada.txt')
+        with open(entrada, 'w') as f:
+            f.write(f"{n}\n")
+            f.writelines(f"{valor % 1000 - 500}\n" for valor in range(n))
+        tempos = {}
+        saidas = {}
+        for io_rapido in (False, True):
+            resultado = compilar(PROGRAMA_ENTRADA_SAIDA, otimizacao=int(nivel), io_rapido=io_rapido)
+            programa = os.path.join(pasta, f'programa_{int(io_rapido)}.py')
+            with open(programa, 'w', encoding='utf-8') as f:
+                f.write(resultado.codigo_python)
+            with open(entrada, 'rb') as f:
+                inicio = time.perf_counter()
+                execucao = subprocess.run([sys.executable, programa], stdin=f, capture_output=True, check=True)
+                tempos[io_rapido] = time.perf_counter() - inicio
+            saidas[io_rapido] = execucao.stdout.decode('utf-8')
+    print(f"Interativo (input/print): {tempos[False]:7.3f} s")
+    print(f"--io-rapido:              {tempos[True]:7.3f} s ({tempos[False] / tempos[True]:.1f}x mais rápido)")
+    perguntas = ('Informe a variável n: ', 'Informe a variável x: ')
+    interativa = saidas[False]
+    for pergunta in perguntas:
+        interativa = interativa.replace(pergunta, '')
+    if interativa.replace('\r\n', '\n') != saidas[True].replace('\r\n', '\n'):
+        print("ERRO: as saídas são diferentes!")
+        sys.exit(1)
+    print("Saídas idênticas.")
+
+# Compila uma fonte de uns n megabytes sem cache, com o cache vazio (falta)
+# e com ele já cheio (acerto), nos três geradores
+def bench_cache(megabytes='1'):
+    from cache import CacheCompilacao
+    linhas = int(float(megabytes) * 1024 * 1024) // 24
+    fonte = ("ÉNOIS\nBAGULHOS x, y;\n" + ''.join(f"x <- x + y * {k} - {k % 7};\n" for k in range(linhas))
+             + "FALA(x);\nPARTIU\n")
+    print(f"Fonte: {len(fonte.encode('utf-8')) / 1024 / 1024:.1f} MB")
+    with tempfile.TemporaryDirectory() as pasta:
+        cache = CacheCompilacao(pasta)
+        for gerador in ('texto', 'ast', 'bytecode'):
+            tempos = []
+            for usar_cache in (None, cache, cache):
+                inicio = time.perf_counter()
+                resultado = compilar(fonte, 'fonte.cria', gerador=gerador, cache=usar_cache)
+                tempos.append(time.perf_counter() - inicio)
+                if not resultado.sucesso:
+                    print("ERRO: a compilação falhou!")
+                    sys.exit(1)
+            sem_cache, falta, acerto = tempos
+            print(f"{gerador:9} sem cache {sem_cache:6.3f} s, falta {falta:6.3f} s, "
+                  f"acerto {acerto:6.3f} s ({sem_cache / acerto:.1f}x mais rápido)")
+        print(cache.resumo())
+
+BENCHMARKS = {
+    'cache': bench_cache,
+    'carga': bench_carga,
+    'io': bench_io,
+    'lexico': bench_lexico,
+    'lote': bench_lote,
+    'lsp': bench_lsp,
+    'memoria': bench_memoria,
+    'numpy': bench_numpy,
+    'vm': bench_vm,
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Uso: python benchmark.py <{'|'.join(BENCHMARKS)}> [parâmetros...]")
+        sys.exit(1)
+    BENCHMARKS[sys.argv[1]](*sys.argv[2:])
@@ -0,0 +1,247 @@
+import hashlib
+import importlib
+import marshal
+import os
+import sys
+import tempfile
+
+import compilador
+from maquina import codificar_bytecode, decodificar_bytecode
+from tipos import Tipos
+from tokens import (LIMITE_ERROS, codificar_lex_binario, decodificar_lex_binario, escrever_texto, escrever_varint,
+                    ler_texto, ler_varint)
+
+# Cache em disco das compilações: quem recompila sempre os mesmos .cria
+# pula o léxico, o sintático, o semântico e a geração de código quando a
+# fonte e as opções não mudaram. Cada compilação é uma entrada (um arquivo
+# <chave>.cache na pasta do cache) com os tokens, os diagnósticos e o código
+# gerado: o .py em texto, o objeto de código do gerador 'ast' (em marshal) ou
+# o bytecode da maquina.py. A chave é o SHA-256 da fonte, do nome, das
+# opções e da versão do compilador, que é o hash do código dos módulos dele:
+# mexer no compilador invalida o cache todo sem ninguém lembrar de trocar
+# um número.
+#
+# A pasta tem um tamanho máximo; passando dele, saem as entradas usadas há
+# mais tempo (LRU, pela data de modificação, que um acerto atualiza). Vários
+# processos (os do lote.py) podem usar a mesma pasta: cada entrada é escrita
+# num arquivo temporário e trocada de uma vez com os.replace, então ninguém
+# lê uma entrada pela metade, e uma entrada que sumiu ou não dá para ler é
+# só uma falta.
+
+LIMITE_CACHE = 256 * 1024 * 1024  # Tamanho máximo da pasta do cache, em bytes
+EXTENSAO_CACHE = '.cache'
+
+# Módulos cujo código faz parte da versão do compilador
+MODULOS_COMPILADOR = (
+    'arvore', 'cache', 'compilador', 'gerador_ast', 'io_rapido', 'lacos', 'lexico', 'maquina', 'otimizador',
+    'otimizador_lacos', 'semantico_e_codigo', 'sintatico', 'tipos', 'tokens', 'vetorizador',
+)
+
+# --- FORMATO DE UMA ENTRADA ---
+# Cabeçalho: MAGICO_CACHE, byte de versão e a chave (32 bytes), conferida na
+# leitura. Depois vêm o .lex binário dos tokens (com os erros léxicos), as
+# listas de erros sintáticos, erros semânticos, avisos e otimizações feitas,
+# os tipos das variáveis ("nome tipo"; vazia se o semântico não passou) e os
+# três códigos, cada um com um byte dizendo se está presente.
+MAGICO_CACHE = b'CRIACCH\0'
+VERSAO_CACHE = 1
+
+# Erros de uma entrada corrompida, de outra versão ou apagada no meio da leitura
+ERROS_LEITURA = (OSError, ValueError, IndexError, KeyError, EOFError, TypeError)
+
+# Hash do código dos módulos do compilador e da versão do Python (o marshal
+# dos objetos de código muda com ela)
+def versao_compilador():
+    hash_versao = hashlib.sha256(sys.implementation.cache_tag.encode())
+    for nome in MODULOS_COMPILADOR:
+        with open(importlib.import_module(nome).__file__, 'rb') as f:
+            hash_versao.update(f.read())
+    return hash_versao.digest()
+
+def escrever_bytes(saida, dados):
+    escrever_varint(saida, len(dados))
+    saida += dados
+
+def ler_bytes(dados, pos):
+    tamanho, pos = ler_varint(dados, pos)
+    return bytes(dados[pos:pos+tamanho]), pos + tamanho
+
+def escrever_lista(saida, textos):
+    escrever_varint(saida, len(textos))
+    for texto in textos:
+        escrever_texto(saida, texto)
+
+def ler_lista(dados, pos):
+    quantidade, pos = ler_varint(dados, pos)
+    textos = []
+    for _ in range(quantidade):
+        texto, pos = ler_texto(dados, pos)
+        textos.append(texto)
+    return textos, pos
+
+# Serializa o que um acerto precisa de um Resultado
+def codificar_entrada(chave, resultado):
+    saida = bytearray(MAGICO_CACHE)
+    saida.append(VERSAO_CACHE)
+    saida += chave
+    escrever_bytes(saida, codificar_lex_binario(resultado.tokens))
+    for lista in (resultado.erros_sintaticos, resultado.erros_semanticos, resultado.avisos, resultado.otimizacoes):
+        escrever_lista(saida, lista)
+    variaveis = {} if resultado.tipos is None else resultado.tipos.variaveis
+    escrever_lista(saida, [f"{nome} {tipo}" for nome, tipo in variaveis.items()])
+    texto = resultado.texto_python() if resultado.sucesso and resultado.bytecode is None else None
+    codigos = (
+        None if texto is None else texto.encode('utf-8'),
+        None if resultado.codigo_objeto is None else marshal.dumps(resultado.codigo_objeto),
+        None if resultado.bytecode is None else codificar_bytecode(resultado.bytecode),
+    )
+    for codigo in codigos:
+        saida.append(codigo is not None)
+        if codigo is not None:
+            escrever_bytes(saida, codigo)
+    return bytes(saida)
+
+# Reconstrói o Resultado de uma entrada. Ele tem os tokens, os diagnósticos,
+# os tipos e o código, mas não a árvore nem os analisadores, que não
+# rodaram; no gerador 'ast' o texto vem pronto, sem o modulo_ast.
+def decodificar_entrada(dados, chave, nome):
+    dados = memoryview(dados)
+    inicio = len(MAGICO_CACHE)
+    if bytes(dados[:inicio]) != MAGICO_CACHE or dados[inicio] != VERSAO_CACHE:
+        raise ValueError("Entrada do cache de outra versão")
+    if bytes(dados[inicio + 1:inicio + 1 + len(chave)]) != chave:
+        raise ValueError("Entrada do cache com outra chave")
+    pos = inicio + 1 + len(chave)
+    lex, pos = ler_bytes(dados, pos)
+    resultado = compilador.Resultado(nome, decodificar_lex_binario(lex))
+    resultado.erros_sintaticos, pos = ler_lista(dados, pos)
+    resultado.erros_semanticos, pos = ler_lista(dados, pos)
+    resultado.avisos, pos = ler_lista(dados, pos)
+    resultado.otimizacoes, pos = ler_lista(dados, pos)
+    variaveis, pos = ler_lista(dados, pos)
+    if variaveis:
+        tipos = {}
+        for variavel in variaveis:
+            nome_variavel, tipo = variavel.split(' ')
+            tipos[nome_variavel] = int(tipo)
+        resultado.tipos = Tipos(resultado.tokens.identificadores, tipos, resultado.avisos)
+    codigos = []
+    for _ in range(3):
+        presente = dados[pos]
+        pos += 1
+        codigo = None
+        if presente:
+            codigo, pos = ler_bytes(dados, pos)
+        codigos.append(codigo)
+    texto, objeto, bytecode = codigos
+    if texto is not None:
+        resultado.codigo_python = texto.decode('utf-8')
+    if objeto is not None:
+        resultado.codigo_objeto = marshal.loads(objeto)
+    if bytecode is not None:
+        resultado.bytecode = decodificar_bytecode(bytecode)
+    return resultado
+
+# Cache de compilações numa pasta, com os contadores de acertos e faltas
+# deste processo
+class CacheCompilacao:
+    def __init__(self, pasta, limite=LIMITE_CACHE):
+        self.pasta = pasta
+        self.limite = limite  # Bytes; passando disso saem as entradas mais antigas
+        self.acertos = 0
+        self.faltas = 0
+        self.versao = versao_compilador()
+        os.makedirs(pasta, exist_ok=True)
+
+    def chave(self, fonte, nome, opcoes):
+        chave = hashlib.sha256(self.versao)
+        chave.update(repr((VERSAO_CACHE, nome, opcoes)).encode('utf-8'))
+        chave.update(fonte.encode('utf-8', 'surrogatepass'))
+        return chave.digest()
+
+    def caminho(self, chave):
+        return os.path.join(self.pasta, chave.hex() + EXTENSAO_CACHE)
+
+    # Resultado guardado com a chave, ou None. Uma entrada que não dá para
+    # ler é apagada (outro processo pode tê-la apagado antes: tudo bem).
+    def carregar(self, chave, nome):
+        caminho = self.caminho(chave)
+        try:
+            with open(caminho, 'rb') as f:
+                dados = f.read()
+        except OSError:
+            return None
+        try:
+            resultado = decodificar_entrada(dados, chave, nome)
+        except ERROS_LEITURA:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(caminho)  # Usada agora: vai para o fim da fila do LRU
+        except OSError:
+            pass
+        return resultado
+
+    # Grava a entrada de forma atômica e tira as mais antigas se o cache
+    # passou do limite
+    def guardar(self, chave, resultado):
+        dados = codificar_entrada(chave, resultado)
+        descritor, temporario = tempfile.mkstemp(dir=self.pasta, suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'wb') as f:
+                f.write(dados)
+            os.replace(temporario, self.caminho(chave))
+        except OSError:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            return
+        self.limitar()
+
+    # Apaga as entradas usadas há mais tempo até o cache caber no limite
+    def limitar(self):
+        entradas = []
+        total = 0
+        with os.scandir(self.pasta) as itens:
+            for item in itens:
+                if not item.name.endswith(EXTENSAO_CACHE):
+                    continue
+                try:
+                    informacoes = item.stat()
+                except OSError:
+                    continue
+                entradas.append((informacoes.st_mtime, informacoes.st_size, item.path))
+                total += informacoes.st_size
+        if total <= self.limite:
+            return
+        entradas.sort()
+        for _, tamanho, caminho in entradas:
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+            if total <= self.limite:
+                break
+
+    # Como compilador.compilar, pelo cache: num acerto nenhuma etapa roda
+    def compilar(self, fonte, nome='<fonte>', limite_erros=LIMITE_ERROS, gerador='texto', otimizacao=0,
+                 desenrolar=compilador.FATOR_DESENROLAR, numpy=False, io_rapido=False):
+        chave = self.chave(fonte, nome, (limite_erros, gerador, otimizacao, desenrolar, numpy, io_rapido))
+        resultado = self.carregar(chave, nome)
+        if resultado is not None:
+            self.acertos += 1
+            resultado.io_rapido = io_rapido
+            return resultado
+        self.faltas += 1
+        resultado = compilador.compilar(fonte, nome, limite_erros, None, gerador, otimizacao, desenrolar, numpy,
+                                        io_rapido)
+        self.guardar(chave, resultado)
+        return resultado
+
+    def resumo(self):
+        return f"Cache: {self.acertos} acerto(s), {self.faltas} falta(s)"
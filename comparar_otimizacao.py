@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+
+from lote import listar_fontes
+from otimizador import NIVEL_MAXIMO
+
+# Confere que o otimizador não muda o comportamento dos programas: cada .cria
+# roda sem otimização e com o nível pedido (compilador.py --run, cada um num
+# processo, com as mesmas entradas para o OLHA) e a saída e o erro final, se
+# houver, têm que ser iguais. Programas que não terminam no tempo limite
+# contam como iguais se também não terminarem otimizados.
+# Uso: python comparar_otimizacao.py [-O N] [--entradas 3,7,0] [--tempo S] <pasta | arquivo.cria>...
+
+COMPILADOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'compilador.py')
+ENTRADAS = ['3', '7', '0', '12', '5']
+
+# Saída, última linha do stderr (a exceção, se houve) e código de saída de
+# uma execução, ou None se ela passou do tempo
+def executar(caminho, nivel, entradas, tempo):
+    try:
+        processo = subprocess.run([sys.executable, COMPILADOR, '--run', '-O', str(nivel), caminho],
+                                  input=''.join(e + '\n' for e in entradas), capture_output=True,
+                                  text=True, encoding='utf-8', timeout=tempo)
+    except subprocess.TimeoutExpired:
+        return None
+    erro = processo.stderr.strip().rsplit('\n', 1)[-1]
+    return processo.stdout, erro, processo.returncode
+
+# Compara as execuções sem e com otimização de cada arquivo; retorna os que diferem
+def comparar(caminhos, nivel, entradas, tempo):
+    diferentes = []
+    for caminho in caminhos:
+        original = executar(caminho, 0, entradas, tempo)
+        otimizado = executar(caminho, nivel, entradas, tempo)
+        if original == otimizado:
+            print(f"ok          {caminho}")
+            continue
+        diferentes.append(caminho)
+        print(f"DIFERENTE   {caminho}")
+        for rotulo, execucao in (('-O 0', original), (f'-O {nivel}', otimizado)):
+            if execucao is None:
+                print(f"    {rotulo}: passou de {tempo} s")
+            else:
+                print(f"    {rotulo}: saída {execucao[0]!r}, erro {execucao[1]!r}, código {execucao[2]}")
+    return diferentes
+
+# Ponto de entrada do programa
+if __name__ == '__main__':
+    nivel = NIVEL_MAXIMO
+    entradas = ENTRADAS
+    tempo = 10.0
+    alvos = []
+    argumentos = iter(sys.argv[1:])
+    try:
+        for argumento in argumentos:
+            if argumento == '-O':
+                nivel = int(next(argumentos))
+            elif argumento == '--entradas':
+                entradas = next(argumentos).split(',')
+            elif argumento == '--tempo':
+                tempo = float(next(argumentos))
+            else:
+                alvos.append(argumento)
+    except (StopIteration, ValueError):
+        alvos = []
+    if not alvos or not 1 <= nivel <= NIVEL_MAXIMO:
+        print(f"Uso: python comparar_otimizacao.py [-O 1-{NIVEL_MAXIMO}] [--entradas 3,7,0] [--tempo S] "
+              "<pasta | arquivo.cria>...")
+        sys.exit(1)
+
+    caminhos = listar_fontes(alvos)
+    if not caminhos:
+        print("Nenhum arquivo .cria encontrado.")
+        sys.exit(1)
+    diferentes = comparar(caminhos, nivel, entradas, tempo)
+    print(f"{len(caminhos) - len(diferentes)} de {len(caminhos)} programas com a mesma saída")
+    if diferentes:
+        sys.exit(1)
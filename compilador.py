@@ -0,0 +1,285 @@
+import ast
+import sys
+
+from gerador_ast import GeradorAst
+from lacos import traduzir_lacos
+from lexico import FonteCria, LexicoCria
+from maquina import ErroExecucao, compilar_bytecode, executar_bytecode, salvar_bytecode
+from otimizador import NIVEL_MAXIMO, otimizar
+from otimizador_lacos import FATOR_DESENROLAR, otimizar_lacos
+from semantico_e_codigo import RastroRegras, SemanticoCria
+from sintatico import SintaticoCria
+from tipos import NOMES_TIPOS, inferir_tipos
+from tokens import LIMITE_ERROS, codificar_lex_binario
+from vetorizador import vetorizar
+
+# Resultado de uma compilação feita inteiramente em memória
+class Resultado:
+    def __init__(self, nome, tokens):
+        self.nome = nome  # Nome da fonte usado nos diagnósticos
+        self.tokens = tokens  # BufferTokens gerado pela análise léxica
+        self.erros_lexicos = tokens.erros
+        self.erro_lexico = tokens.erro  # Mensagem do primeiro erro léxico, se houver
+        self.erros_sintaticos = []
+        self.erros_semanticos = []
+        self.arvore = None  # Árvore sintática (arvore.Programa), se a análise sintática passou
+        self.codigo_python = None  # Código Python gerado (None se houve erros)
+        self.modulo_ast = None  # ast.Module e objeto de código do gerador 'ast'
+        self.codigo_objeto = None
+        self.bytecode = None  # maquina.ProgramaBytecode do gerador 'bytecode'
+        self.otimizacoes = []  # O que os otimizadores mudaram no programa (níveis 2 e 3)
+        self.tipos = None  # tipos.Tipos inferidos do programa conferido
+        self.avisos = []  # Avisos da inferência de tipos (não impedem a geração)
+        self.io_rapido = False  # Se o programa usa a entrada e a saída rápidas (io_rapido.py)
+        self.sintatico = None  # Analisadores usados, para gravar os relatórios
+        self.semantico = None
+
+    # Todos os diagnósticos, na ordem das etapas
+    @property
+    def diagnosticos(self):
+        return self.erros_lexicos + self.erros_sintaticos + self.erros_semanticos
+
+    @property
+    def sucesso(self):
+        return self.codigo_python is not None or self.codigo_objeto is not None or self.bytecode is not None
+
+    # Código Python em texto: o gerado pelas regras semânticas ou, no gerador
+    # 'ast', o próprio módulo convertido de volta com ast.unparse (uma vez só:
+    # o texto fica em codigo_python, como num acerto do cache)
+    def texto_python(self):
+        if self.codigo_python is None and self.modulo_ast is not None:
+            self.codigo_python = ast.unparse(self.modulo_ast) + '\n'
+        return self.codigo_python
+
+# Compila o código C.R.I.A de uma string: análise léxica, sintática,
+# semântica e geração de código no mesmo processo, sem arquivos
+# intermediários. O sintático monta a árvore uma vez só e o semântico a
+# percorre; a análise semântica só roda se a sintática passar. O léxico e o
+# sintático se recuperam dos erros e relatam cada um até limite_erros erros,
+# então uma compilação mostra tudo o que eles encontram de errado. Com um
+# RastroRegras as regras semânticas disparadas são registradas nele.
+# Com gerador='ast' o código não é gerado em texto: o gerador_ast monta um
+# ast.Module com as linhas da fonte C.R.I.A, compilado direto para um objeto
+# de código (Resultado.codigo_objeto) que executar_codigo roda neste processo;
+# com gerador='bytecode' o programa vira o bytecode da maquina.py
+# (Resultado.bytecode), que executar_codigo roda no interpretador dela.
+# Com otimizacao > 0 a árvore conferida passa pelo otimizador antes da geração,
+# e os MANDALEMBRAR viram range() ou while (lacos.py) nos dois geradores; no
+# nível 3 os laços traduzidos ainda passam pelo otimizador_lacos, que desenrola
+# os pequenos repetindo o corpo desenrolar vezes (1 não desenrola). Com
+# numpy=True os laços de reduções viram contas do NumPy (vetorizador.py) nos
+# geradores de Python; o código gerado passa a precisar do NumPy para rodar.
+# Os tipos das variáveis (tipos.py) são inferidos da árvore conferida, antes
+# do otimizador, e os mesmos valem para todas as etapas seguintes. Com
+# io_rapido=True o programa não é interativo: o OLHA lê a entrada padrão
+# inteira de uma vez e o FALA escreve em blocos (io_rapido.py). Com um
+# cache.CacheCompilacao, uma fonte já compilada com as mesmas opções vem
+# pronta do cache, sem rodar nenhuma etapa (sem o rastro, que precisa delas).
+def compilar(fonte: str, nome='<fonte>', limite_erros=LIMITE_ERROS, rastro=None, gerador='texto',
+             otimizacao=0, desenrolar=FATOR_DESENROLAR, numpy=False, io_rapido=False, cache=None) -> Resultado:
+    if cache is not None and rastro is None:
+        return cache.compilar(fonte, nome, limite_erros, gerador, otimizacao, desenrolar, numpy, io_rapido)
+    tokens = LexicoCria(FonteCria(fonte, nome), limite_erros=limite_erros).carregar_tokens()
+    resultado = Resultado(nome, tokens)
+    resultado.io_rapido = io_rapido
+
+    resultado.sintatico = SintaticoCria(tokens=tokens, limite_erros=limite_erros)
+    resultado.arvore = resultado.sintatico.programa()
+    resultado.erros_sintaticos = resultado.sintatico.erros
+    if resultado.erros_sintaticos:
+        return resultado
+
+    resultado.semantico = SemanticoCria(tokens=tokens, rastro=rastro)
+    # Com erro léxico a árvore é a da fonte sem os caracteres inválidos: ela
+    # ainda é conferida, mas nenhum código é gerado
+    if resultado.semantico.verificar(resultado.arvore) and not resultado.erros_lexicos:
+        resultado.tipos = resultado.semantico.tipos = inferir_tipos(resultado.arvore)
+        resultado.semantico.io_rapido = io_rapido
+        resultado.avisos = resultado.tipos.avisos
+        arvore = traduzir_lacos(otimizar(resultado.arvore, otimizacao, resultado.otimizacoes, resultado.tipos))
+        arvore = otimizar_lacos(arvore, otimizacao, resultado.otimizacoes, desenrolar)
+        if numpy and gerador != 'bytecode':
+            arvore = vetorizar(arvore, resultado.otimizacoes)
+        if gerador == 'ast':
+            gerar_codigo_objeto(resultado, arvore)
+        elif gerador == 'bytecode':
+            gerar_bytecode(resultado, arvore)
+        else:
+            resultado.semantico.visitar(arvore)
+            resultado.codigo_python = resultado.semantico.conteudo_resultado()
+    resultado.erros_semanticos = resultado.semantico.erros
+    return resultado
+
+# Monta o ast.Module da árvore e o compila; expressões aninhadas demais para
+# o compile() do Python viram um erro da compilação
+def gerar_codigo_objeto(resultado, arvore):
+    try:
+        resultado.modulo_ast = GeradorAst(arvore.identificadores, resultado.tipos, resultado.io_rapido).gerar(arvore)
+        resultado.codigo_objeto = compile(resultado.modulo_ast, resultado.nome, 'exec')
+    except (RecursionError, ValueError) as e:
+        resultado.modulo_ast = None
+        resultado.semantico.erros.append(f"Erro ao gerar o código: {e}")
+
+def gerar_bytecode(resultado, arvore):
+    try:
+        resultado.bytecode = compilar_bytecode(arvore, resultado.nome, resultado.tipos)
+    except ValueError as e:
+        resultado.semantico.erros.append(f"Erro ao gerar o código: {e}")
+
+# Roda o programa compilado com gerador='ast' neste processo, como se o .py
+# fosse executado diretamente, ou o compilado com gerador='bytecode' na
+# máquina da maquina.py
+def executar_codigo(resultado):
+    if resultado.bytecode is not None:
+        executar_bytecode(resultado.bytecode, resultado.io_rapido)
+    else:
+        exec(resultado.codigo_objeto, {'__name__': '__main__'})
+
+# Grava o .py de uma compilação em base.py (ou o bytecode em base.crb) e, se
+# pedido, também os artefatos intermediários base.lex (binário) e base.syn
+def salvar_artefatos(resultado, base, intermediarios=False):
+    arquivo_py = base + '.py'
+    if intermediarios:
+        with open(base + '.lex', 'wb') as f:
+            f.write(codificar_lex_binario(resultado.tokens))
+        sintatico = resultado.sintatico
+        if sintatico is None:
+            # Veio do cache: o .syn sai dos erros guardados, sem analisar de novo
+            sintatico = SintaticoCria(tokens=resultado.tokens)
+            sintatico.erros = resultado.erros_sintaticos
+        sintatico.arquivo_lex = base + '.lex'
+        sintatico.salvar_resultado(base + '.syn')
+    if resultado.bytecode is not None:
+        salvar_bytecode(resultado.bytecode, base + '.crb')
+        return base + '.crb'
+    with open(arquivo_py, 'w', encoding='utf-8') as f:
+        if resultado.sucesso:
+            f.write(resultado.texto_python())
+        else:
+            f.write("# Erros semânticos encontrados:\n")
+            for erro in resultado.diagnosticos:
+                f.write(f"# {erro}\n")
+    return arquivo_py
+
+# Ponto de entrada do programa
+if __name__ == '__main__':
+    intermediarios = False
+    limite_erros = LIMITE_ERROS
+    destino_rastro = None
+    gerador = 'texto'
+    rodar = False
+    otimizacao = 0
+    desenrolar = FATOR_DESENROLAR
+    verboso = False
+    numpy = False
+    io_rapido = False
+    pasta_cache = None
+    limite_cache = None
+    alvos = []
+    argumentos = iter(sys.argv[1:])
+    try:
+        for argumento in argumentos:
+            if argumento == '--artefatos':
+                intermediarios = True
+            elif argumento == '--limite-erros':
+                limite_erros = int(next(argumentos)) or None
+            elif argumento == '--rastro':
+                destino_rastro = next(argumentos)
+            elif argumento == '-O':
+                otimizacao = int(next(argumentos))
+            elif argumento == '--desenrolar':
+                desenrolar = int(next(argumentos))
+            elif argumento == '-v':
+                verboso = True
+            elif argumento == '--numpy':
+                numpy = True
+            elif argumento == '--io-rapido':
+                io_rapido = True
+            elif argumento == '--cache':
+                pasta_cache = next(argumentos)
+            elif argumento == '--limite-cache':
+                limite_cache = int(float(next(argumentos)) * 1024 * 1024)
+            elif argumento == '--ast':
+                gerador = 'ast'
+            elif argumento == '--run':
+                gerador = 'ast'
+                rodar = True
+            elif argumento == '--bytecode':
+                gerador = 'bytecode'
+            elif argumento == '--vm':
+                gerador = 'bytecode'
+                rodar = True
+            else:
+                alvos.append(argumento)
+    except (StopIteration, ValueError):
+        alvos = []
+    if (len(alvos) != 1 or (limite_erros is not None and limite_erros < 0)
+            or not 0 <= otimizacao <= NIVEL_MAXIMO or desenrolar < 1
+            or (limite_cache is not None and limite_cache < 0)):
+        print("Uso: python compilador.py [--artefatos] [--limite-erros N] [--rastro contagem | --rastro <arquivo>]")
+        print(f"                          [-O 0-{NIVEL_MAXIMO}] [--desenrolar N] [--numpy] [--io-rapido] [-v]")
+        print("                          [--cache <pasta> [--limite-cache MB]] [--ast | --run | --bytecode | --vm]")
+        print("                          <arquivo.cria>")
+        print("     (--limite-erros 0 relata todos os erros; -O 1 dobra as contas constantes, -O 2 também")
+        print("      tira o código morto, -O 3 também tira dos laços as contas invariantes e desenrola")
+        print(f"      os pequenos {FATOR_DESENROLAR} vezes (--desenrolar 1 não desenrola) e -v lista o que mudou")
+        print("      e o tipo inferido de cada variável;")
+        print("      --numpy faz os laços que só acumulam somas ou produtos com o NumPy;")
+        print("      --io-rapido lê a entrada toda de uma vez, sem perguntas, e escreve a saída em blocos;")
+        print("      --cache guarda e reaproveita as compilações na pasta, até --limite-cache MB;")
+        print("      --ast gera o .py pelo módulo ast;")
+        print("      --run executa o programa aqui mesmo, sem gravar o .py;")
+        print("      --bytecode grava o bytecode da maquina.py num .crb e --vm o executa nela)")
+        sys.exit(1)
+    caminho = alvos[0]
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            fonte = f.read()
+    except IOError as e:
+        print(f"Erro ao ler o arquivo {caminho}: {e}")
+        sys.exit(1)
+
+    # Rastro das regras semânticas: só a contagem ou também cada regra num arquivo
+    arquivo_rastro = None
+    if destino_rastro not in (None, 'contagem'):
+        arquivo_rastro = open(destino_rastro, 'w', encoding='utf-8')
+    rastro = None if destino_rastro is None else RastroRegras(arquivo_rastro)
+    cache = None
+    if pasta_cache is not None:
+        from cache import LIMITE_CACHE, CacheCompilacao
+        cache = CacheCompilacao(pasta_cache, LIMITE_CACHE if limite_cache is None else limite_cache)
+    resultado = compilar(fonte, caminho, limite_erros, rastro, gerador, otimizacao, desenrolar, numpy, io_rapido,
+                         cache)
+    if arquivo_rastro is not None:
+        arquivo_rastro.close()
+    if rastro is not None:
+        for linha in rastro.resumo():
+            print(linha)
+    for diagnostico in resultado.diagnosticos:
+        print(diagnostico)
+    for aviso in resultado.avisos:
+        print(aviso)
+    if cache is not None:
+        # Com --run e --vm, longe da saída do programa
+        print(cache.resumo(), file=sys.stderr if rodar else sys.stdout)
+    if verboso:
+        for otimizacao_feita in resultado.otimizacoes:
+            print(otimizacao_feita)
+        if resultado.tipos is not None:
+            for nome, tipo in sorted(resultado.tipos.variaveis.items()):
+                print(f"Tipo de {nome}: {NOMES_TIPOS[tipo]}")
+    if rodar and resultado.sucesso:
+        try:
+            executar_codigo(resultado)
+        except ErroExecucao as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+    arquivo_py = salvar_artefatos(resultado, caminho.rsplit('.', 1)[0], intermediarios)
+    if resultado.bytecode is not None:
+        print(f"Bytecode gerado com sucesso em: {arquivo_py}")
+    elif resultado.sucesso:
+        print(f"Código Python gerado com sucesso em: {arquivo_py}")
+    else:
+        print(f"Erros salvos em: {arquivo_py}")
+        sys.exit(1)
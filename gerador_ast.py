@@ -0,0 +1,239 @@
+import ast
+import copy
+
+from arvore import Texto, Visitante, valor_numero
+from io_rapido import CODIGO_CHAMADA_RAPIDA, CODIGO_ENTRADA_RAPIDA, CODIGO_SAIDA_RAPIDA, IMPORT_SYS
+from tipos import CODIGO_DIVIDIR, INTEIRO, REAL, inferir_tipos
+from tokens import TokenType
+from vetorizador import REDUCOES, TAMANHO_BLOCO_VETOR
+
+# Back end que monta o programa direto como um ast.Module do Python, pronto
+# para compile() e exec() no mesmo processo, sem gerar texto e sem outro
+# interpretador analisar esse texto de novo. O programa é o mesmo que o
+# SemanticoCria gera em texto: main() com as variáveis do BAGULHOS iniciadas
+# em 0 (com o nome como declarado), os usos em minúsculas e o MANDALEMBRAR
+# já traduzido pelo lacos.py (for com range() ou while). Cada comando leva a
+# linha do C.R.I.A, então erros em tempo de execução apontam para a fonte.
+# Com io_rapido o OLHA e o FALA são os do io_rapido.py, como no texto.
+
+# Operadores do módulo ast para cada operador do C.R.I.A ("/" é divisão
+# inteira entre int; com float, ver DIVISOES_AST)
+OPERADORES_AST = {
+    TokenType.T_MAIS: ast.Add, TokenType.T_MENOS: ast.Sub, TokenType.T_VEZES: ast.Mult,
+    TokenType.T_DIVIDIDO: ast.FloorDiv, TokenType.T_RESTO: ast.Mod, TokenType.T_ELEVADO: ast.Pow,
+}
+DIVISOES_AST = {INTEIRO: ast.FloorDiv, REAL: ast.Div}  # Pelo tipo dos operandos; MISTO chama _dividir
+COMPARACOES_AST = {
+    TokenType.T_MAIOR: ast.Gt, TokenType.T_MENOR: ast.Lt, TokenType.T_MAIOR_IGUAL: ast.GtE,
+    TokenType.T_MENOR_IGUAL: ast.LtE, TokenType.T_IGUAL: ast.Eq, TokenType.T_DIFERENTE: ast.NotEq,
+}
+
+# Esqueleto do módulo gerado; o corpo de main() é trocado pelo do programa
+ESQUELETO = "def main():\n    pass\n\nif __name__ == '__main__':\n    main()\n"
+
+# Import posto no começo do módulo quando há laços vetorizados
+IMPORT_NUMPY = "import numpy as _np\n"
+
+# Valor de uma string do FALA, com as sequências de escape interpretadas
+# como no print("...") do código gerado em texto
+def valor_texto(lexema):
+    try:
+        return ast.literal_eval('"' + lexema + '"')
+    except (SyntaxError, ValueError):
+        return lexema
+
+class GeradorAst(Visitante):
+    def __init__(self, identificadores, tipos=None, io_rapido=False):
+        self.nomes = identificadores.nomes
+        self.normalizados = identificadores.normalizados
+        self.tipos = tipos  # tipos.Tipos do programa (None: inferidos da árvore gerada)
+        self.posicao = {'lineno': 1, 'col_offset': 0}
+        self.ultima_linha = 1
+        self.usa_numpy = False  # Se algum laço foi vetorizado com NumPy
+        self.usa_dividir = False  # Se alguma divisão chama _dividir
+        self.io_rapido = io_rapido  # Entrada e saída rápidas, sem input() e print() (ver io_rapido.py)
+        self.usa_entrada = False  # Se o programa tem OLHA
+        self.usa_saida = False  # Se ele tem FALA
+
+    # Monta o ast.Module da árvore de um programa já conferido pelo semântico
+    def gerar(self, arvore):
+        return self.visitar(arvore)
+
+    # Localização dos nodos do comando atual: só a linha do C.R.I.A, sem as
+    # colunas (que não correspondem às do Python)
+    def em(self, linha):
+        self.posicao = {'lineno': linha, 'col_offset': 0}
+        self.ultima_linha = max(self.ultima_linha, linha)
+        return self.posicao
+
+    def nome(self, nome, contexto):
+        return ast.Name(nome, contexto, **self.posicao)
+
+    def visitar_programa(self, nodo):
+        if self.tipos is None:
+            self.tipos = inferir_tipos(nodo)
+        self.tipos.usar_identificadores(nodo.identificadores)
+        corpo = []
+        for declaracao in nodo.declaracoes:
+            self.em(declaracao.linha)
+            nome = self.nomes[declaracao.simbolo]
+            corpo.append(ast.Assign([self.nome(nome, ast.Store())],
+                                    ast.Constant(self.tipos.valor_inicial(nome), **self.posicao), **self.posicao))
+        corpo += yield nodo.bloco
+        modulo = ast.parse(ESQUELETO)
+        if corpo:
+            modulo.body[0].body = corpo
+        if self.io_rapido and self.usa_saida:
+            modulo.body[1:] = ast.parse(CODIGO_CHAMADA_RAPIDA).body
+        # A chamada de main() fica na última linha do programa
+        for nodo_ast in ast.walk(modulo.body[1]):
+            if 'lineno' in nodo_ast._attributes:
+                nodo_ast.lineno = self.ultima_linha
+                nodo_ast.end_lineno = nodo_ast.end_col_offset = None
+        if self.usa_dividir:
+            modulo.body[0:0] = ast.parse(CODIGO_DIVIDIR).body
+        if self.io_rapido and self.usa_entrada:
+            modulo.body[0:0] = ast.parse(CODIGO_ENTRADA_RAPIDA).body
+        if self.io_rapido and self.usa_saida:
+            modulo.body[0:0] = ast.parse(CODIGO_SAIDA_RAPIDA).body
+        if self.usa_numpy:
+            modulo.body[0:0] = ast.parse(IMPORT_NUMPY).body
+        if self.io_rapido and (self.usa_entrada or self.usa_saida):
+            modulo.body[0:0] = ast.parse(IMPORT_SYS).body
+        return modulo
+
+    def visitar_bloco(self, nodo):
+        comandos = []
+        for comando in nodo.comandos:
+            comandos.append((yield comando))
+        return comandos or [ast.Pass(**self.posicao)]
+
+    def visitar_atribuicao(self, nodo):
+        posicao = self.em(nodo.linha)
+        valor = yield nodo.valor
+        return ast.Assign([self.nome(self.normalizados[nodo.alvo.simbolo], ast.Store())], valor, **posicao)
+
+    def visitar_se(self, nodo):
+        posicao = self.em(nodo.linha)
+        condicao = yield nodo.condicao
+        entao = yield nodo.entao
+        senao = [] if nodo.senao is None else (yield nodo.senao)
+        return ast.If(condicao, entao, senao, **posicao)
+
+    def visitar_enquanto(self, nodo):
+        posicao = self.em(nodo.linha)
+        condicao = yield nodo.condicao
+        corpo = yield nodo.corpo
+        return ast.While(condicao, corpo, [], **posicao)
+
+    # for v in range(inicio, fim[, passo])
+    def visitar_para_intervalo(self, nodo):
+        posicao = self.em(nodo.linha)
+        argumentos = [(yield nodo.inicio), (yield nodo.fim)]
+        self.posicao = posicao
+        if nodo.passo != 1:
+            argumentos.append(ast.Constant(nodo.passo, **posicao))
+        intervalo = ast.Call(self.nome('range', ast.Load()), argumentos, [], **posicao)
+        alvo = self.nome(self.normalizados[nodo.variavel.simbolo], ast.Store())
+        corpo = yield nodo.corpo
+        return ast.For(alvo, intervalo, corpo, [], **posicao)
+
+    # Mesmo código que a regra 31 do SemanticoCria gera em texto:
+    #   if -m <= inicio <= m and ...:      (só se o laço tem limite)
+    #       for _bloco in range(inicio, fim, k * TAMANHO_BLOCO_VETOR):
+    #           v = _np.arange(_bloco, min(_bloco + ..., fim), k, dtype=_np.int64)
+    #           acc = acc + int((expressao).sum())
+    #   else:
+    #       laço original
+    def visitar_para_vetorizado(self, nodo):
+        posicao = self.em(nodo.linha)
+        faixa = []
+        for expressao in nodo.guardadas:
+            faixa.append((yield expressao))
+        inicio = yield nodo.inicio
+        fim = yield nodo.fim
+        reducoes = []
+        for alvo, operador, expressao in nodo.reducoes:
+            reducoes.append((self.normalizados[alvo.simbolo], operador, (yield expressao)))
+        escalar = None if nodo.limite is None else (yield nodo.escalar)
+        self.posicao = posicao
+        self.usa_numpy = True
+        passo = nodo.passo
+        bloco = TAMANHO_BLOCO_VETOR * passo
+        numpy = self.nome('_np', ast.Load())
+        limite_bloco = ast.BinOp(self.nome('_bloco', ast.Load()), ast.Add() if passo > 0 else ast.Sub(),
+                                 ast.Constant(abs(bloco), **posicao), **posicao)
+        argumentos = [self.nome('_bloco', ast.Load()),
+                      ast.Call(self.nome('min' if passo > 0 else 'max', ast.Load()),
+                               [limite_bloco, copy.deepcopy(fim)], [], **posicao)]
+        if passo != 1:
+            argumentos.append(ast.Constant(passo, **posicao))
+        tipo = ast.keyword('dtype', ast.Attribute(copy.deepcopy(numpy), 'int64', ast.Load(), **posicao), **posicao)
+        valores = ast.Call(ast.Attribute(numpy, 'arange', ast.Load(), **posicao), argumentos, [tipo], **posicao)
+        corpo = [ast.Assign([self.nome(self.normalizados[nodo.variavel.simbolo], ast.Store())], valores, **posicao)]
+        for acumulador, operador, valor in reducoes:
+            juntado = ast.Call(ast.Attribute(valor, REDUCOES[operador], ast.Load(), **posicao), [], [], **posicao)
+            total = ast.Call(self.nome('int', ast.Load()), [juntado], [], **posicao)
+            novo = ast.BinOp(self.nome(acumulador, ast.Load()), OPERADORES_AST[operador](), total, **posicao)
+            corpo.append(ast.Assign([self.nome(acumulador, ast.Store())], novo, **posicao))
+        intervalo = ast.Call(self.nome('range', ast.Load()), [inicio, fim, ast.Constant(bloco, **posicao)], [],
+                             **posicao)
+        laco = ast.For(self.nome('_bloco', ast.Store()), intervalo, corpo, [], **posicao)
+        if nodo.limite is None:
+            return laco
+        comparacoes = [ast.Compare(ast.Constant(-nodo.limite, **posicao), [ast.LtE(), ast.LtE()],
+                                   [valor, ast.Constant(nodo.limite, **posicao)], **posicao) for valor in faixa]
+        condicao = comparacoes[0] if len(comparacoes) == 1 else ast.BoolOp(ast.And(), comparacoes, **posicao)
+        return ast.If(condicao, [laco], [escalar], **posicao)
+
+    # x = int(input('Informe a variável x: ')), ou float(...) se x recebe
+    # float; com io_rapido, x = int(_ler())
+    def visitar_ler(self, nodo):
+        posicao = self.em(nodo.linha)
+        nome = self.normalizados[nodo.variavel.simbolo]
+        self.usa_entrada = True
+        if self.io_rapido:
+            pergunta = ast.Call(self.nome('_ler', ast.Load()), [], [], **posicao)
+        else:
+            pergunta = ast.Call(self.nome('input', ast.Load()),
+                                [ast.Constant(f'Informe a variável {nome}: ', **posicao)], [], **posicao)
+        conversao = 'float' if self.tipos.le_real(nome) else 'int'
+        valor = ast.Call(self.nome(conversao, ast.Load()), [pergunta], [], **posicao)
+        return ast.Assign([self.nome(nome, ast.Store())], valor, **posicao)
+
+    def visitar_escrever(self, nodo):
+        posicao = self.em(nodo.linha)
+        if isinstance(nodo.valor, Texto):
+            valor = ast.Constant(valor_texto(nodo.valor.lexema), **posicao)
+        else:
+            valor = yield nodo.valor
+        self.posicao = posicao
+        self.usa_saida = True
+        chamada = ast.Call(self.nome('_fala' if self.io_rapido else 'print', ast.Load()), [valor], [], **posicao)
+        return ast.Expr(chamada, **posicao)
+
+    def visitar_variavel(self, nodo):
+        self.em(nodo.linha)
+        return self.nome(self.normalizados[nodo.simbolo], ast.Load())
+
+    def visitar_numero(self, nodo):
+        return ast.Constant(valor_numero(nodo.lexema), **self.posicao)
+
+    def visitar_constante(self, nodo):
+        return ast.Constant(nodo.valor, **self.posicao)
+
+    def visitar_parenteses(self, nodo):
+        return (yield nodo.expressao)
+
+    def visitar_binaria(self, nodo):
+        esquerda = yield nodo.esquerda
+        direita = yield nodo.direita
+        if nodo.operador in COMPARACOES_AST:
+            return ast.Compare(esquerda, [COMPARACOES_AST[nodo.operador]()], [direita], **self.posicao)
+        if nodo.operador is TokenType.T_DIVIDIDO:
+            divisao = self.tipos.divisao(nodo)
+            if divisao not in DIVISOES_AST:
+                self.usa_dividir = True
+                return ast.Call(self.nome('_dividir', ast.Load()), [esquerda, direita], [], **self.posicao)
+            return ast.BinOp(esquerda, DIVISOES_AST[divisao](), direita, **self.posicao)
+        return ast.BinOp(esquerda, OPERADORES_AST[nodo.operador](), direita, **self.posicao)
@@ -0,0 +1,76 @@
+import sys
+
+# Entrada e saída rápidas (--io-rapido), para programas que não são
+# interativos, como os que rodam em lote com a entrada e a saída
+# redirecionadas. O OLHA não mostra a pergunta e não chama input(): a
+# entrada padrão inteira é lida de uma vez pelo sys.stdin.buffer, na
+# primeira leitura, e cada OLHA pega o próximo valor dela (separados por
+# espaços ou linhas, como o int() e o float() aceitam); quando os valores
+# acabam ele dá EOFError, como o input(). O FALA não chama
+# print(): as linhas vão para uma lista, escrita com um sys.stdout.write só
+# a cada INTERVALO_DESPEJO linhas e no fim do programa, mesmo se ele parar
+# num erro. Sem a opção o programa gerado continua interativo.
+
+INTERVALO_DESPEJO = 4096  # Linhas do FALA juntadas antes de cada sys.stdout.write
+
+IMPORT_SYS = "import sys\n"
+
+# Funções do FALA no código gerado, no começo do módulo
+CODIGO_SAIDA_RAPIDA = f'''_saida = []
+
+def _fala(valor):
+    _saida.append(f'{{valor}}\\n')
+    if len(_saida) >= {INTERVALO_DESPEJO}:
+        _despejar()
+
+def _despejar():
+    sys.stdout.write(''.join(_saida))
+    _saida.clear()
+'''
+
+# Função do OLHA no código gerado, no começo do módulo
+CODIGO_ENTRADA_RAPIDA = '''_entrada = None
+
+def _ler():
+    global _entrada
+    if _entrada is None:
+        _entrada = iter(sys.stdin.buffer.read().split())
+    for valor in _entrada:
+        return valor
+    raise EOFError('EOF when reading a line')
+'''
+
+# Chamada de main() que escreve o resto da saída no fim
+CODIGO_CHAMADA_RAPIDA = '''if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        _despejar()
+'''
+
+# Como CODIGO_ENTRADA_RAPIDA, para a maquina.py: ler() devolve o próximo
+# valor da entrada padrão, lida inteira na primeira chamada
+class EntradaRapida:
+    def __init__(self):
+        self.valores = None
+
+    def ler(self, _pergunta=''):
+        if self.valores is None:
+            self.valores = iter(sys.stdin.buffer.read().split())
+        for valor in self.valores:
+            return valor
+        raise EOFError('EOF when reading a line')
+
+# Como CODIGO_SAIDA_RAPIDA, para a maquina.py
+class SaidaRapida:
+    def __init__(self):
+        self.linhas = []
+
+    def escrever(self, valor):
+        self.linhas.append(f'{valor}\n')
+        if len(self.linhas) >= INTERVALO_DESPEJO:
+            self.despejar()
+
+    def despejar(self):
+        sys.stdout.write(''.join(self.linhas))
+        self.linhas.clear()
@@ -0,0 +1,273 @@
+from arvore import (Atribuicao, Binaria, Bloco, Constante, Enquanto, Ler, Para, ParaIntervalo, Parenteses, Programa,
+                    Se, Variavel, Visitante)
+from otimizador import (EliminadorCodigoMorto, atribuicoes_por_bloco, blocos_internos, calcular, nomes_usados,
+                        valor_constante)
+from tokens import TokenType
+
+# Tradução do MANDALEMBRAR para os laços do Python, feita depois do
+# otimizador e antes dos dois geradores de código. O MANDALEMBRAR
+# (v <- inicio; condicao; alvo <- incremento) é o for do C: v recebe o
+# início e, enquanto a condição vale, roda o corpo e depois o incremento.
+#
+# Quando v é uma variável de indução afim (o incremento é "v <- v + k" ou
+# "v <- v - k" com k inteiro constante, e o corpo não muda v) e a condição
+# compara v com um limite que o corpo não muda, o laço vira
+# "for v in range(inicio, fim, k)", o mais rápido que o CPython tem:
+#   v < b  (k > 0)  ->  range(inicio, b, k)
+#   v <= b (k > 0)  ->  range(inicio, b + 1, k)
+#   v > b  (k < 0)  ->  range(inicio, b, k)
+#   v >= b (k < 0)  ->  range(inicio, b - 1, k)
+#   v <> b          ->  range(inicio, b, k), com início e limite constantes
+#                       e b alcançado a partir do início em passos de k
+# O início e o limite têm que ser int (o range() não aceita float), o que é
+# provado pelas atribuições do programa (ver variaveis_inteiras). Depois do
+# for, v fica com o último valor da volta, e não com o primeiro que falhou a
+# condição; se esse valor ainda pode ser lido (v viva na saída do laço, pela
+# análise de vivacidade do otimizador), ele é atribuído depois do for quando
+# é conhecido na compilação, ou o laço fica como while. Tudo o que
+# não dá para provar vira o while equivalente:
+#   v = inicio
+#   while condicao:
+#       corpo
+#       alvo = incremento
+
+# Condição com os lados trocados: "b > v" é "v < b"
+ESPELHADA = {
+    TokenType.T_MAIOR: TokenType.T_MENOR, TokenType.T_MENOR: TokenType.T_MAIOR,
+    TokenType.T_MAIOR_IGUAL: TokenType.T_MENOR_IGUAL, TokenType.T_MENOR_IGUAL: TokenType.T_MAIOR_IGUAL,
+    TokenType.T_IGUAL: TokenType.T_IGUAL, TokenType.T_DIFERENTE: TokenType.T_DIFERENTE,
+}
+
+# Operações cujo resultado é int quando os dois operandos são
+OPERACOES_INTEIRAS = frozenset({TokenType.T_MAIS, TokenType.T_MENOS, TokenType.T_VEZES, TokenType.T_DIVIDIDO,
+                                TokenType.T_RESTO})
+
+def sem_parenteses(nodo):
+    while nodo.__class__ is Parenteses:
+        nodo = nodo.expressao
+    return nodo
+
+# Nomes das variáveis de uma expressão que certamente é int se elas forem
+# int, ou None se ela pode não ser (constante float, comparação, potência
+# com expoente que não é uma constante inteira não negativa)
+def nomes_se_inteira(expressao, normalizados):
+    nomes = set()
+    pendentes = [expressao]
+    while pendentes:
+        nodo = sem_parenteses(pendentes.pop())
+        classe = nodo.__class__
+        if classe is Variavel:
+            nomes.add(normalizados[nodo.simbolo])
+        elif classe is Binaria:
+            if nodo.operador in OPERACOES_INTEIRAS:
+                pendentes.append(nodo.direita)
+            elif nodo.operador is TokenType.T_ELEVADO:
+                expoente = valor_constante(sem_parenteses(nodo.direita))
+                if type(expoente) is not int or expoente < 0:
+                    return None
+            else:
+                return None
+            pendentes.append(nodo.esquerda)
+        elif type(valor_constante(nodo)) is not int:
+            return None
+    return nomes
+
+# Comandos do programa, com os dos blocos internos
+def comandos_do_programa(programa):
+    pendentes = [programa.bloco]
+    while pendentes:
+        bloco = pendentes.pop()
+        yield from bloco.comandos
+        pendentes.extend(blocos_internos(bloco))
+
+# Nomes Python que só recebem valores int no programa: a declaração dá 0,
+# o OLHA dá int(...), o for de um range() dá int e uma atribuição (ou o início e o incremento do
+# MANDALEMBRAR) dá int se a expressão é int com as variáveis que usa. Um nome
+# cuja atribuição pode não ser int contamina os que dependem dele, numa
+# lista de trabalho.
+def variaveis_inteiras(programa):
+    nomes = programa.identificadores.nomes
+    normalizados = programa.identificadores.normalizados
+    atribuidos = {nomes[declaracao.simbolo] for declaracao in programa.declaracoes}
+    valores = []  # (nome, expressão atribuída)
+    for comando in comandos_do_programa(programa):
+        classe = comando.__class__
+        if classe is Atribuicao:
+            valores.append((normalizados[comando.alvo.simbolo], comando.valor))
+        elif classe is Ler or classe is ParaIntervalo:
+            atribuidos.add(normalizados[comando.variavel.simbolo])
+        elif classe is Para:
+            valores.append((normalizados[comando.variavel.simbolo], comando.inicio))
+            valores.append((normalizados[comando.alvo_incremento.simbolo], comando.incremento))
+    atribuidos.update(nome for nome, _ in valores)
+    dependentes = {}  # Nome -> nomes cujo valor depende dele
+    pendentes = []  # Nomes que podem receber algo que não é int
+    for nome, valor in valores:
+        usados = nomes_se_inteira(valor, normalizados)
+        if usados is None or not usados <= atribuidos:
+            pendentes.append(nome)
+            continue
+        for usado in usados:
+            dependentes.setdefault(usado, []).append(nome)
+    nao_inteiras = set()
+    while pendentes:
+        nome = pendentes.pop()
+        if nome not in nao_inteiras:
+            nao_inteiras.add(nome)
+            pendentes.extend(dependentes.get(nome, ()))
+    return atribuidos - nao_inteiras
+
+# Se o nodo é um uso da variável de nome Python informado
+def e_variavel(nodo, nome, normalizados):
+    return nodo.__class__ is Variavel and normalizados[nodo.simbolo] == nome
+
+# Passo k do incremento "v + k", "k + v" ou "v - k" (k inteiro constante
+# diferente de 0), ou None se o incremento não tem essa forma
+def passo_do_incremento(incremento, variavel, normalizados):
+    incremento = sem_parenteses(incremento)
+    if incremento.__class__ is not Binaria or incremento.operador not in (TokenType.T_MAIS, TokenType.T_MENOS):
+        return None
+    esquerda = sem_parenteses(incremento.esquerda)
+    direita = sem_parenteses(incremento.direita)
+    if e_variavel(esquerda, variavel, normalizados):
+        passo = valor_constante(direita)
+    elif incremento.operador is TokenType.T_MAIS and e_variavel(direita, variavel, normalizados):
+        passo = valor_constante(esquerda)
+    else:
+        return None
+    if type(passo) is not int or passo == 0:
+        return None
+    return -passo if incremento.operador is TokenType.T_MENOS else passo
+
+# limite + desvio, calculado na compilação quando o limite é constante
+def deslocar(limite, desvio):
+    valor = valor_constante(limite)
+    if valor is not None:
+        resultado = calcular(TokenType.T_MAIS, valor, desvio)
+        if resultado is not None:
+            return Constante(resultado)
+    if desvio > 0:
+        return Binaria(TokenType.T_MAIS, limite, Constante(desvio))
+    return Binaria(TokenType.T_MENOS, limite, Constante(-desvio))
+
+class TradutorLacos(Visitante):
+    def __init__(self, identificadores):
+        self.identificadores = identificadores
+        self.normalizados = identificadores.normalizados
+        self.programa = None
+        self.inteiras = set()  # Nomes que só recebem int (ver variaveis_inteiras)
+        self.range_atribuido = False  # Se o programa tem uma variável chamada range
+        self.atribuidas = {}  # id(bloco) -> nomes Python que recebem valor no bloco
+        self.vivacidade = None  # EliminadorCodigoMorto com as variáveis vivas, calculadas quando preciso
+
+    # Árvore com cada MANDALEMBRAR trocado por um ParaIntervalo ou um while
+    def traduzir(self, arvore):
+        return self.visitar(arvore)
+
+    # Se o valor da variável pode ser lido depois que o laço termina
+    def viva_depois(self, laco, variavel):
+        if self.vivacidade is None:
+            self.vivacidade = EliminadorCodigoMorto(self.identificadores, [])
+            self.vivacidade.analisar(self.programa)
+        return variavel in self.vivacidade.vivas_depois_do_laco(laco)
+
+    # (fim, passo) do range() equivalente ao laço, ou None se não dá para provar
+    def intervalo(self, nodo, variavel):
+        normalizados = self.normalizados
+        atribuidas = self.atribuidas[id(nodo.corpo)]
+        if (self.range_atribuido or normalizados[nodo.alvo_incremento.simbolo] != variavel
+                or variavel in atribuidas):
+            return None
+        passo = passo_do_incremento(nodo.incremento, variavel, normalizados)
+        condicao = sem_parenteses(nodo.condicao)
+        if passo is None or condicao.__class__ is not Binaria:
+            return None
+        if e_variavel(sem_parenteses(condicao.esquerda), variavel, normalizados):
+            operador, limite = condicao.operador, condicao.direita
+        elif e_variavel(sem_parenteses(condicao.direita), variavel, normalizados):
+            operador, limite = ESPELHADA.get(condicao.operador), condicao.esquerda
+        else:
+            return None
+        usados = nomes_usados(limite, normalizados)
+        if variavel in usados or usados & atribuidas:
+            return None
+        for expressao in (nodo.inicio, limite):
+            usados = nomes_se_inteira(expressao, normalizados)
+            if usados is None or not usados <= self.inteiras:
+                return None
+        limite = sem_parenteses(limite)
+        if operador is TokenType.T_MENOR and passo > 0 or operador is TokenType.T_MAIOR and passo < 0:
+            return limite, passo
+        if operador is TokenType.T_MENOR_IGUAL and passo > 0:
+            return deslocar(limite, 1), passo
+        if operador is TokenType.T_MAIOR_IGUAL and passo < 0:
+            return deslocar(limite, -1), passo
+        if operador is TokenType.T_DIFERENTE:
+            inicio = valor_constante(sem_parenteses(nodo.inicio))
+            fim = valor_constante(limite)
+            if inicio is not None and fim is not None and (fim - inicio) % passo == 0 and (fim - inicio) // passo >= 0:
+                return limite, passo
+        return None
+
+    def visitar_programa(self, nodo):
+        self.programa = nodo
+        self.inteiras = variaveis_inteiras(nodo)
+        self.atribuidas = atribuicoes_por_bloco(nodo.bloco, self.normalizados)
+        nomes = nodo.identificadores.nomes
+        self.range_atribuido = 'range' in self.atribuidas[id(nodo.bloco)] or any(
+            nomes[declaracao.simbolo] == 'range' for declaracao in nodo.declaracoes)
+        bloco = yield nodo.bloco
+        return Programa(nodo.declaracoes, bloco, nodo.identificadores)
+
+    # Um laço traduzido pode voltar como um Bloco, cujos comandos entram no lugar dele
+    def visitar_bloco(self, nodo):
+        comandos = []
+        for comando in nodo.comandos:
+            traduzido = yield comando
+            if traduzido.__class__ is Bloco:
+                comandos.extend(traduzido.comandos)
+            else:
+                comandos.append(traduzido)
+        return Bloco(comandos)
+
+    def visitar_atribuicao(self, nodo):
+        return nodo
+
+    def visitar_ler(self, nodo):
+        return nodo
+
+    def visitar_escrever(self, nodo):
+        return nodo
+
+    def visitar_se(self, nodo):
+        entao = yield nodo.entao
+        senao = None if nodo.senao is None else (yield nodo.senao)
+        return Se(nodo.condicao, entao, senao, nodo.linha)
+
+    def visitar_enquanto(self, nodo):
+        corpo = yield nodo.corpo
+        return Enquanto(nodo.condicao, corpo, nodo.linha)
+
+    def visitar_para(self, nodo):
+        corpo = yield nodo.corpo
+        variavel = self.normalizados[nodo.variavel.simbolo]
+        intervalo = self.intervalo(nodo, variavel)
+        if intervalo is not None:
+            fim, passo = intervalo
+            laco = ParaIntervalo(nodo.variavel, nodo.inicio, fim, passo, corpo, nodo.linha)
+            if not self.viva_depois(nodo, variavel):
+                return laco
+            # Valor de v depois do while: o início mais as voltas dadas vezes o passo
+            inicio = valor_constante(sem_parenteses(nodo.inicio))
+            limite = valor_constante(fim)
+            if type(inicio) is int and type(limite) is int:
+                voltas = max(0, -((inicio - limite) // passo))
+                return Bloco([laco, Atribuicao(nodo.variavel, Constante(inicio + voltas * passo), nodo.linha)])
+        incremento = Atribuicao(nodo.alvo_incremento, nodo.incremento, nodo.linha)
+        return Bloco([Atribuicao(nodo.variavel, nodo.inicio, nodo.linha),
+                      Enquanto(nodo.condicao, Bloco(corpo.comandos + [incremento]), nodo.linha)])
+
+# Árvore de um programa conferido (e otimizado, se for o caso) com os
+# MANDALEMBRAR traduzidos para range() ou while
+def traduzir_lacos(arvore):
+    return TradutorLacos(arvore.identificadores).traduzir(arvore)
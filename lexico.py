@@ -1,44 +1,9 @@
+import re
 import sys
-from enum import Enum, auto
-
-# Definição da enumeração para tipos de tokens
-class TokenType(Enum):
-    T_ENOIS         = auto()  # Token para a palavra reservada "ÉNOIS"
-    T_PARTIU        = auto()  # Token para a palavra reservada "PARTIU"
-    T_BAGULHOS      = auto()  # Token para a palavra reservada "BAGULHOS"
-    T_VIRGULA       = auto()  # Token para o símbolo de vírgula
-    T_PONTO_VIRGULA = auto()  # Token para o símbolo de ponto e vírgula
-    T_SEPA          = auto()  # Token para a palavra reservada "SEPA"
-    T_NAOFOI        = auto()  # Token para a palavra reservada "NÃOFOI"
-    T_FIMSEPA       = auto()  # Token para a palavra reservada "FIMSEPA"
-    T_MANDAENQUANTO = auto()  # Token para a palavra reservada "MANDAENQUANTO"
-    T_PARAMANDA     = auto()  # Token para a palavra reservada "PARAMANDA"
-    T_MANDALEMBRAR  = auto()  # Token para a palavra reservada "MANDALEMBRAR"
-    T_SETA          = auto()  # Token para o símbolo de atribuição "<-"
-    T_ATEALILA      = auto()  # Token para a palavra reservada "ATEALILA"
-    T_DESENCANA     = auto()  # Token para a palavra reservada "DESENCANA"
-    T_OLHA          = auto()  # Token para a palavra reservada "OLHA"
-    T_ABRE_PAR      = auto()  # Token para o símbolo de abertura de parênteses
-    T_FECHA_PAR     = auto()  # Token para o símbolo de fechamento de parênteses
-    T_FALA          = auto()  # Token para a palavra reservada "FALA"
-    T_MAIOR         = auto()  # Token para o operador relacional ">"
-    T_MENOR         = auto()  # Token para o operador relacional "<"
-    T_MAIOR_IGUAL   = auto()  # Token para o operador relacional ">="
-    T_MENOR_IGUAL   = auto()  # Token para o operador relacional "<="
-    T_IGUAL         = auto()  # Token para o operador relacional "=="
-    T_DIFERENTE     = auto()  # Token para o operador relacional "<>"
-    T_MAIS          = auto()  # Token para o operador aritmético "+"
-    T_MENOS         = auto()  # Token para o operador aritmético "-"
-    T_VEZES         = auto()  # Token para o operador aritmético "*"
-    T_DIVIDIDO      = auto()  # Token para o operador aritmético "/"
-    T_RESTO         = auto()  # Token para o operador aritmético "%"
-    T_ELEVADO       = auto()  # Token para o operador aritmético "**"
-    T_NUMERO        = auto()  # Token para números (inteiros ou decimais)
-    T_ID            = auto()  # Token para identificadores (nomes de variáveis)
-    T_STRING        = auto()  # Token para strings literais
-    T_FIM_FONTE     = auto()  # Token para o fim do arquivo fonte
-    T_ERRO_LEX      = auto()  # Token para erros léxicos
-    T_NULO          = auto()  # Token para valor nulo
+from array import array
+from bisect import bisect_right
+
+from tokens import LIMITE_ERROS, BufferTokens, EscritorLexBinario, Token, TokenType, codificar_lex_binario
 
 # Dicionário de palavras reservadas mapeadas para seus respectivos tipos de token
 PALAVRAS_RESERVADAS = {
@@ -80,214 +45,482 @@ DUAL_SYMBOLS = {
     '==' : TokenType.T_IGUAL
 }
 
-# Classe que representa um token com tipo, lexema, linha e coluna
-class Token:
-    def __init__(self, tipo: TokenType, lexema, linha, coluna):
+# Código fonte inteiro em um único buffer. O índice com o offset de início de
+# cada linha só é montado na primeira vez que uma posição é pedida, e linha e
+# coluna de um offset saem de uma busca binária nesse índice.
+class FonteCria:
+    __slots__ = ('texto', 'nome', 'inicios', 'linha_inicial')
+
+    def __init__(self, texto, nome='<fonte>', linha_inicial=1):
+        self.texto = texto
+        self.nome = nome
+        self.inicios = None  # Offsets de início de linha (array('I')), montado sob demanda
+        # Número da primeira linha do texto (maior que 1 quando o texto é só
+        # um trecho de um documento maior, como no servidor de linguagem)
+        self.linha_inicial = linha_inicial
+
+    # Monta o índice de inícios de linha, se ainda não existir
+    def indice_linhas(self):
+        if self.inicios is None:
+            texto = self.texto
+            inicios = array('I', [0])
+            i = texto.find('\n')
+            while i != -1:
+                inicios.append(i + 1)
+                i = texto.find('\n', i + 1)
+            self.inicios = inicios
+        return self.inicios
+
+    # Converte um offset em (linha, coluna), ambos começando em 1
+    def posicao(self, offset):
+        inicios = self.indice_linhas()
+        indice = bisect_right(inicios, offset) - 1
+        return indice + self.linha_inicial, offset - inicios[indice] + 1
+
+    # Linha do token de fim de fonte: uma depois da última linha do arquivo
+    def linha_fim_fonte(self):
+        linhas = len(self.indice_linhas())
+        # Um arquivo que termina com quebra de linha não tem a última linha vazia
+        if not self.texto or self.texto.endswith('\n'):
+            linhas -= 1
+        return linhas + self.linha_inicial
+
+# Token que guarda só o tipo e os offsets de início e fim na fonte. Lexema,
+# linha e coluna são resolvidos a partir da FonteCria apenas quando usados.
+class TokenOffset:
+    __slots__ = ('tipo', 'inicio', 'fim', 'fonte')
+
+    def __init__(self, tipo: TokenType, inicio, fim, fonte):
         self.tipo = tipo
-        self.lexema = lexema
-        self.linha = linha
-        self.coluna = coluna
+        self.inicio = inicio
+        self.fim = fim
+        self.fonte = fonte
+
+    @property
+    def lexema(self):
+        if self.tipo == TokenType.T_FIM_FONTE:
+            return '<EOF>'
+        texto = self.fonte.texto
+        # Strings começam nas aspas, mas o lexema não as inclui
+        if texto[self.inicio] == '"':
+            if self.tipo == TokenType.T_STRING:
+                return texto[self.inicio+1:self.fim-1]
+            return texto[self.inicio+1:self.fim]
+        return texto[self.inicio:self.fim]
+
+    @property
+    def linha(self):
+        return self.posicao()[0]
 
-    # Método para formatar a representação em string do token
+    @property
+    def coluna(self):
+        return self.posicao()[1]
+
+    # Linha e coluna do início do token
+    def posicao(self):
+        if self.tipo == TokenType.T_FIM_FONTE:
+            return self.fonte.linha_fim_fonte(), 1
+        return self.fonte.posicao(self.inicio)
+
+    # Mesmo formato de Token.__str__, resolvendo a posição uma única vez
     def __str__(self):
-        return f"{self.tipo.name} | {self.lexema} | linha {self.linha} | coluna {self.coluna}"
+        linha, coluna = self.posicao()
+        return f"{self.tipo.name} | {self.lexema} | linha {linha} | coluna {coluna}"
+
+# Símbolos relacionais de um caractere que não estão em SINGLE_SYMBOLS
+RELACIONAIS_UNITARIOS = {
+    '>' : TokenType.T_MAIOR,
+    '<' : TokenType.T_MENOR,
+    '=' : TokenType.T_IGUAL,
+}
+
+# Tabela única de símbolos consultada pelo scanner (lexema -> tipo de token)
+SIMBOLOS = {**SINGLE_SYMBOLS, **RELACIONAIS_UNITARIOS, **DUAL_SYMBOLS}
+
+# Expressão regular mestre montada a partir das tabelas acima. Os símbolos são
+# ordenados do maior para o menor para que "<-" tenha prioridade sobre "<".
+_ALTERNATIVAS_SIMBOLOS = '|'.join(re.escape(s) for s in sorted(SIMBOLOS, key=len, reverse=True))
+PADRAO_TOKEN = re.compile(
+    r'\s*(?:'
+    r'(?P<id>[^\W\d_]\w*)'
+    r'|(?P<numero>\d+(?:\.\d*)?)'
+    r'|"(?P<string>[^"]*)(?P<fecha>"?)'
+    r'|(?P<simbolo>' + _ALTERNATIVAS_SIMBOLOS + r')'
+    r'|(?P<outro>\S)'
+    r')'
+)
+
+# Emula a regra original para caracteres Unicode que a expressão regular não
+# classifica da mesma forma (dígitos não decimais como "²" continuam números e
+# numerais que não são letras, como "½", são inválidos). Retorna tipo e fim.
+def escanear_caractere_especial(texto, inicio):
+    n = len(texto)
+    if not texto[inicio].isdigit():
+        return TokenType.T_ERRO_LEX, inicio + 1
+    fim = inicio
+    while fim < n and texto[fim].isdigit():
+        fim += 1
+    if fim < n and texto[fim] == '.':
+        fim += 1
+        while fim < n and texto[fim].isdigit():
+            fim += 1
+    return TokenType.T_NUMERO, fim
+
+# Índice do fim da linha (da quebra de linha ou do fim do texto) a partir de inicio
+def fim_da_linha(texto, inicio):
+    fim = texto.find('\n', inicio)
+    return len(texto) if fim == -1 else fim
+
+# Quantidade de caracteres lidos da fonte por vez
+TAMANHO_BLOCO = 1 << 16
 
 # Classe responsável pela análise léxica do código fonte
 class LexicoCria:
-    def __init__(self, fonte):
-        # Inicializa o analisador léxico com o arquivo fonte
+    def __init__(self, fonte, offsets=False, limite_erros=LIMITE_ERROS):
+        # Fonte: caminho do arquivo, "-" para a entrada padrão, um arquivo já
+        # aberto em modo texto ou um FonteCria com o código já em memória
         self.fonte = fonte
-        self.linhas = []
-        # Lê todas as linhas do arquivo fonte
-        with open(fonte, encoding="utf-8") as f:
-            self.linhas = f.readlines()
-        self.linha = 0  # Linha atual no arquivo
-        self.coluna = 0  # Coluna atual na linha
-        self.atual = ''  # Caractere atual sendo processado
-        self.fim = False  # Indicador de fim do arquivo
-        self.tokens = []  # Lista para armazenar os tokens gerados
-        self.erro = None  # Armazena mensagem de erro léxico, se houver
-
-    # Avança para o próximo caractere no arquivo fonte
-    def avancar(self):
-        if self.fim:
-            self.atual = ''
-            return
-        if self.linha >= len(self.linhas):
-            self.atual = ''
-            self.fim = True
-            return
-        if self.coluna >= len(self.linhas[self.linha]):
-            self.linha += 1
-            self.coluna = 0
-            if self.linha >= len(self.linhas):
-                self.atual = ''
-                self.fim = True
-                return
-        if self.linha < len(self.linhas) and self.coluna < len(self.linhas[self.linha]):
-            self.atual = self.linhas[self.linha][self.coluna]
-            self.coluna += 1
+        # Com offsets=True a fonte é lida para um único buffer (self.buffer) e
+        # os tokens gerados são TokenOffset, sem lexema nem posição copiados
+        self.offsets = offsets
+        self.buffer = None
+        self.erros = []  # Mensagens dos erros léxicos, na ordem da fonte
+        self.limite_erros = limite_erros  # Quantos erros listar (None: todos)
+        self.gerador = None  # Gerador usado por proximo_token
+        self.fim_fonte = None  # Token de fim de fonte, repetido por proximo_token ao terminar
+
+    # Primeiro erro léxico (None se não houve nenhum)
+    @property
+    def erro(self):
+        return self.erros[0] if self.erros else None
+
+    # Guarda a mensagem de um erro léxico. Passado o limite, os demais erros
+    # não são listados, mas a análise continua até o fim da fonte.
+    def registrar_erro(self, mensagem):
+        if self.limite_erros is None or len(self.erros) < self.limite_erros:
+            self.erros.append(mensagem)
+        elif len(self.erros) == self.limite_erros:
+            self.erros.append(f"Erro Léxico: mais de {self.limite_erros} erros, os demais não foram listados")
+
+    # Nome da fonte usado nas mensagens e no arquivo .lex
+    def nome_fonte(self):
+        if isinstance(self.fonte, FonteCria):
+            return self.fonte.nome
+        if isinstance(self.fonte, str):
+            return '<stdin>' if self.fonte == '-' else self.fonte
+        return getattr(self.fonte, 'name', '<stdin>')
+
+    # Gera os tokens da fonte sob demanda, até o fim do arquivo. Cada erro
+    # léxico vira um token T_ERRO_LEX e a análise continua logo depois dele
+    # (ver registrar_erro). A fonte é lida em blocos, então a memória usada
+    # não depende do tamanho do arquivo, e quem consome pode parar a qualquer
+    # momento.
+    def iter_tokens(self):
+        if self.offsets or isinstance(self.fonte, FonteCria):
+            yield from self.tokenizar_offsets(self.carregar_buffer())
+        elif not isinstance(self.fonte, str):
+            yield from self.tokenizar(self.fonte)
+        elif self.fonte == '-':
+            yield from self.tokenizar(sys.stdin)
         else:
-            self.atual = ''
-            self.fim = True
-
-    # Retorna o próximo caractere sem avançar a posição
-    def look(self):
-        if self.fim or self.linha >= len(self.linhas):
-            return ''
-        if self.coluna < len(self.linhas[self.linha]):
-            return self.linhas[self.linha][self.coluna]
-        return ''
-
-    # Gera o próximo token a partir do código fonte
-    def proximo_token(self):
-        # Ignora espaços em branco e caracteres vazios
-        while not self.fim and (self.atual.isspace() or self.atual == ''):
-            self.avancar()
-
-        # Se chegou ao fim do arquivo, retorna token de fim de fonte
-        if self.fim:
-            return Token(TokenType.T_FIM_FONTE, '<EOF>', self.linha+1, self.coluna+1)
-
-        inicio_linha = self.linha
-        inicio_coluna = self.coluna
-
-        # --- SUPORTE A STRING LITERAL ---
-        # Processa strings literais delimitadas por aspas
-        if self.atual == '"':
-            lex = ''
-            inicio_linha_str = self.linha
-            inicio_coluna_str = self.coluna
-            self.avancar()
-            while not self.fim and self.atual != '"':
-                lex += self.atual
-                self.avancar()
-            if self.atual == '"':
-                self.avancar()
-                return Token(TokenType.T_STRING, lex, inicio_linha_str+1, inicio_coluna_str)
-            self.erro = f"Erro Léxico: String não fechada (linha {inicio_linha_str+1}, coluna {inicio_coluna_str})"
-            return Token(TokenType.T_ERRO_LEX, lex, inicio_linha_str+1, inicio_coluna_str)
-
-        # Identificador ou palavra reservada
-        if (self.atual.isalpha() or self.atual in 'ÉÁÍÓÚÃÇÕÊÂÔÀÑ'):
-            lex = self.atual
-            self.avancar()
-            # Continua coletando caracteres válidos para identificadores
-            while not self.fim and (self.atual.isalnum() or self.atual == '_' or self.atual in 'ÇÃÕÉÍÓÚÊÂÔÀÑ'):
-                lex += self.atual
-                self.avancar()
-            # Verifica se é uma palavra reservada ou um identificador
-            tipo_token = PALAVRAS_RESERVADAS.get(lex.upper(), TokenType.T_ID)
-            return Token(tipo_token, lex, inicio_linha+1, inicio_coluna)
-
-        # Número (inteiro ou decimal)
-        if self.atual.isdigit():
-            lex = self.atual
-            self.avancar()
-            # Coleta dígitos para números inteiros
-            while not self.fim and self.atual.isdigit():
-                lex += self.atual
-                self.avancar()
-            # Verifica se há parte decimal
-            if not self.fim and self.atual == '.':
-                lex += self.atual
-                self.avancar()
-                while not self.fim and self.atual.isdigit():
-                    lex += self.atual
-                    self.avancar()
-            return Token(TokenType.T_NUMERO, lex, inicio_linha+1, inicio_coluna)
-
-        # Símbolos de dois caracteres
-        lookahead = self.look()
-        if self.atual + lookahead in DUAL_SYMBOLS:
-            lex = self.atual + lookahead
-            tipo_token = DUAL_SYMBOLS[lex]
-            self.avancar()
-            self.avancar()
-            return Token(tipo_token, lex, inicio_linha+1, inicio_coluna)
-
-        # Símbolos de um caractere
-        if self.atual in SINGLE_SYMBOLS:
-            tipo_token = SINGLE_SYMBOLS[self.atual]
-            lex = self.atual
-            self.avancar()
-            return Token(tipo_token, lex, inicio_linha+1, inicio_coluna)
-
-        # Operadores relacionais unitários e símbolos compostos
-        if self.atual == '>':
-            self.avancar()
-            if self.atual == '=':
-                self.avancar()
-                return Token(TokenType.T_MAIOR_IGUAL, '>=', inicio_linha+1, inicio_coluna)
-            return Token(TokenType.T_MAIOR, '>', inicio_linha+1, inicio_coluna)
-        if self.atual == '<':
-            self.avancar()
-            if self.atual == '-':
-                self.avancar()
-                return Token(TokenType.T_SETA, '<-', inicio_linha+1, inicio_coluna)
-            elif self.atual == '=':
-                self.avancar()
-                return Token(TokenType.T_MENOR_IGUAL, '<=', inicio_linha+1, inicio_coluna)
-            elif self.atual == '>':
-                self.avancar()
-                return Token(TokenType.T_DIFERENTE, '<>', inicio_linha+1, inicio_coluna)
-            return Token(TokenType.T_MENOR, '<', inicio_linha+1, inicio_coluna)
-        if self.atual == '=':
-            self.avancar()
-            if self.atual == '=':
-                self.avancar()
-                return Token(TokenType.T_IGUAL, '==', inicio_linha+1, inicio_coluna)
-            return Token(TokenType.T_IGUAL, '=', inicio_linha+1, inicio_coluna)
-
-        # Potência **
-        if self.atual == '*':
-            self.avancar()
-            if self.atual == '*':
-                self.avancar()
-                return Token(TokenType.T_ELEVADO, '**', inicio_linha+1, inicio_coluna)
-            return Token(TokenType.T_VEZES, '*', inicio_linha+1, inicio_coluna)
-
-        # Caso nenhum padrão seja reconhecido, retorna erro léxico
-        erro_lexema = self.atual
-        self.avancar()
-        self.erro = f"Erro Léxico na linha {inicio_linha+1}, coluna {inicio_coluna}: símbolo inválido: {erro_lexema}"
-        return Token(TokenType.T_ERRO_LEX, erro_lexema, inicio_linha+1, inicio_coluna)
-
-    # Executa a análise léxica completa do arquivo fonte
-    def analisar(self):
-        self.avancar()
+            with open(self.fonte, encoding="utf-8") as f:
+                yield from self.tokenizar(f)
+
+    # Aplica a expressão regular mestre sobre um buffer que é reabastecido
+    # bloco a bloco. Um casamento que chega ao fim do buffer pode estar
+    # incompleto (identificador, número, "<" de "<-" ou string sem fechar),
+    # então o buffer é estendido e o token é reconhecido de novo. Linha e
+    # coluna são calculadas contando as quebras de linha entre os tokens, e o
+    # offset somando ao índice no buffer os caracteres já descartados.
+    def tokenizar(self, arquivo):
+        ler = arquivo.read
+        casar = PADRAO_TOKEN.match
+        palavras = PALAVRAS_RESERVADAS
+        simbolos = SIMBOLOS
+        T_ID = TokenType.T_ID
+        T_NUMERO = TokenType.T_NUMERO
+        T_STRING = TokenType.T_STRING
+        T_ERRO_LEX = TokenType.T_ERRO_LEX
+        texto = ler(TAMANHO_BLOCO)  # Trecho da fonte ainda não descartado
+        fim_arquivo = not texto
+        vazio = fim_arquivo  # A fonte não tem nenhum caractere
+        posicao = 0  # Índice em texto do próximo caractere a ser examinado
+        linha = 1  # Linha (1-based) do índice contado
+        inicio_linha = 0  # Índice em texto do início da linha atual (negativo se já descartado)
+        contado = 0  # Índice em texto até onde as quebras de linha já foram contadas
+        descartados = 0  # Caracteres da fonte antes do início de texto
+
         while True:
-            token = self.proximo_token()
-            self.tokens.append(token)
-            print(token)
-            # Para quando encontra fim do arquivo ou erro léxico
-            if token.tipo == TokenType.T_FIM_FONTE or token.tipo == TokenType.T_ERRO_LEX:
+            m = casar(texto, posicao)
+            if not fim_arquivo and (m is None or m.end() == len(texto)):
+                # Descarta o que já foi consumido e lê mais um bloco (pelo
+                # menos do tamanho do buffer, para strings longas não serem
+                # reexaminadas muitas vezes)
+                quebras = texto.count('\n', contado, posicao)
+                if quebras:
+                    linha += quebras
+                    inicio_linha = texto.rfind('\n', contado, posicao) + 1
+                bloco = ler(max(TAMANHO_BLOCO, len(texto) - posicao))
+                fim_arquivo = not bloco
+                texto = texto[posicao:] + bloco
+                descartados += posicao
+                inicio_linha -= posicao
+                posicao = contado = 0
+                continue
+
+            # Só restam espaços em branco: token de fim de fonte
+            if m is None:
+                linha += texto.count('\n', contado)
+                if not vazio and not texto.endswith('\n'):
+                    linha += 1
+                self.fim_fonte = Token(TokenType.T_FIM_FONTE, '<EOF>', linha, 1, descartados + len(texto))
+                yield self.fim_fonte
+                return
+
+            grupo = m.lastindex
+            inicio = m.start(grupo)
+            posicao = m.end()
+            if grupo == 4:  # String: a posição do token é a das aspas de abertura
+                inicio = m.start(3) - 1
+            quebras = texto.count('\n', contado, inicio)
+            if quebras:
+                linha += quebras
+                inicio_linha = texto.rfind('\n', contado, inicio) + 1
+            contado = inicio
+            coluna = inicio - inicio_linha + 1
+            offset = descartados + inicio
+
+            # Identificador ou palavra reservada
+            if grupo == 1:
+                lex = m.group(1)
+                if lex[0] <= '\x7f' or lex[0].isalpha():
+                    # Verifica se é uma palavra reservada ou um identificador
+                    yield Token(palavras.get(lex.upper(), T_ID), lex, linha, coluna, offset)
+                    continue
+            # Número (inteiro ou decimal)
+            elif grupo == 2:
+                if posicao == len(texto) or texto[posicao] <= '\x7f' or not texto[posicao].isdigit():
+                    yield Token(T_NUMERO, m.group(2), linha, coluna, offset)
+                    continue
+            # Símbolos de um ou dois caracteres
+            elif grupo == 5:
+                lex = m.group(5)
+                yield Token(simbolos[lex], lex, linha, coluna, offset)
+                continue
+            # --- SUPORTE A STRING LITERAL ---
+            elif grupo == 4:
+                lex = m.group(3)
+                if m.group(4):
+                    yield Token(T_STRING, lex, linha, coluna, offset)
+                    continue
+                # String sem as aspas de fechamento: a análise continua na linha seguinte
+                posicao = fim_da_linha(texto, inicio)
+                self.registrar_erro(f"Erro Léxico: String não fechada (linha {linha}, coluna {coluna})")
+                yield Token(T_ERRO_LEX, texto[inicio+1:posicao], linha, coluna, offset)
+                continue
+
+            # Caracteres especiais e símbolos inválidos (um número com dígitos
+            # não decimais pode continuar no próximo bloco)
+            tipo_token, posicao = escanear_caractere_especial(texto, inicio)
+            if posicao == len(texto) and not fim_arquivo:
+                posicao = inicio
+                bloco = ler(TAMANHO_BLOCO)
+                fim_arquivo = not bloco
+                texto += bloco
+                continue
+            lex = texto[inicio:posicao]
+            if tipo_token == T_ERRO_LEX:
+                self.registrar_erro(f"Erro Léxico na linha {linha}, coluna {coluna}: símbolo inválido: {lex}")
+            yield Token(tipo_token, lex, linha, coluna, offset)
+
+    # Lê a fonte inteira para um FonteCria (feito uma única vez)
+    def carregar_buffer(self):
+        if self.buffer is None and isinstance(self.fonte, FonteCria):
+            self.buffer = self.fonte
+        elif self.buffer is None:
+            if not isinstance(self.fonte, str):
+                texto = self.fonte.read()
+            elif self.fonte == '-':
+                texto = sys.stdin.read()
+            else:
+                with open(self.fonte, encoding="utf-8") as f:
+                    texto = f.read()
+            self.buffer = FonteCria(texto, self.nome_fonte())
+        return self.buffer
+
+    # Varre o buffer inteiro com a expressão regular mestre gerando
+    # TokenOffset. Não há nenhum controle de linha e coluna durante a
+    # varredura: só as mensagens de erro consultam o índice de linhas.
+    def tokenizar_offsets(self, fonte):
+        texto = fonte.texto
+        casar = PADRAO_TOKEN.match
+        palavras = PALAVRAS_RESERVADAS
+        simbolos = SIMBOLOS
+        T_ID = TokenType.T_ID
+        T_NUMERO = TokenType.T_NUMERO
+        T_STRING = TokenType.T_STRING
+        T_ERRO_LEX = TokenType.T_ERRO_LEX
+        posicao = 0
+
+        while True:
+            m = casar(texto, posicao)
+            # Só restam espaços em branco: token de fim de fonte
+            if m is None:
+                self.fim_fonte = TokenOffset(TokenType.T_FIM_FONTE, len(texto), len(texto), fonte)
+                yield self.fim_fonte
+                return
+
+            grupo = m.lastindex
+            inicio = m.start(grupo)
+            posicao = m.end()
+
+            # Identificador ou palavra reservada
+            if grupo == 1:
+                lex = m.group(1)
+                if lex[0] <= '\x7f' or lex[0].isalpha():
+                    yield TokenOffset(palavras.get(lex.upper(), T_ID), inicio, posicao, fonte)
+                    continue
+            # Número (inteiro ou decimal)
+            elif grupo == 2:
+                if posicao == len(texto) or texto[posicao] <= '\x7f' or not texto[posicao].isdigit():
+                    yield TokenOffset(T_NUMERO, inicio, posicao, fonte)
+                    continue
+            # Símbolos de um ou dois caracteres
+            elif grupo == 5:
+                yield TokenOffset(simbolos[m.group(5)], inicio, posicao, fonte)
+                continue
+            # String literal, com a posição nas aspas de abertura
+            elif grupo == 4:
+                inicio = m.start(3) - 1
+                if m.group(4):
+                    yield TokenOffset(T_STRING, inicio, posicao, fonte)
+                    continue
+                posicao = fim_da_linha(texto, inicio)
+                linha, coluna = fonte.posicao(inicio)
+                self.registrar_erro(f"Erro Léxico: String não fechada (linha {linha}, coluna {coluna})")
+                yield TokenOffset(T_ERRO_LEX, inicio, posicao, fonte)
+                continue
+
+            # Caracteres especiais e símbolos inválidos
+            tipo_token, posicao = escanear_caractere_especial(texto, inicio)
+            if tipo_token == T_ERRO_LEX:
+                linha, coluna = fonte.posicao(inicio)
+                self.registrar_erro(f"Erro Léxico na linha {linha}, coluna {coluna}: símbolo inválido: {texto[inicio:posicao]}")
+            yield TokenOffset(tipo_token, inicio, posicao, fonte)
+
+    # Executa a análise léxica inteira e devolve os tokens num BufferTokens
+    # compacto. Os tokens de erro ficam de fora: o sintático recebe a fonte
+    # como se os caracteres inválidos não estivessem lá.
+    def carregar_tokens(self):
+        fonte = self.carregar_buffer()
+        texto = fonte.texto
+        tokens = BufferTokens()
+        tokens.fonte = fonte.nome
+        adicionar = tokens.adicionar
+        linha = fonte.linha_inicial
+        inicio_linha = 0
+        contado = 0
+        for token in self.tokenizar_offsets(fonte):
+            inicio = token.inicio
+            if token.tipo == TokenType.T_FIM_FONTE:
+                adicionar(token.tipo, '<EOF>', fonte.linha_fim_fonte(), 1, inicio)
                 break
-        
-        # Salva os tokens gerados em um arquivo de saída
-        output_file = self.fonte.rsplit('.', 1)[0] + '.lex'
+            if token.tipo == TokenType.T_ERRO_LEX:
+                continue
+            quebras = texto.count('\n', contado, inicio)
+            if quebras:
+                linha += quebras
+                inicio_linha = texto.rfind('\n', contado, inicio) + 1
+            contado = inicio
+            adicionar(token.tipo, token.lexema, linha, inicio - inicio_linha + 1, inicio)
+        tokens.erros = self.erros
+        return tokens
+
+    # Retorna o próximo token do código fonte (fim de fonte repetidamente ao terminar)
+    def proximo_token(self):
+        if self.gerador is None:
+            self.gerador = self.iter_tokens()
+        return next(self.gerador, self.fim_fonte)
+
+    # Executa a análise léxica completa da fonte e grava o arquivo .lex, no
+    # formato binário (padrão) ou no formato texto (dump legível para
+    # depuração), nos dois casos à medida que os tokens são gerados. Com a
+    # fonte na entrada padrão a saída vai para a saída padrão. Retorna True
+    # se não houve erro léxico.
+    def analisar(self, saida=None, ecoar=True, texto=False):
+        if saida is None and isinstance(self.fonte, str) and self.fonte != '-':
+            saida = self.fonte.rsplit('.', 1)[0] + '.lex'
+        if saida is None:
+            if texto:
+                self.escrever_lex(sys.stdout, ecoar=False)
+            else:
+                self.escrever_lex_binario(sys.stdout.buffer, ecoar=False)
+                sys.stdout.buffer.flush()
+            return not self.erros
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write("Análise Léxica - Arquivo: {}\n".format(self.fonte))
-                f.write("----------------------------------------\n")
-                for token in self.tokens:
-                    f.write(str(token) + '\n')
-                if self.erro:
-                    f.write("----------------------------------------\n")
-                    f.write("Erro encontrado: {}\n".format(self.erro))
-                else:
-                    f.write("----------------------------------------\n")
-                    f.write("Análise léxica terminada sem erros.\n")
-            print(f"Saída léxica salva em: {output_file}")
+            if texto:
+                with open(saida, 'w', encoding='utf-8') as f:
+                    self.escrever_lex(f, ecoar)
+            else:
+                with open(saida, 'wb') as f:
+                    self.escrever_lex_binario(f, ecoar)
+            print(f"Saída léxica salva em: {saida}")
         except IOError as e:
-            print(f"Erro ao salvar o arquivo {output_file}: {e}")
+            print(f"Erro ao salvar o arquivo {saida}: {e}")
+        return not self.erros
+
+    # Escreve o .lex binário no arquivo aberto. Os tokens passam por um
+    # EscritorLexBinario, que guarda as colunas em arquivos temporários, então
+    # a memória só cresce com os lexemas distintos; com offsets=True (ou uma
+    # FonteCria) a fonte já está inteira na memória e o BufferTokens é
+    # serializado de uma vez. Como no .lex binário, os tokens de erro ficam de fora.
+    def escrever_lex_binario(self, f, ecoar=True):
+        if self.offsets or isinstance(self.fonte, FonteCria):
+            tokens = self.carregar_tokens()
+            if ecoar:
+                for token in tokens:
+                    print(token)
+            f.write(codificar_lex_binario(tokens))
+            return
+        escritor = EscritorLexBinario()
+        try:
+            for token in self.iter_tokens():
+                if token.tipo == TokenType.T_ERRO_LEX:
+                    continue
+                if ecoar:
+                    print(token)
+                escritor.adicionar(token.tipo, token.lexema, token.linha, token.coluna, token.offset)
+            escritor.escrever(f, self.nome_fonte(), self.erros)
+        finally:
+            escritor.fechar()
+
+    # Escreve o relatório .lex no arquivo aberto, token a token
+    def escrever_lex(self, f, ecoar=True):
+        f.write("Análise Léxica - Arquivo: {}\n".format(self.nome_fonte()))
+        f.write("----------------------------------------\n")
+        # Os tokens de erro aparecem no meio dos outros, onde o erro ocorreu
+        for token in self.iter_tokens():
+            linha = str(token)
+            f.write(linha + '\n')
+            if ecoar:
+                print(linha)
+        if self.erros:
+            f.write("----------------------------------------\n")
+            for erro in self.erros:
+                f.write("Erro encontrado: {}\n".format(erro))
+        else:
+            f.write("----------------------------------------\n")
+            f.write("Análise léxica terminada sem erros.\n")
 
 # Ponto de entrada do programa
 if __name__ == '__main__':
-    # Verifica se o argumento do arquivo foi fornecido
-    if len(sys.argv) != 2:
-        print("Uso: python lexico_cria.py <arquivo.cria>")
+    opcoes = {'-q', '--silencioso', '--offsets', '--texto'}
+    argumentos = [a for a in sys.argv[1:] if a not in opcoes]
+    # Verifica se o argumento do arquivo foi fornecido ("-" lê da entrada padrão)
+    if len(argumentos) != 1:
+        print("Uso: python lexico.py [-q] [--texto [--offsets]] <arquivo.cria | ->")
         sys.exit(1)
     # Cria instância do analisador léxico e executa a análise
-    lexico = LexicoCria(sys.argv[1])
-    lexico.analisar()
\ No newline at end of file
+    lexico = LexicoCria(argumentos[0], offsets='--offsets' in sys.argv)
+    lexico.analisar(ecoar='-q' not in sys.argv and '--silencioso' not in sys.argv,
+                    texto='--texto' in sys.argv)
@@ -12,25 +12,6 @@ if [ ! -f "$1" ]; then
     exit 1
 fi
 
-# Roda o analisador léxico
-python3 lexico.py "$1"
-
-# Verifica se o arquivo .lex foi gerado
-LEX_FILE="${1%.cria}.lex"
-if [ ! -f "$LEX_FILE" ]; then
-    echo "Erro: Arquivo $LEX_FILE não foi gerado!"
-    exit 1
-fi
-
-# Roda o analisador sintático
-python3 sintatico.py "$LEX_FILE"
-
-# Verifica se o arquivo .syn foi gerado
-SYN_FILE="${1%.cria}.syn"
-if [ ! -f "$SYN_FILE" ]; then
-    echo "Erro: Arquivo $SYN_FILE não foi gerado!"
-    exit 1
-fi
-
-# Roda o analisador semântico e gerador de código
-python3 semantico_e_codigo.py "$LEX_FILE"
\ No newline at end of file
+# Roda léxico, sintático, semântico e gerador de código num único processo,
+# gravando também os artefatos intermediários (.lex e .syn)
+python3 compilador.py --artefatos "$1"
\ No newline at end of file
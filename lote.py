@@ -0,0 +1,141 @@
+import contextlib
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from cache import LIMITE_CACHE, CacheCompilacao
+from compilador import compilar, salvar_artefatos
+
+# Compilação em lote de muitos arquivos .cria, espalhados por vários
+# processos. Cada arquivo ganha os mesmos artefatos do compilador.py e, no
+# fim, sai um relatório com as falhas de cada etapa e a vazão. Com --cache os
+# processos dividem a mesma pasta de cache (cache.py).
+# Uso: python lote.py [-j N] [--lote N] [--artefatos] [--cache <pasta> [--limite-cache MB]] <pasta | padrão>...
+
+ETAPAS = ('leitura', 'lexico', 'sintatico', 'semantico')
+
+# Arquivos .cria das pastas (recursivamente) e padrões glob informados, sem repetição
+def listar_fontes(alvos):
+    fontes = []
+    for alvo in alvos:
+        if os.path.isdir(alvo):
+            for pasta, _, arquivos in os.walk(alvo):
+                fontes.extend(os.path.join(pasta, a) for a in arquivos if a.endswith('.cria'))
+        else:
+            fontes.extend(glob.glob(alvo, recursive=True))
+    return sorted(set(fontes))
+
+# Compila um arquivo e grava seus artefatos. Retorna a etapa em que a
+# compilação falhou ('leitura', 'lexico', 'sintatico', 'semantico') ou None,
+# e se ela veio do cache (None sem cache)
+def compilar_arquivo(caminho, intermediarios=False, cache=None):
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            fonte = f.read()
+    except (OSError, UnicodeDecodeError):
+        return 'leitura', None
+    acertos = 0 if cache is None else cache.acertos
+    resultado = compilar(fonte, caminho, cache=cache)
+    acertou = None if cache is None else cache.acertos > acertos
+    salvar_artefatos(resultado, caminho.rsplit('.', 1)[0], intermediarios)
+    if resultado.erro_lexico:
+        return 'lexico', acertou
+    if resultado.erros_sintaticos:
+        return 'sintatico', acertou
+    if resultado.erros_semanticos:
+        return 'semantico', acertou
+    return None, acertou
+
+# Os analisadores avisam no stdout cada arquivo salvo (.syn dos artefatos);
+# nos processos do pool essa saída é descartada
+def silenciar():
+    sys.stdout = open(os.devnull, 'w')
+
+# Quantos arquivos cada processo recebe por vez: uns 4 pedaços por
+# processo, para arquivos pequenos não pagarem uma ida e volta cada um
+def tamanho_lote(quantidade, trabalhadores):
+    return max(1, quantidade // (trabalhadores * 4))
+
+# Compila os arquivos com o número de processos informado e retorna a etapa
+# de falha de cada um e se ele veio do cache (na mesma ordem; cada processo
+# tem os próprios contadores do cache). Com 1 processo tudo roda aqui mesmo.
+def compilar_lote(caminhos, trabalhadores=None, lote=None, intermediarios=False, cache=None):
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    tarefa = partial(compilar_arquivo, intermediarios=intermediarios, cache=cache)
+    if trabalhadores == 1 or len(caminhos) < 2:
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            return [tarefa(caminho) for caminho in caminhos]
+    lote = lote or tamanho_lote(len(caminhos), trabalhadores)
+    with ProcessPoolExecutor(max_workers=trabalhadores, initializer=silenciar) as executor:
+        return list(executor.map(tarefa, caminhos, chunksize=lote))
+
+# Contagem de arquivos por etapa de falha (None: compilados com sucesso)
+def contar_falhas(falhas):
+    contagem = {etapa: 0 for etapa in (None,) + ETAPAS}
+    for etapa in falhas:
+        contagem[etapa] += 1
+    return contagem
+
+# Imprime o relatório agregado do lote
+def imprimir_relatorio(caminhos, resultados, tempo):
+    falhas = [etapa for etapa, _ in resultados]
+    contagem = contar_falhas(falhas)
+    print(f"Arquivos:           {len(caminhos)}")
+    print(f"Compilados:         {contagem[None]}")
+    print(f"Falhas léxicas:     {contagem['lexico']}")
+    print(f"Falhas sintáticas:  {contagem['sintatico']}")
+    print(f"Falhas semânticas:  {contagem['semantico']}")
+    if contagem['leitura']:
+        print(f"Erros de leitura:   {contagem['leitura']}")
+    acertos = [acertou for _, acertou in resultados if acertou is not None]
+    if acertos:
+        print(f"Cache:              {sum(acertos)} acerto(s), {len(acertos) - sum(acertos)} falta(s)")
+    print(f"Tempo:              {tempo:.2f} s ({len(caminhos) / tempo if tempo else 0:.1f} arquivos/s)")
+    for caminho, etapa in zip(caminhos, falhas):
+        if etapa == 'leitura':
+            print(f"Erro ao ler o arquivo {caminho}")
+
+# Ponto de entrada do programa
+if __name__ == '__main__':
+    trabalhadores = None
+    lote = None
+    intermediarios = False
+    pasta_cache = None
+    limite_cache = LIMITE_CACHE
+    alvos = []
+    argumentos = iter(sys.argv[1:])
+    try:
+        for argumento in argumentos:
+            if argumento == '-j':
+                trabalhadores = int(next(argumentos))
+            elif argumento == '--lote':
+                lote = int(next(argumentos))
+            elif argumento == '--artefatos':
+                intermediarios = True
+            elif argumento == '--cache':
+                pasta_cache = next(argumentos)
+            elif argumento == '--limite-cache':
+                limite_cache = int(float(next(argumentos)) * 1024 * 1024)
+            else:
+                alvos.append(argumento)
+    except (StopIteration, ValueError):
+        alvos = []
+    if (not alvos or (trabalhadores is not None and trabalhadores < 1) or (lote is not None and lote < 1)
+            or limite_cache < 0):
+        print("Uso: python lote.py [-j N] [--lote N] [--artefatos] [--cache <pasta> [--limite-cache MB]]"
+              " <pasta | padrão>...")
+        sys.exit(1)
+
+    caminhos = listar_fontes(alvos)
+    if not caminhos:
+        print("Nenhum arquivo .cria encontrado.")
+        sys.exit(1)
+    cache = None if pasta_cache is None else CacheCompilacao(pasta_cache, limite_cache)
+    inicio = time.perf_counter()
+    resultados = compilar_lote(caminhos, trabalhadores, lote, intermediarios, cache)
+    imprimir_relatorio(caminhos, resultados, time.perf_counter() - inicio)
+    if any(etapa for etapa, _ in resultados):
+        sys.exit(1)
@@ -0,0 +1,669 @@
+import struct
+import sys
+from operator import index
+
+from arvore import (OPERADORES_RELACIONAIS, Binaria, Constante, Numero, Parenteses, Texto, Variavel, Visitante,
+                    valor_numero)
+from gerador_ast import valor_texto
+from io_rapido import EntradaRapida, SaidaRapida
+from tipos import INTEIRO, REAL, dividir, inferir_tipos
+from tokens import (ERROS_DECODIFICACAO, TokenType, conferir_fim, escrever_secao, escrever_texto, escrever_varint,
+                    ler_secao, ler_texto, ler_varint)
+
+# Back end de bytecode do C.R.I.A: em vez de Python, o programa vira uma
+# lista de instruções de uma máquina de registradores, rodada pelo
+# interpretador deste módulo (executar_bytecode) sem passar pelo CPython
+# gerado. Cada variável (pelo nome Python, como nos outros geradores) ganha um
+# registrador numerado, e cada constante do programa também, carregado uma
+# vez só antes de rodar; os temporários das expressões vêm depois. Assim toda
+# operação é entre registradores e não existe instrução de carregar constante.
+#
+# Uma instrução é uma tupla (opcode, a, b, c), já decodificada: os operandos
+# são números de registrador, destinos de salto ou, em poucas instruções,
+# o próprio valor (o k do INC, o texto do FALA). Algumas superinstruções
+# juntam padrões comuns numa instrução só:
+#   INC x k                      x <- x + k (ou x - k, com k negado)
+#   SALTA_SE_<op> / SALTA_SE_NAO_<op> a b alvo
+#                                compara e salta (SEPA, MANDAENQUANTO)
+#   PARA_SOBE / PARA_DESCE c v alvo
+#                                fim da volta de um for com range(): soma o
+#                                passo, testa o fim, atribui v e volta
+# O programa compilado pode ser gravado num arquivo .crb e carregado de novo
+# sem recompilar (ver codificar_bytecode).
+
+# Opcodes, numerados na ordem do teste do interpretador (os mais comuns primeiro)
+OPCODES = (
+    'INC', 'PARA_SOBE', 'PARA_DESCE', 'SOMA', 'SUBTRAI', 'MULTIPLICA', 'MOVE',
+    'SALTA_SE_MENOR', 'SALTA_SE_MENOR_IGUAL', 'SALTA_SE_MAIOR', 'SALTA_SE_MAIOR_IGUAL', 'SALTA_SE_IGUAL',
+    'SALTA_SE_DIFERENTE', 'SALTA_SE_NAO_MENOR', 'SALTA_SE_NAO_MENOR_IGUAL', 'SALTA_SE_NAO_MAIOR',
+    'SALTA_SE_NAO_MAIOR_IGUAL', 'SALTA_SE_NAO_IGUAL', 'SALTA_SE_NAO_DIFERENTE', 'SALTA',
+    'DIVIDE', 'DIVIDE_REAL', 'DIVIDE_MISTO', 'RESTO', 'POTENCIA', 'MENOR', 'MENOR_IGUAL', 'MAIOR', 'MAIOR_IGUAL',
+    'IGUAL', 'DIFERENTE', 'SALTA_SE_VERDADEIRO', 'SALTA_SE_FALSO', 'ESCREVE', 'ESCREVE_TEXTO', 'LE', 'LE_REAL',
+    'VERIFICA', 'PARA_INICIO', 'FIM',
+)
+(INC, PARA_SOBE, PARA_DESCE, SOMA, SUBTRAI, MULTIPLICA, MOVE,
+ SALTA_SE_MENOR, SALTA_SE_MENOR_IGUAL, SALTA_SE_MAIOR, SALTA_SE_MAIOR_IGUAL, SALTA_SE_IGUAL,
+ SALTA_SE_DIFERENTE, SALTA_SE_NAO_MENOR, SALTA_SE_NAO_MENOR_IGUAL, SALTA_SE_NAO_MAIOR,
+ SALTA_SE_NAO_MAIOR_IGUAL, SALTA_SE_NAO_IGUAL, SALTA_SE_NAO_DIFERENTE, SALTA,
+ DIVIDE, DIVIDE_REAL, DIVIDE_MISTO, RESTO, POTENCIA, MENOR, MENOR_IGUAL, MAIOR, MAIOR_IGUAL,
+ IGUAL, DIFERENTE, SALTA_SE_VERDADEIRO, SALTA_SE_FALSO, ESCREVE, ESCREVE_TEXTO, LE, LE_REAL,
+ VERIFICA, PARA_INICIO, FIM) = range(len(OPCODES))
+
+# Instrução de cada operador binário (o destino é o registrador a)
+OPERACOES_BYTECODE = {
+    TokenType.T_MAIS: SOMA, TokenType.T_MENOS: SUBTRAI, TokenType.T_VEZES: MULTIPLICA,
+    TokenType.T_DIVIDIDO: DIVIDE, TokenType.T_RESTO: RESTO, TokenType.T_ELEVADO: POTENCIA,
+    TokenType.T_MENOR: MENOR, TokenType.T_MENOR_IGUAL: MENOR_IGUAL, TokenType.T_MAIOR: MAIOR,
+    TokenType.T_MAIOR_IGUAL: MAIOR_IGUAL, TokenType.T_IGUAL: IGUAL, TokenType.T_DIFERENTE: DIFERENTE,
+}
+
+# Instrução do "/" pelo tipo dos operandos (ver tipos.py): "//", "/" ou
+# decidida na execução
+DIVISOES_BYTECODE = {INTEIRO: DIVIDE, REAL: DIVIDE_REAL}
+
+# Saltos condicionais de cada comparação: salta se ela vale / se ela não vale
+SALTOS_SE = {
+    TokenType.T_MENOR: SALTA_SE_MENOR, TokenType.T_MENOR_IGUAL: SALTA_SE_MENOR_IGUAL,
+    TokenType.T_MAIOR: SALTA_SE_MAIOR, TokenType.T_MAIOR_IGUAL: SALTA_SE_MAIOR_IGUAL,
+    TokenType.T_IGUAL: SALTA_SE_IGUAL, TokenType.T_DIFERENTE: SALTA_SE_DIFERENTE,
+}
+SALTOS_SE_NAO = {
+    TokenType.T_MENOR: SALTA_SE_NAO_MENOR, TokenType.T_MENOR_IGUAL: SALTA_SE_NAO_MENOR_IGUAL,
+    TokenType.T_MAIOR: SALTA_SE_NAO_MAIOR, TokenType.T_MAIOR_IGUAL: SALTA_SE_NAO_MAIOR_IGUAL,
+    TokenType.T_IGUAL: SALTA_SE_NAO_IGUAL, TokenType.T_DIFERENTE: SALTA_SE_NAO_DIFERENTE,
+}
+
+# Instruções cujo operando a é o registrador que recebe o resultado
+ESCREVEM_EM_A = frozenset({MOVE, SOMA, SUBTRAI, MULTIPLICA, DIVIDE, DIVIDE_REAL, DIVIDE_MISTO, RESTO, POTENCIA,
+                           MENOR, MENOR_IGUAL, MAIOR, MAIOR_IGUAL, IGUAL, DIFERENTE})
+
+# Operandos usados por cada opcode (os outros são 0)
+ARIDADE = [3] * len(OPCODES)
+for _opcode in (MOVE, SALTA_SE_VERDADEIRO, SALTA_SE_FALSO, INC, LE, LE_REAL, VERIFICA):
+    ARIDADE[_opcode] = 2
+for _opcode in (SALTA, ESCREVE, ESCREVE_TEXTO):
+    ARIDADE[_opcode] = 1
+ARIDADE[FIM] = 0
+
+# Erro em tempo de execução, com a linha do C.R.I.A em que aconteceu
+class ErroExecucao(Exception):
+    def __init__(self, linha, erro):
+        super().__init__(f"Erro em tempo de execução na linha {linha}: {type(erro).__name__}: {erro}")
+        self.linha = linha
+        self.erro = erro  # Exceção original do Python
+
+# Programa compilado para a máquina de registradores
+class ProgramaBytecode:
+    def __init__(self, instrucoes, iniciais, nomes, linhas, fonte=''):
+        self.instrucoes = instrucoes  # Tuplas (opcode, a, b, c)
+        self.iniciais = iniciais  # Valor de cada registrador no início (None: sem valor)
+        self.nomes = nomes  # Nome Python da variável de cada registrador ('' nos outros)
+        self.linhas = linhas  # Linha do C.R.I.A de cada instrução
+        self.fonte = fonte
+
+    def __len__(self):
+        return len(self.instrucoes)
+
+# Compila a árvore de um programa conferido (e com os MANDALEMBRAR já
+# traduzidos pelo lacos.py) para bytecode, numa passada só. Ao longo dela é
+# acompanhado o conjunto de registradores que certamente já têm valor no
+# ponto atual; a leitura de uma variável fora dele ganha antes um VERIFICA,
+# que falha como o Python falharia (a variável "X" declarada e usada como
+# "x", ou uma declaração que o otimizador tirou).
+class CompiladorBytecode(Visitante):
+    def __init__(self, identificadores, fonte='', tipos=None):
+        self.nomes = identificadores.nomes
+        self.normalizados = identificadores.normalizados
+        self.fonte = fonte
+        self.tipos = tipos  # tipos.Tipos do programa (None: inferidos da árvore gerada)
+        self.instrucoes = []  # Listas [opcode, a, b, c], para os saltos poderem ser completados depois
+        self.linhas = []
+        self.linha = 1
+        self.iniciais = []
+        self.nomes_registradores = []
+        self.variaveis = {}  # Nome Python -> registrador
+        self.constantes = {}  # (tipo, repr) do valor -> registrador
+        self.temporarios = set()
+        self.livres = []  # Temporários que podem ser reaproveitados
+        self.definidos = set()  # Registradores que certamente têm valor aqui
+
+    def compilar(self, arvore):
+        return self.visitar(arvore)
+
+    def novo_registrador(self, inicial=None, nome=''):
+        self.iniciais.append(inicial)
+        self.nomes_registradores.append(nome)
+        return len(self.iniciais) - 1
+
+    def variavel(self, nome):
+        registrador = self.variaveis.get(nome)
+        if registrador is None:
+            registrador = self.variaveis[nome] = self.novo_registrador(None, nome)
+        return registrador
+
+    def constante(self, valor):
+        chave = (type(valor), repr(valor))
+        registrador = self.constantes.get(chave)
+        if registrador is None:
+            registrador = self.constantes[chave] = self.novo_registrador(valor)
+            self.definidos.add(registrador)
+        return registrador
+
+    def temporario(self):
+        if self.livres:
+            return self.livres.pop()
+        registrador = self.novo_registrador()
+        self.temporarios.add(registrador)
+        return registrador
+
+    def liberar(self, registrador):
+        if registrador in self.temporarios:
+            self.livres.append(registrador)
+
+    def emitir(self, opcode, a=0, b=0, c=0):
+        self.instrucoes.append([opcode, a, b, c])
+        self.linhas.append(self.linha)
+        return len(self.instrucoes) - 1
+
+    # Completa o destino de um salto já emitido (o último operando que ele usa)
+    def completar(self, salto, destino=None):
+        instrucao = self.instrucoes[salto]
+        instrucao[ARIDADE[instrucao[0]]] = len(self.instrucoes) if destino is None else destino
+
+    # Registrador da variável lida, conferindo antes se ela pode estar sem valor
+    def ler(self, nome):
+        registrador = self.variavel(nome)
+        if registrador not in self.definidos:
+            self.emitir(VERIFICA, registrador, nome)
+            self.definidos.add(registrador)
+        return registrador
+
+    # destino = origem; o resultado de uma operação recém-emitida vai direto
+    # para o destino, sem MOVE
+    def mover(self, destino, origem):
+        ultima = self.instrucoes[-1] if self.instrucoes else None
+        if origem in self.temporarios and ultima is not None and ultima[0] in ESCREVEM_EM_A and ultima[1] == origem:
+            ultima[1] = destino
+            self.liberar(origem)
+        elif origem != destino:
+            self.emitir(MOVE, destino, origem)
+            self.liberar(origem)
+        self.definidos.add(destino)
+
+    # Salto para um destino a completar, tomado quando a condição vale (se
+    # verdadeiro) ou quando não vale; comparações viram um salto só
+    def saltar(self, condicao, verdadeiro):
+        nodo = condicao
+        while nodo.__class__ is Parenteses:
+            nodo = nodo.expressao
+        if nodo.__class__ is Binaria and nodo.operador in OPERADORES_RELACIONAIS:
+            a = yield nodo.esquerda
+            b = yield nodo.direita
+            self.liberar(b)
+            self.liberar(a)
+            return self.emitir((SALTOS_SE if verdadeiro else SALTOS_SE_NAO)[nodo.operador], a, b)
+        valor = yield condicao
+        self.liberar(valor)
+        return self.emitir(SALTA_SE_VERDADEIRO if verdadeiro else SALTA_SE_FALSO, valor)
+
+    # Valor k de "x + k", "k + x" ou "x - k" (k constante numérica), já
+    # negado na subtração, ou None se a expressão não tem essa forma
+    def incremento(self, valor, nome):
+        while valor.__class__ is Parenteses:
+            valor = valor.expressao
+        if valor.__class__ is not Binaria or valor.operador not in (TokenType.T_MAIS, TokenType.T_MENOS):
+            return None
+        esquerda, direita = valor.esquerda, valor.direita
+        while esquerda.__class__ is Parenteses:
+            esquerda = esquerda.expressao
+        if valor.operador is TokenType.T_MAIS and esquerda.__class__ is not Variavel:
+            esquerda, direita = direita, esquerda
+            while esquerda.__class__ is Parenteses:
+                esquerda = esquerda.expressao
+        if esquerda.__class__ is not Variavel or self.normalizados[esquerda.simbolo] != nome:
+            return None
+        while direita.__class__ is Parenteses:
+            direita = direita.expressao
+        if direita.__class__ is Numero:
+            k = valor_numero(direita.lexema)
+        elif direita.__class__ is Constante:
+            k = direita.valor
+        else:
+            return None
+        if type(k) is not int and type(k) is not float:
+            return None
+        return -k if valor.operador is TokenType.T_MENOS else k
+
+    def visitar_programa(self, nodo):
+        if self.tipos is None:
+            self.tipos = inferir_tipos(nodo)
+        self.tipos.usar_identificadores(nodo.identificadores)
+        for declaracao in nodo.declaracoes:
+            nome = self.nomes[declaracao.simbolo]
+            registrador = self.variavel(nome)
+            self.iniciais[registrador] = self.tipos.valor_inicial(nome)
+            self.definidos.add(registrador)
+        yield nodo.bloco
+        self.emitir(FIM)
+        return ProgramaBytecode([tuple(instrucao) for instrucao in self.instrucoes], self.iniciais,
+                                self.nomes_registradores, self.linhas, self.fonte)
+
+    def visitar_bloco(self, nodo):
+        for comando in nodo.comandos:
+            yield comando
+
+    def visitar_atribuicao(self, nodo):
+        self.linha = nodo.linha
+        nome = self.normalizados[nodo.alvo.simbolo]
+        k = self.incremento(nodo.valor, nome)
+        if k is not None:
+            self.emitir(INC, self.ler(nome), k)
+            return
+        valor = yield nodo.valor
+        self.mover(self.variavel(nome), valor)
+
+    # Depois do SEPA só têm valor certo os registradores que os dois caminhos definem
+    def visitar_se(self, nodo):
+        self.linha = nodo.linha
+        salto = yield from self.saltar(nodo.condicao, False)
+        antes = set(self.definidos)
+        yield nodo.entao
+        if nodo.senao is None:
+            self.completar(salto)
+            self.definidos = antes
+            return
+        depois_entao = self.definidos
+        self.definidos = antes
+        fim = self.emitir(SALTA)
+        self.completar(salto)
+        yield nodo.senao
+        self.completar(fim)
+        self.definidos &= depois_entao
+
+    # A condição é testada na entrada e de novo no fim de cada volta, que
+    # salta de volta para o começo do corpo: um salto só por volta
+    def visitar_enquanto(self, nodo):
+        self.linha = nodo.linha
+        saida = yield from self.saltar(nodo.condicao, False)
+        antes = set(self.definidos)
+        inicio = len(self.instrucoes)
+        yield nodo.corpo
+        self.linha = nodo.linha
+        volta = yield from self.saltar(nodo.condicao, True)
+        self.completar(volta, inicio)
+        self.completar(saida)
+        self.definidos = antes
+
+    # for v in range(inicio, fim, passo): três registradores seguidos
+    # guardam o contador, o fim e o passo; v recebe o contador a cada volta,
+    # então fica com o último valor, como no Python
+    def visitar_para_intervalo(self, nodo):
+        self.linha = nodo.linha
+        contador = self.novo_registrador()
+        self.novo_registrador()
+        self.novo_registrador(nodo.passo)
+        self.definidos.add(contador + 2)
+        self.mover(contador, (yield nodo.inicio))
+        self.mover(contador + 1, (yield nodo.fim))
+        variavel = self.variavel(self.normalizados[nodo.variavel.simbolo])
+        entrada = self.emitir(PARA_INICIO, contador, variavel)
+        antes = set(self.definidos)
+        self.definidos.add(variavel)
+        inicio = len(self.instrucoes)
+        yield nodo.corpo
+        self.linha = nodo.linha
+        self.emitir(PARA_SOBE if nodo.passo > 0 else PARA_DESCE, contador, variavel, inicio)
+        self.completar(entrada)
+        self.definidos = antes
+
+    # A máquina não tem NumPy: o laço vetorizado roda como o original
+    def visitar_para_vetorizado(self, nodo):
+        return (yield nodo.escalar)
+
+    def visitar_ler(self, nodo):
+        self.linha = nodo.linha
+        nome = self.normalizados[nodo.variavel.simbolo]
+        registrador = self.variavel(nome)
+        self.emitir(LE_REAL if self.tipos.le_real(nome) else LE, registrador, f'Informe a variável {nome}: ')
+        self.definidos.add(registrador)
+
+    def visitar_escrever(self, nodo):
+        self.linha = nodo.linha
+        if isinstance(nodo.valor, Texto):
+            self.emitir(ESCREVE_TEXTO, valor_texto(nodo.valor.lexema))
+            return
+        valor = yield nodo.valor
+        self.liberar(valor)
+        self.emitir(ESCREVE, valor)
+
+    def visitar_variavel(self, nodo):
+        return self.ler(self.normalizados[nodo.simbolo])
+
+    def visitar_numero(self, nodo):
+        return self.constante(valor_numero(nodo.lexema))
+
+    def visitar_constante(self, nodo):
+        return self.constante(nodo.valor)
+
+    def visitar_parenteses(self, nodo):
+        return (yield nodo.expressao)
+
+    def visitar_binaria(self, nodo):
+        a = yield nodo.esquerda
+        b = yield nodo.direita
+        self.liberar(b)
+        self.liberar(a)
+        destino = self.temporario()
+        if nodo.operador is TokenType.T_DIVIDIDO:
+            self.emitir(DIVISOES_BYTECODE.get(self.tipos.divisao(nodo), DIVIDE_MISTO), destino, a, b)
+        else:
+            self.emitir(OPERACOES_BYTECODE[nodo.operador], destino, a, b)
+        return destino
+
+# Compila a árvore de um programa para bytecode
+def compilar_bytecode(arvore, fonte='', tipos=None):
+    return CompiladorBytecode(arvore.identificadores, fonte, tipos).compilar(arvore)
+
+# Roda um programa compilado. O laço de despacho testa os opcodes na ordem
+# de OPCODES, com os das voltas de laço e da aritmética primeiro; um erro do
+# Python vira um ErroExecucao com a linha do C.R.I.A. Com io_rapido o LE e o
+# ESCREVE usam a entrada e a saída rápidas do io_rapido.py.
+def executar_bytecode(programa, io_rapido=False):
+    codigo = programa.instrucoes
+    r = list(programa.iniciais)
+    pc = 0
+    ler = input
+    escrever = print
+    if io_rapido:
+        ler = EntradaRapida().ler
+        saida = SaidaRapida()
+        escrever = saida.escrever
+    try:
+        while True:
+            op, a, b, c = codigo[pc]
+            pc += 1
+            if op < SALTA_SE_MENOR:
+                if op == INC:
+                    r[a] = r[a] + b
+                elif op == PARA_SOBE:
+                    x = r[a] + r[a + 2]
+                    if x < r[a + 1]:
+                        r[a] = r[b] = x
+                        pc = c
+                elif op == PARA_DESCE:
+                    x = r[a] + r[a + 2]
+                    if x > r[a + 1]:
+                        r[a] = r[b] = x
+                        pc = c
+                elif op == SOMA:
+                    r[a] = r[b] + r[c]
+                elif op == SUBTRAI:
+                    r[a] = r[b] - r[c]
+                elif op == MULTIPLICA:
+                    r[a] = r[b] * r[c]
+                else:
+                    r[a] = r[b]
+            elif op < SALTA:
+                if op == SALTA_SE_MENOR:
+                    if r[a] < r[b]:
+                        pc = c
+                elif op == SALTA_SE_MENOR_IGUAL:
+                    if r[a] <= r[b]:
+                        pc = c
+                elif op == SALTA_SE_MAIOR:
+                    if r[a] > r[b]:
+                        pc = c
+                elif op == SALTA_SE_MAIOR_IGUAL:
+                    if r[a] >= r[b]:
+                        pc = c
+                elif op == SALTA_SE_IGUAL:
+                    if r[a] == r[b]:
+                        pc = c
+                elif op == SALTA_SE_DIFERENTE:
+                    if r[a] != r[b]:
+                        pc = c
+                elif op == SALTA_SE_NAO_MENOR:
+                    if not r[a] < r[b]:
+                        pc = c
+                elif op == SALTA_SE_NAO_MENOR_IGUAL:
+                    if not r[a] <= r[b]:
+                        pc = c
+                elif op == SALTA_SE_NAO_MAIOR:
+                    if not r[a] > r[b]:
+                        pc = c
+                elif op == SALTA_SE_NAO_MAIOR_IGUAL:
+                    if not r[a] >= r[b]:
+                        pc = c
+                elif op == SALTA_SE_NAO_IGUAL:
+                    if not r[a] == r[b]:
+                        pc = c
+                elif not r[a] != r[b]:
+                    pc = c
+            elif op == SALTA:
+                pc = a
+            elif op < SALTA_SE_VERDADEIRO:
+                if op == DIVIDE:
+                    r[a] = r[b] // r[c]
+                elif op == DIVIDE_REAL:
+                    r[a] = r[b] / r[c]
+                elif op == DIVIDE_MISTO:
+                    r[a] = dividir(r[b], r[c])
+                elif op == RESTO:
+                    r[a] = r[b] % r[c]
+                elif op == POTENCIA:
+                    r[a] = r[b] ** r[c]
+                elif op == MENOR:
+                    r[a] = r[b] < r[c]
+                elif op == MENOR_IGUAL:
+                    r[a] = r[b] <= r[c]
+                elif op == MAIOR:
+                    r[a] = r[b] > r[c]
+                elif op == MAIOR_IGUAL:
+                    r[a] = r[b] >= r[c]
+                elif op == IGUAL:
+                    r[a] = r[b] == r[c]
+                else:
+                    r[a] = r[b] != r[c]
+            elif op == SALTA_SE_VERDADEIRO:
+                if r[a]:
+                    pc = b
+            elif op == SALTA_SE_FALSO:
+                if not r[a]:
+                    pc = b
+            elif op == ESCREVE:
+                escrever(r[a])
+            elif op == ESCREVE_TEXTO:
+                escrever(a)
+            elif op == LE:
+                r[a] = int(ler(b))
+            elif op == LE_REAL:
+                r[a] = float(ler(b))
+            elif op == VERIFICA:
+                if r[a] is None:
+                    raise UnboundLocalError(f"cannot access local variable '{b}' where it is not associated "
+                                            "with a value")
+            elif op == PARA_INICIO:
+                # Como o range(): só aceita inteiros (e os bool, como 0 e 1)
+                x = r[a] = index(r[a])
+                r[a + 1] = index(r[a + 1])
+                if x < r[a + 1] if r[a + 2] > 0 else x > r[a + 1]:
+                    r[b] = x
+                else:
+                    pc = c
+            else:
+                return
+    except Exception as e:
+        raise ErroExecucao(programa.linhas[pc - 1], e) from e
+    finally:
+        if io_rapido:
+            saida.despejar()
+
+# Listagem legível do bytecode, uma instrução por linha
+def desmontar(programa):
+    linhas = []
+    for numero, nome in enumerate(programa.nomes):
+        if nome:
+            linhas.append(f"r{numero} = {nome}")
+        elif programa.iniciais[numero] is not None:
+            linhas.append(f"r{numero} = {programa.iniciais[numero]!r}")
+    for posicao, (op, a, b, c) in enumerate(programa.instrucoes):
+        operandos = ', '.join(repr(operando) for operando in (a, b, c)[:ARIDADE[op]])
+        linhas.append(f"{posicao:5}  linha {programa.linhas[posicao]:<5} {OPCODES[op]:<24} {operandos}")
+    return linhas
+
+# --- FORMATO BINÁRIO DO .crb ---
+# Cabeçalho: MAGICO_BYTECODE, byte de versão, nome da fonte e a tabela de
+# opcodes (nome de cada opcode usado, para o arquivo não depender da
+# numeração de OPCODES). Depois vêm os registradores (nome e valor inicial)
+# e as instruções: índice do opcode na tabela e os operandos que ele usa.
+# Valores (operandos e valores iniciais) começam por um byte de tipo:
+# inteiro não negativo ou negativo (varint do valor absoluto), float (8
+# bytes), texto, True, False ou None. As linhas vão numa seção de varints.
+MAGICO_BYTECODE = b'CRIABYT\0'
+VERSAO_BYTECODE = 1
+
+(VALOR_INTEIRO, VALOR_NEGATIVO, VALOR_FLOAT, VALOR_TEXTO, VALOR_VERDADEIRO, VALOR_FALSO,
+ VALOR_NENHUM) = range(7)
+
+def escrever_valor(saida, valor):
+    if valor is None:
+        saida.append(VALOR_NENHUM)
+    elif valor is True or valor is False:
+        saida.append(VALOR_VERDADEIRO if valor else VALOR_FALSO)
+    elif type(valor) is int:
+        saida.append(VALOR_INTEIRO if valor >= 0 else VALOR_NEGATIVO)
+        escrever_varint(saida, abs(valor))
+    elif type(valor) is float:
+        saida.append(VALOR_FLOAT)
+        saida += struct.pack('<d', valor)
+    else:
+        saida.append(VALOR_TEXTO)
+        escrever_texto(saida, valor)
+
+def ler_valor(dados, pos):
+    tipo = dados[conferir_fim(dados, pos + 1) - 1]
+    pos += 1
+    if tipo == VALOR_INTEIRO or tipo == VALOR_NEGATIVO:
+        valor, pos = ler_varint(dados, pos)
+        return (valor if tipo == VALOR_INTEIRO else -valor), pos
+    if tipo == VALOR_FLOAT:
+        return struct.unpack_from('<d', dados, pos)[0], conferir_fim(dados, pos + 8)
+    if tipo == VALOR_TEXTO:
+        return ler_texto(dados, pos)
+    if tipo == VALOR_NENHUM:
+        return None, pos
+    if tipo == VALOR_VERDADEIRO or tipo == VALOR_FALSO:
+        return tipo == VALOR_VERDADEIRO, pos
+    raise ValueError(f"Tipo de valor {tipo} desconhecido no bytecode")
+
+# Serializa um ProgramaBytecode no formato binário
+def codificar_bytecode(programa):
+    saida = bytearray(MAGICO_BYTECODE)
+    saida.append(VERSAO_BYTECODE)
+    escrever_texto(saida, programa.fonte or '')
+    usados = sorted({instrucao[0] for instrucao in programa.instrucoes})
+    escrever_varint(saida, len(usados))
+    for opcode in usados:
+        escrever_texto(saida, OPCODES[opcode])
+    mapa = {opcode: indice for indice, opcode in enumerate(usados)}
+    escrever_varint(saida, len(programa.iniciais))
+    for nome, inicial in zip(programa.nomes, programa.iniciais):
+        escrever_texto(saida, nome)
+        escrever_valor(saida, inicial)
+    escrever_varint(saida, len(programa.instrucoes))
+    for instrucao in programa.instrucoes:
+        saida.append(mapa[instrucao[0]])
+        for operando in instrucao[1:1 + ARIDADE[instrucao[0]]]:
+            escrever_valor(saida, operando)
+    escrever_secao(saida, programa.linhas)
+    return bytes(saida)
+
+# Reconstrói um ProgramaBytecode a partir do formato binário. Um arquivo
+# truncado ou corrompido dá ValueError, como um de outra versão.
+def decodificar_bytecode(dados):
+    dados = memoryview(dados)
+    if bytes(dados[:len(MAGICO_BYTECODE)]) != MAGICO_BYTECODE:
+        raise ValueError("Não é um arquivo de bytecode do C.R.I.A")
+    if len(dados) <= len(MAGICO_BYTECODE):
+        raise ValueError("Arquivo de bytecode truncado ou corrompido: falta a versão")
+    versao = dados[len(MAGICO_BYTECODE)]
+    if versao != VERSAO_BYTECODE:
+        raise ValueError(f"Versão {versao} do bytecode não suportada (esperada {VERSAO_BYTECODE})")
+    try:
+        return ler_bytecode(dados)
+    except (*ERROS_DECODIFICACAO, struct.error) as e:
+        raise ValueError(f"Arquivo de bytecode truncado ou corrompido ({e.__class__.__name__})") from e
+    except ValueError as e:
+        raise ValueError(f"Arquivo de bytecode truncado ou corrompido: {e}") from e
+
+# Lê as seções de um .crb depois do cabeçalho
+def ler_bytecode(dados):
+    pos = len(MAGICO_BYTECODE) + 1
+    fonte, pos = ler_texto(dados, pos)
+    quantidade, pos = ler_varint(dados, pos)
+    opcodes = []
+    for _ in range(quantidade):
+        nome, pos = ler_texto(dados, pos)
+        if nome not in OPCODES:
+            raise ValueError(f"Instrução {nome!r} desconhecida")
+        opcodes.append(OPCODES.index(nome))
+    quantidade, pos = ler_varint(dados, pos)
+    nomes = []
+    iniciais = []
+    for _ in range(quantidade):
+        nome, pos = ler_texto(dados, pos)
+        inicial, pos = ler_valor(dados, pos)
+        nomes.append(nome)
+        iniciais.append(inicial)
+    quantidade, pos = ler_varint(dados, pos)
+    instrucoes = []
+    for _ in range(quantidade):
+        indice = dados[conferir_fim(dados, pos + 1) - 1]
+        if indice >= len(opcodes):
+            raise ValueError(f"Instrução {indice} fora da tabela de instruções")
+        opcode = opcodes[indice]
+        pos += 1
+        operandos = [0, 0, 0]
+        for posicao in range(ARIDADE[opcode]):
+            operandos[posicao], pos = ler_valor(dados, pos)
+        instrucoes.append((opcode, *operandos))
+    linhas, pos = ler_secao(dados, pos)
+    if len(linhas) != len(instrucoes):
+        raise ValueError("Linhas e instruções em quantidades diferentes")
+    return ProgramaBytecode(instrucoes, iniciais, nomes, list(linhas), fonte)
+
+def salvar_bytecode(programa, caminho):
+    with open(caminho, 'wb') as f:
+        f.write(codificar_bytecode(programa))
+
+def carregar_bytecode(caminho):
+    with open(caminho, 'rb') as f:
+        return decodificar_bytecode(f.read())
+
+# Roda (ou, com --desmontar, lista) um programa gravado num .crb; com
+# --io-rapido ele roda com a entrada e a saída do io_rapido.py
+if __name__ == '__main__':
+    argumentos = sys.argv[1:]
+    listar = argumentos[:1] == ['--desmontar']
+    if listar:
+        argumentos = argumentos[1:]
+    io_rapido = argumentos[:1] == ['--io-rapido']
+    if io_rapido:
+        argumentos = argumentos[1:]
+    if len(argumentos) != 1:
+        print("Uso: python maquina.py [--desmontar | --io-rapido] <arquivo.crb>")
+        sys.exit(1)
+    try:
+        programa = carregar_bytecode(argumentos[0])
+    except (IOError, ValueError) as e:
+        print(f"Erro ao ler o arquivo {argumentos[0]}: {e}")
+        sys.exit(1)
+    if listar:
+        for linha in desmontar(programa):
+            print(linha)
+        sys.exit(0)
+    try:
+        executar_bytecode(programa, io_rapido)
+    except ErroExecucao as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
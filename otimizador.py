@@ -0,0 +1,587 @@
+import keyword
+import math
+import operator
+
+from arvore import (Atribuicao, Binaria, Bloco, Constante, Enquanto, Escrever, Ler, Numero, Para, ParaIntervalo,
+                    Parenteses, Programa, Se, Texto, Variavel, Visitante, valor_numero)
+from tipos import dividir, inferir_tipos
+from tokens import TokenType
+
+# Otimizações sobre a árvore já conferida pelo semântico, feitas antes da
+# geração de código (em texto ou pelo gerador_ast), então as duas saídas
+# ganham as mesmas. O nível 0 não otimiza nada; o nível 1 dobra as
+# expressões constantes e propaga o valor conhecido das variáveis pelo código
+# em linha reta; o nível 2 também tira o código que nunca roda (SEPA com
+# condição constante, laços que não dão nenhuma volta), as atribuições cujo
+# valor nunca é lido e as variáveis declaradas que nunca são usadas; o nível
+# 3 também otimiza os laços depois de traduzidos (otimizador_lacos.py). A
+# árvore original não é alterada: os comandos otimizados são nodos novos, e
+# o que foi tirado fica anotado num relatório.
+#
+# Cada conta é feita como o Python gerado faria ("/" é "//" entre int e "/"
+# com float, ver tipos.py), e uma conta que falharia na execução (divisão
+# por zero, estouro) fica no código para falhar lá. As variáveis são
+# acompanhadas pelo nome Python, e não pelo ID do identificador: o BAGULHOS
+# inicia a variável com o nome como declarado (com 0.0 se ela só recebe
+# float) e os usos são em minúsculas, então "X" declarada e usada como "x"
+# não tem valor conhecido, como no código gerado.
+
+NIVEL_MAXIMO = 3
+
+# Nomes que o código gerado lê além das variáveis: se o programa tiver uma
+# variável com um desses nomes, ela é usada pelo FALA ou pelo OLHA
+USOS_FALA = frozenset({'print'})
+USOS_OLHA = frozenset({'int', 'float', 'input'})
+
+# Operação Python de cada operador do C.R.I.A, com a semântica do código gerado
+OPERACOES = {
+    TokenType.T_MAIS: operator.add, TokenType.T_MENOS: operator.sub, TokenType.T_VEZES: operator.mul,
+    TokenType.T_DIVIDIDO: dividir, TokenType.T_RESTO: operator.mod, TokenType.T_ELEVADO: operator.pow,
+    TokenType.T_MAIOR: operator.gt, TokenType.T_MENOR: operator.lt, TokenType.T_MAIOR_IGUAL: operator.ge,
+    TokenType.T_MENOR_IGUAL: operator.le, TokenType.T_IGUAL: operator.eq, TokenType.T_DIFERENTE: operator.ne,
+}
+
+# Maior inteiro (em bits) que vira constante; acima disso a conta fica para a execução
+LIMITE_BITS = 1024
+
+# Valor de um nodo constante (número da fonte ou constante já calculada), ou
+# None se o nodo não for constante
+def valor_constante(nodo):
+    if nodo.__class__ is Constante:
+        return nodo.valor
+    if nodo.__class__ is Numero and literal_python(nodo.lexema):
+        return valor_numero(nodo.lexema)
+    return None
+
+# Se o número da fonte também é um literal válido no Python gerado (sem
+# dígitos não ASCII nem zeros à esquerda num inteiro, como "007"); os que
+# não são ficam no código, que falha ao ser executado como sem otimização
+def literal_python(lexema):
+    if not lexema.isascii():
+        return False
+    return '.' in lexema or lexema[0] != '0' or not lexema.strip('0')
+
+# Resultado de uma operação entre constantes, ou None quando ela tem que
+# ficar para a execução: erro (divisão por zero, estouro), resultado que não
+# é int, float ou bool finito, ou inteiro grande demais. A potência de
+# inteiros é recusada antes de ser calculada se o resultado passaria do limite.
+def calcular(operador, esquerda, direita):
+    if (operador is TokenType.T_ELEVADO and type(esquerda) is not float and type(direita) is not float
+            and direita > 0 and abs(esquerda) > 1 and abs(esquerda).bit_length() * direita > LIMITE_BITS):
+        return None
+    try:
+        resultado = OPERACOES[operador](esquerda, direita)
+    except ArithmeticError:
+        return None
+    tipo = type(resultado)
+    if tipo is float:
+        return resultado if math.isfinite(resultado) else None
+    if tipo is int:
+        return resultado if resultado.bit_length() <= LIMITE_BITS else None
+    return resultado if tipo is bool else None
+
+# Se dois valores conhecidos são o mesmo para o programa (1, 1.0 e True não
+# são: imprimem diferente)
+def mesmo_valor(a, b):
+    return type(a) is type(b) and repr(a) == repr(b)
+
+# Blocos de comandos diretamente dentro dos comandos de um bloco
+def blocos_internos(bloco):
+    for comando in bloco.comandos:
+        classe = comando.__class__
+        if classe is Se:
+            yield comando.entao
+            if comando.senao is not None:
+                yield comando.senao
+        elif classe is Enquanto or classe is Para or classe is ParaIntervalo:
+            yield comando.corpo
+
+# Nomes Python das variáveis lidas numa expressão
+def nomes_usados(expressao, normalizados):
+    nomes = set()
+    pendentes = [expressao]
+    while pendentes:
+        nodo = pendentes.pop()
+        classe = nodo.__class__
+        if classe is Variavel:
+            nomes.add(normalizados[nodo.simbolo])
+        elif classe is Binaria:
+            pendentes.append(nodo.esquerda)
+            pendentes.append(nodo.direita)
+        elif classe is Parenteses:
+            pendentes.append(nodo.expressao)
+    return nomes
+
+# Nomes Python que recebem valor em algum ponto do programa (inclusive na
+# declaração) e nomes lidos nele, contando os que o FALA e o OLHA leem
+# (print, int, float, input)
+def nomes_do_programa(programa):
+    nomes = programa.identificadores.nomes
+    normalizados = programa.identificadores.normalizados
+    atribuidos = {nomes[declaracao.simbolo] for declaracao in programa.declaracoes}
+    lidos = set()
+    pendentes = [programa.bloco]
+    while pendentes:
+        for comando in pendentes.pop().comandos:
+            classe = comando.__class__
+            if classe is Atribuicao:
+                atribuidos.add(normalizados[comando.alvo.simbolo])
+                lidos |= nomes_usados(comando.valor, normalizados)
+            elif classe is Ler:
+                atribuidos.add(normalizados[comando.variavel.simbolo])
+                lidos |= USOS_OLHA
+            elif classe is Escrever:
+                lidos |= USOS_FALA
+                if comando.valor.__class__ is not Texto:
+                    lidos |= nomes_usados(comando.valor, normalizados)
+            elif classe is Para:
+                atribuidos.add(normalizados[comando.variavel.simbolo])
+                atribuidos.add(normalizados[comando.alvo_incremento.simbolo])
+                lidos |= nomes_usados(comando.inicio, normalizados)
+                lidos |= nomes_usados(comando.condicao, normalizados)
+                lidos |= nomes_usados(comando.incremento, normalizados)
+                pendentes.append(comando.corpo)
+            else:
+                lidos |= nomes_usados(comando.condicao, normalizados)
+                pendentes.append(comando.corpo if classe is Enquanto else comando.entao)
+                if classe is Se and comando.senao is not None:
+                    pendentes.append(comando.senao)
+    return atribuidos, lidos
+
+# Nomes Python que recebem valor em cada bloco (atribuição, OLHA, variável e
+# incremento do MANDALEMBRAR, variável do for já traduzido), contando os blocos internos, calculados de
+# baixo para cima numa passada só: id(bloco) -> nomes
+def atribuicoes_por_bloco(bloco, normalizados):
+    atribuidas = {}
+    pendentes = [(bloco, False)]
+    while pendentes:
+        bloco, pronto = pendentes.pop()
+        if not pronto:
+            pendentes.append((bloco, True))
+            pendentes.extend((interno, False) for interno in blocos_internos(bloco))
+            continue
+        nomes = set()
+        for comando in bloco.comandos:
+            classe = comando.__class__
+            if classe is Atribuicao:
+                nomes.add(normalizados[comando.alvo.simbolo])
+            elif classe is Ler or classe is ParaIntervalo:
+                nomes.add(normalizados[comando.variavel.simbolo])
+            elif classe is Para:
+                nomes.add(normalizados[comando.variavel.simbolo])
+                nomes.add(normalizados[comando.alvo_incremento.simbolo])
+        for interno in blocos_internos(bloco):
+            nomes |= atribuidas[id(interno)]
+        atribuidas[id(bloco)] = nomes
+    return atribuidas
+
+# Variáveis temporárias dos otimizadores (_voltas1, _inv2...), com um
+# contador só para todos. Elas ganham IDs numa cópia da tabela de
+# identificadores, que vai para a árvore otimizada: a tabela dos tokens, que
+# o semântico já usou, não muda. Identificadores do C.R.I.A não começam com
+# "_", e um nome que a tabela já tem (de uma otimização anterior) é pulado.
+class Temporarias:
+    def __init__(self, identificadores):
+        self.identificadores = identificadores.copiar()
+        self.quantidade = 0
+
+    def criar(self, prefixo, linha):
+        while True:
+            self.quantidade += 1
+            nome = f'{prefixo}{self.quantidade}'
+            if nome not in self.identificadores.ids:
+                return Variavel(self.identificadores.internar(nome), linha, 0)
+
+class Otimizador(Visitante):
+    def __init__(self, identificadores, nivel=1, relatorio=None, protegidas=frozenset(), tipos=None):
+        self.nomes = identificadores.nomes
+        self.normalizados = identificadores.normalizados
+        self.nivel = nivel
+        self.relatorio = [] if relatorio is None else relatorio  # O que foi tirado, uma linha por item
+        self.protegidas = protegidas  # Nomes cujas atribuições não podem sair (ver otimizar)
+        self.tipos = tipos  # tipos.Tipos do programa, para o valor inicial das variáveis (None: inferidos)
+        self.constantes = {}  # Nome Python -> valor conhecido neste ponto do programa
+        self.atribuidas = {}  # id(bloco) -> nomes Python que recebem valor no bloco
+
+    # Árvore otimizada do programa (a própria árvore no nível 0)
+    def otimizar(self, arvore):
+        if self.nivel < 1:
+            return arvore
+        arvore = self.visitar(arvore)
+        if self.nivel >= 2:
+            arvore = EliminadorCodigoMorto(arvore.identificadores, self.relatorio, self.protegidas).eliminar(arvore)
+        return arvore
+
+    def anotar(self, linha, mensagem):
+        self.relatorio.append(f"Linha {linha}: {mensagem}")
+
+    # Esquece o valor das variáveis que mudam no bloco
+    def esquecer(self, bloco, *extras):
+        for nome in self.atribuidas[id(bloco)].union(extras):
+            self.constantes.pop(nome, None)
+
+    def visitar_programa(self, nodo):
+        self.atribuidas = atribuicoes_por_bloco(nodo.bloco, self.normalizados)
+        if self.tipos is None:
+            self.tipos = inferir_tipos(nodo)
+        for declaracao in nodo.declaracoes:
+            nome = self.nomes[declaracao.simbolo]
+            self.constantes[nome] = self.tipos.valor_inicial(nome)
+        bloco = yield nodo.bloco
+        return Programa(nodo.declaracoes, bloco, nodo.identificadores)
+
+    # Um comando removido volta como None, e um SEPA trocado pelo bloco que
+    # sempre roda volta como esse Bloco, cujos comandos entram no lugar dele
+    def visitar_bloco(self, nodo):
+        comandos = []
+        for comando in nodo.comandos:
+            otimizado = yield comando
+            if otimizado.__class__ is Bloco:
+                comandos.extend(otimizado.comandos)
+            elif otimizado is not None:
+                comandos.append(otimizado)
+        return Bloco(comandos)
+
+    def visitar_atribuicao(self, nodo):
+        valor = yield nodo.valor
+        nome = self.normalizados[nodo.alvo.simbolo]
+        constante = valor_constante(valor)
+        if constante is None:
+            self.constantes.pop(nome, None)
+        else:
+            self.constantes[nome] = constante
+        return Atribuicao(nodo.alvo, valor, nodo.linha)
+
+    def visitar_ler(self, nodo):
+        self.constantes.pop(self.normalizados[nodo.variavel.simbolo], None)
+        return nodo
+
+    def visitar_escrever(self, nodo):
+        if nodo.valor.__class__ is Texto:
+            return nodo
+        valor = yield nodo.valor
+        return Escrever(valor, nodo.linha)
+
+    # Depois do SEPA só continua conhecido o que os dois caminhos concordam,
+    # a não ser que a condição seja constante e só um deles rode
+    def visitar_se(self, nodo):
+        condicao = yield nodo.condicao
+        antes = self.constantes
+        self.constantes = dict(antes)
+        entao = yield nodo.entao
+        depois_entao = self.constantes
+        self.constantes = dict(antes)
+        senao = None
+        if nodo.senao is not None:
+            senao = yield nodo.senao
+        depois_senao = self.constantes
+        teste = valor_constante(condicao)
+        if teste is None:
+            self.constantes = {nome: valor for nome, valor in depois_entao.items()
+                               if nome in depois_senao and mesmo_valor(valor, depois_senao[nome])}
+        elif teste:
+            self.constantes = depois_entao
+        else:
+            self.constantes = depois_senao
+        removido = nodo.senao if teste else nodo.entao
+        if (teste is None or self.nivel < 2
+                or (removido is not None and self.atribuidas[id(removido)] & self.protegidas)):
+            return Se(condicao, entao, senao, nodo.linha)
+        if teste:
+            self.anotar(nodo.linha, "SEPA com condição sempre verdadeira, ficou só o bloco do SEPA")
+            return entao
+        if senao is not None:
+            self.anotar(nodo.linha, "SEPA com condição sempre falsa, ficou só o bloco do NÃOFOI")
+            return senao
+        self.anotar(nodo.linha, "SEPA com condição sempre falsa removido")
+        return None
+
+    # A condição do MANDAENQUANTO é avaliada a cada volta, então só usa as
+    # variáveis que o corpo não muda; essas continuam conhecidas depois dele.
+    # No nível 2 a condição também é avaliada com os valores da entrada, e o
+    # laço sai se ela já começa falsa.
+    def visitar_enquanto(self, nodo):
+        if self.nivel >= 2:
+            teste = valor_constante((yield nodo.condicao))
+            if teste is not None and not teste and not self.atribuidas[id(nodo.corpo)] & self.protegidas:
+                self.anotar(nodo.linha, "MANDAENQUANTO com condição falsa na entrada removido")
+                return None
+        self.esquecer(nodo.corpo)
+        condicao = yield nodo.condicao
+        depois = dict(self.constantes)
+        corpo = yield nodo.corpo
+        self.constantes = depois
+        return Enquanto(condicao, corpo, nodo.linha)
+
+    # O MANDALEMBRAR é o for do C: a variável recebe o início, e enquanto a
+    # condição vale roda o corpo e depois o incremento. A condição e o
+    # incremento são dobrados como os do MANDAENQUANTO, sem os valores das
+    # variáveis que mudam no laço; o incremento vê o que o corpo deixou. No
+    # nível 2 o laço cuja condição já é falsa depois do início vira só a
+    # atribuição do início.
+    def visitar_para(self, nodo):
+        inicio = yield nodo.inicio
+        variavel = self.normalizados[nodo.variavel.simbolo]
+        alvo = self.normalizados[nodo.alvo_incremento.simbolo]
+        constante = valor_constante(inicio)
+        if constante is None:
+            self.constantes.pop(variavel, None)
+        else:
+            self.constantes[variavel] = constante
+        if self.nivel >= 2:
+            teste = valor_constante((yield nodo.condicao))
+            if (teste is not None and not teste and alvo not in self.protegidas
+                    and not self.atribuidas[id(nodo.corpo)] & self.protegidas):
+                self.anotar(nodo.linha, "MANDALEMBRAR que não dá nenhuma volta trocado pela atribuição do início")
+                return Atribuicao(nodo.variavel, inicio, nodo.linha)
+        self.esquecer(nodo.corpo, variavel, alvo)
+        condicao = yield nodo.condicao
+        depois = dict(self.constantes)
+        corpo = yield nodo.corpo
+        incremento = yield nodo.incremento
+        self.constantes = depois
+        return Para(nodo.variavel, inicio, condicao, nodo.alvo_incremento, incremento, corpo, nodo.linha)
+
+    def visitar_variavel(self, nodo):
+        valor = self.constantes.get(self.normalizados[nodo.simbolo])
+        if valor is None:
+            return nodo
+        return Constante(valor)
+
+    def visitar_numero(self, nodo):
+        return nodo
+
+    def visitar_constante(self, nodo):
+        return nodo
+
+    def visitar_parenteses(self, nodo):
+        expressao = yield nodo.expressao
+        if valor_constante(expressao) is not None:
+            return expressao
+        return Parenteses(expressao)
+
+    def visitar_binaria(self, nodo):
+        esquerda = yield nodo.esquerda
+        direita = yield nodo.direita
+        a = valor_constante(esquerda)
+        b = valor_constante(direita)
+        if a is not None and b is not None:
+            resultado = calcular(nodo.operador, a, b)
+            if resultado is not None:
+                return Constante(resultado)
+        return Binaria(nodo.operador, esquerda, direita)
+
+# Eliminação de atribuições mortas por análise de vivacidade: o programa
+# vira um grafo de fluxo, um nó por comando simples, condição ou volta de
+# laço, e as variáveis vivas (que ainda podem ser lidas) em cada nó são
+# calculadas com uma lista de trabalho, sem recursão, qualquer que seja a
+# profundidade dos blocos. Só sai
+# uma atribuição a uma variável do BAGULHOS cujo valor é uma constante ou
+# outra variável do BAGULHOS (algo que não pode falhar na execução) e que
+# ninguém lê depois; o OLHA e o FALA nunca saem. Uma atribuição removida não
+# conta como leitura do seu valor, então cadeias de cópias mortas somem de
+# uma vez. A declaração sai se a variável não está viva no início.
+class EliminadorCodigoMorto(Visitante):
+    def __init__(self, identificadores, relatorio, protegidas=frozenset()):
+        self.nomes = identificadores.nomes
+        self.normalizados = identificadores.normalizados
+        self.relatorio = relatorio
+        self.protegidas = protegidas
+        self.declaradas = set()  # Nomes Python iniciados pelo BAGULHOS
+        # Grafo de fluxo; o nó 0 é o fim do programa
+        self.usos = [frozenset()]  # Variáveis lidas pelo nó
+        self.definida = [None]  # Variável que recebe valor no nó
+        self.removivel = [False]  # Se o nó é uma atribuição que pode sair quando morta
+        self.seguintes = [[]]
+        self.vivas = []  # Variáveis vivas na entrada de cada nó
+        self.no_da_atribuicao = {}  # id(Atribuicao) -> nó
+        self.saida_do_laco = {}  # id(Para) -> nó para onde o laço sai
+
+    # Monta o grafo do programa e calcula as variáveis vivas; retorna o nó de entrada
+    def analisar(self, arvore):
+        self.declaradas = {self.nomes[declaracao.simbolo] for declaracao in arvore.declaracoes}
+        entrada = self.montar_grafo(arvore.bloco)
+        self.calcular_vivas()
+        return entrada
+
+    # Variáveis cujo valor ainda pode ser lido depois que o MANDALEMBRAR termina
+    def vivas_depois_do_laco(self, laco):
+        return self.vivas[self.saida_do_laco[id(laco)]]
+
+    def eliminar(self, arvore):
+        entrada = self.analisar(arvore)
+        usadas = set(self.definida).union(*self.usos)
+        declaracoes = []
+        for declaracao in arvore.declaracoes:
+            nome = self.nomes[declaracao.simbolo]
+            if nome in self.vivas[entrada] or nome in self.protegidas or keyword.iskeyword(nome):
+                declaracoes.append(declaracao)
+            elif nome in usadas:
+                self.anotar(declaracao.linha, f"valor inicial de {nome} nunca é lido, declaração removida")
+            else:
+                self.anotar(declaracao.linha, f"variável {nome} nunca usada, declaração removida")
+        bloco = self.visitar(arvore.bloco)
+        return Programa(declaracoes, bloco, arvore.identificadores)
+
+    def anotar(self, linha, mensagem):
+        self.relatorio.append(f"Linha {linha}: {mensagem}")
+
+    def novo_no(self, usos, definida=None, seguintes=None, removivel=False):
+        self.usos.append(usos)
+        self.definida.append(definida)
+        self.seguintes.append([] if seguintes is None else seguintes)
+        self.removivel.append(removivel)
+        return len(self.usos) - 1
+
+    # Se o valor atribuído não pode falhar na execução
+    def valor_seguro(self, valor):
+        while valor.__class__ is Parenteses:
+            valor = valor.expressao
+        if valor.__class__ is Variavel:
+            return self.normalizados[valor.simbolo] in self.declaradas
+        return valor_constante(valor) is not None
+
+    # Monta o grafo do bloco principal e retorna o nó de entrada. Cada bloco
+    # é ligado de trás para frente ao nó que vem depois dele; os blocos
+    # internos ficam numa pilha de tarefas, com a lista de seguintes do nó
+    # que leva a eles, completada quando a entrada deles é conhecida.
+    def montar_grafo(self, bloco):
+        entrada = None
+        tarefas = [(bloco, 0, None)]
+        while tarefas:
+            bloco, seguinte, ligar = tarefas.pop()
+            for comando in reversed(bloco.comandos):
+                seguinte = self.no_do_comando(comando, seguinte, tarefas)
+            if ligar is None:
+                entrada = seguinte
+            else:
+                ligar.append(seguinte)
+        return entrada
+
+    def no_do_comando(self, comando, seguinte, tarefas):
+        classe = comando.__class__
+        normalizados = self.normalizados
+        if classe is Atribuicao:
+            nome = normalizados[comando.alvo.simbolo]
+            removivel = nome in self.declaradas and nome not in self.protegidas and self.valor_seguro(comando.valor)
+            no = self.novo_no(frozenset(nomes_usados(comando.valor, normalizados)), nome, [seguinte], removivel)
+            self.no_da_atribuicao[id(comando)] = no
+            return no
+        if classe is Ler:
+            return self.novo_no(USOS_OLHA, normalizados[comando.variavel.simbolo], [seguinte])
+        if classe is Escrever:
+            if comando.valor.__class__ is Texto:
+                return self.novo_no(USOS_FALA, None, [seguinte])
+            return self.novo_no(USOS_FALA.union(nomes_usados(comando.valor, normalizados)), None, [seguinte])
+        if classe is Se:
+            no = self.novo_no(frozenset(nomes_usados(comando.condicao, normalizados)))
+            tarefas.append((comando.entao, seguinte, self.seguintes[no]))
+            if comando.senao is None:
+                self.seguintes[no].append(seguinte)
+            else:
+                tarefas.append((comando.senao, seguinte, self.seguintes[no]))
+            return no
+        if classe is Enquanto:
+            no = self.novo_no(frozenset(nomes_usados(comando.condicao, normalizados)), None, [seguinte])
+            tarefas.append((comando.corpo, no, self.seguintes[no]))
+            return no
+        # MANDALEMBRAR: o início, depois a condição a cada volta, levando ao
+        # corpo e ao incremento ou para fora do laço
+        cabeca = self.novo_no(frozenset(nomes_usados(comando.condicao, normalizados)), None, [seguinte])
+        volta = self.novo_no(frozenset(nomes_usados(comando.incremento, normalizados)),
+                             normalizados[comando.alvo_incremento.simbolo], [cabeca])
+        tarefas.append((comando.corpo, volta, self.seguintes[cabeca]))
+        self.saida_do_laco[id(comando)] = seguinte
+        return self.novo_no(frozenset(nomes_usados(comando.inicio, normalizados)),
+                            normalizados[comando.variavel.simbolo], [cabeca])
+
+    # Variáveis vivas na saída de um nó: as vivas na entrada dos seguintes
+    def vivas_na_saida(self, no):
+        vivas = set()
+        for seguinte in self.seguintes[no]:
+            vivas |= self.vivas[seguinte]
+        return vivas
+
+    # Se a atribuição do nó é morta: pode sair e ninguém lê o valor depois
+    def morta(self, no, vivas_saida):
+        return self.removivel[no] and self.definida[no] not in vivas_saida
+
+    def calcular_vivas(self):
+        total = len(self.usos)
+        anteriores = [[] for _ in range(total)]
+        for no, seguintes in enumerate(self.seguintes):
+            for seguinte in seguintes:
+                anteriores[seguinte].append(no)
+        self.vivas = [frozenset()] * total
+        pendentes = list(range(total))
+        na_lista = bytearray(b'\x01') * total
+        while pendentes:
+            no = pendentes.pop()
+            na_lista[no] = 0
+            vivas = self.vivas_na_saida(no)
+            if not self.morta(no, vivas):
+                vivas.discard(self.definida[no])
+                vivas |= self.usos[no]
+            vivas = frozenset(vivas)
+            if vivas != self.vivas[no]:
+                self.vivas[no] = vivas
+                for anterior in anteriores[no]:
+                    if not na_lista[anterior]:
+                        na_lista[anterior] = 1
+                        pendentes.append(anterior)
+
+    # Reconstrói os blocos sem as atribuições mortas
+    def visitar_bloco(self, nodo):
+        comandos = []
+        for comando in nodo.comandos:
+            classe = comando.__class__
+            if classe is Atribuicao:
+                no = self.no_da_atribuicao[id(comando)]
+                if self.morta(no, self.vivas_na_saida(no)):
+                    self.anotar(comando.linha, f"valor atribuído a {self.definida[no]} nunca é lido, atribuição removida")
+                    continue
+                comandos.append(comando)
+            elif classe is Se or classe is Enquanto or classe is Para:
+                comandos.append((yield comando))
+            else:
+                comandos.append(comando)
+        return Bloco(comandos)
+
+    def visitar_se(self, nodo):
+        entao = yield nodo.entao
+        senao = None if nodo.senao is None else (yield nodo.senao)
+        return Se(nodo.condicao, entao, senao, nodo.linha)
+
+    def visitar_enquanto(self, nodo):
+        corpo = yield nodo.corpo
+        return Enquanto(nodo.condicao, corpo, nodo.linha)
+
+    def visitar_para(self, nodo):
+        corpo = yield nodo.corpo
+        return Para(nodo.variavel, nodo.inicio, nodo.condicao, nodo.alvo_incremento, nodo.incremento, corpo,
+                    nodo.linha)
+
+# Otimiza a árvore de um programa conferido no nível pedido (0: nenhum); o
+# que foi tirado no nível 2 é anotado na lista relatorio, se informada.
+#
+# Para o Python, um nome que recebe valor em algum ponto de main() é local
+# nela toda: lido antes de receber valor dá UnboundLocalError, e não a
+# variável global ou a função de mesmo nome (print, range...). Se o nível 2
+# tirar todas as atribuições a um nome que continua sendo lido, isso
+# mudaria; esses nomes ficam protegidos e o programa é otimizado de novo.
+def otimizar(arvore, nivel=1, relatorio=None, tipos=None):
+    protegidas = frozenset()
+    while True:
+        anotacoes = []
+        otimizada = Otimizador(arvore.identificadores, nivel, anotacoes, protegidas, tipos).otimizar(arvore)
+        if nivel < 2:
+            break
+        atribuidos, _ = nomes_do_programa(arvore)
+        restantes, lidos = nomes_do_programa(otimizada)
+        perdidos = (atribuidos - restantes) & lidos
+        if perdidos <= protegidas:
+            break
+        protegidas |= perdidos
+    if relatorio is not None:
+        relatorio.extend(anotacoes)
+    return otimizada
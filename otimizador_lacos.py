@@ -0,0 +1,747 @@
+from arvore import (Atribuicao, Binaria, Bloco, Constante, Enquanto, Escrever, ParaIntervalo, Parenteses, Programa, Se,
+                    Texto, Variavel, Visitante)
+from lacos import ESPELHADA, e_variavel, nomes_se_inteira, passo_do_incremento, sem_parenteses, variaveis_inteiras
+from otimizador import Temporarias, atribuicoes_por_bloco, calcular, nomes_usados, valor_constante
+from tokens import TokenType
+
+# Otimizações do nível 3, feitas nos laços depois que o lacos.py traduziu os
+# MANDALEMBRAR (então valem para o MANDAENQUANTO, para os while e para os
+# for com range()):
+#
+# - Somas em laços contados: um laço cujo corpo só faz somas como
+#   "acc <- acc + e1 - e2", com cada parcela afim na variável de indução v
+#   (a * v + b, com a e b sem nada que o laço muda), vira a fórmula fechada:
+#   nas n voltas v vale inicio, inicio + k, ..., então
+#   acc += a * (n * inicio + k * (n * (n - 1) // 2)) + b * n. Vale para o for
+#   com range() e para o while "v < limite" (ou <=, >, >=) com um
+#   "v <- v + k" em qualquer ponto do corpo (nas somas depois dele v já vale
+#   v + k, então b ganha a * k); v também recebe o valor final, inicio + n * k. Com n
+#   conhecido na compilação a conta toda é feita nela; senão o laço vira
+#   "if condição:" com n numa temporária (_voltas1...). Como inteiros do
+#   Python não arredondam, só entram contas de int com variáveis que
+#   certamente têm valor, e a única exceção possível, a divisão por zero
+#   numa parte de e sem v, acontece na primeira volta ou em nenhuma.
+# - Expressões invariantes: uma conta do corpo (ou da condição do while) cujas
+#   variáveis o laço não muda é feita uma vez só, numa variável temporária
+#   (_inv1, _inv2...; identificadores do C.R.I.A não começam com "_")
+#   atribuída logo antes do laço mais externo em que ela não muda. Como a
+#   conta passa a rodar mesmo se o laço não der nenhuma volta, ou se ela
+#   estava num SEPA, só sai do laço o que nunca falha: contas de +, -, * e
+#   comparações entre inteiros, e // ou % por uma constante diferente de 0,
+#   com variáveis que certamente já têm valor (ver MovedorInvariantes).
+# - Desenrolamento: um for com range() de poucas voltas, conhecidas na
+#   compilação, repete o corpo "fator" vezes a cada volta (com v, v + k,
+#   v + 2k...) e um segundo for faz as voltas que sobram.
+
+FATOR_DESENROLAR = 4  # Cópias do corpo por volta num laço desenrolado
+LIMITE_VOLTAS_DESENROLAR = 64  # Só laços com até tantas voltas são desenrolados
+LIMITE_NODOS_DESENROLAR = 64  # Nem com o corpo maior que tantos nodos
+
+# Operações entre inteiros que nunca falham
+OPERACOES_SEGURAS = frozenset({TokenType.T_MAIS, TokenType.T_MENOS, TokenType.T_VEZES, TokenType.T_MAIOR,
+                               TokenType.T_MENOR, TokenType.T_MAIOR_IGUAL, TokenType.T_MENOR_IGUAL,
+                               TokenType.T_IGUAL, TokenType.T_DIFERENTE})
+
+def plural(quantidade, singular, plural):
+    return f"{quantidade} {singular if quantidade == 1 else plural}"
+
+def e_constante(nodo, valor):
+    constante = valor_constante(nodo)
+    return type(constante) is int and constante == valor
+
+# Contas que montam as fórmulas fechadas: operar calcula na compilação quando
+# os dois lados são constantes inteiras, e somar, subtrair e multiplicar
+# também tiram os "+ 0" e "* 1" e aceitam None como o 0 de uma forma afim
+def operar(operador, esquerda, direita):
+    valor_esquerda = valor_constante(esquerda)
+    valor_direita = valor_constante(direita)
+    if type(valor_esquerda) is int and type(valor_direita) is int:
+        resultado = calcular(operador, valor_esquerda, valor_direita)
+        if resultado is not None:
+            return Constante(resultado)
+    return Binaria(operador, esquerda, direita)
+
+def somar(x, y):
+    if x is None or e_constante(x, 0):
+        return y
+    if y is None or e_constante(y, 0):
+        return x
+    if type(valor_constante(y)) is int:
+        return somar_constante(x, valor_constante(y))
+    return operar(TokenType.T_MAIS, x, y)
+
+def subtrair(x, y):
+    if y is None or e_constante(y, 0):
+        return x
+    if x is not None and type(valor_constante(y)) is int:
+        return somar_constante(x, -valor_constante(y))
+    return operar(TokenType.T_MENOS, Constante(0) if x is None else x, y)
+
+# x + valor, juntando com a constante de "y + c" ou "y - c" ("n + 1 - 1" é n)
+def somar_constante(x, valor):
+    if x.__class__ is Binaria and x.operador in (TokenType.T_MAIS, TokenType.T_MENOS):
+        constante = valor_constante(x.direita)
+        if type(constante) is int:
+            valor += constante if x.operador is TokenType.T_MAIS else -constante
+            x = x.esquerda
+    if valor == 0:
+        return x
+    if valor > 0:
+        return operar(TokenType.T_MAIS, x, Constante(valor))
+    return operar(TokenType.T_MENOS, x, Constante(-valor))
+
+def multiplicar(x, y):
+    if x is None or y is None:
+        return None
+    if e_constante(x, 1):
+        return y
+    if e_constante(y, 1):
+        return x
+    return operar(TokenType.T_VEZES, x, y)
+
+# x // divisor arredondado para cima (x >= 0, divisor > 0)
+def dividir_para_cima(x, divisor):
+    if divisor == 1:
+        return x
+    return operar(TokenType.T_DIVIDIDO, somar(x, Constante(divisor - 1)), Constante(divisor))
+
+# Forma afim (a, b) da expressão na variável nome, ou seja, expressao = a * nome + b,
+# com None no lugar de um 0; None se a expressão não é afim no nome (nome
+# multiplicado por ele mesmo, ou dentro de /, % ou **). Uma parte sem o nome
+# fica como está na fonte.
+def forma_afim(expressao, nome, normalizados):
+    formas = {}  # id(nodo) -> (a, b)
+    pendentes = [(expressao, False)]
+    while pendentes:
+        nodo, pronto = pendentes.pop()
+        classe = nodo.__class__
+        if classe is Parenteses or classe is Binaria:
+            if not pronto:
+                pendentes.append((nodo, True))
+                if classe is Parenteses:
+                    pendentes.append((nodo.expressao, False))
+                else:
+                    pendentes += ((nodo.esquerda, False), (nodo.direita, False))
+                continue
+            if classe is Parenteses:
+                a, b = formas[id(nodo.expressao)]
+                formas[id(nodo)] = (None, nodo) if a is None else (a, b)
+                continue
+            a_esquerda, b_esquerda = formas[id(nodo.esquerda)]
+            a_direita, b_direita = formas[id(nodo.direita)]
+            if a_esquerda is None and a_direita is None:
+                formas[id(nodo)] = (None, nodo)
+            elif nodo.operador is TokenType.T_MAIS:
+                formas[id(nodo)] = (somar(a_esquerda, a_direita), somar(b_esquerda, b_direita))
+            elif nodo.operador is TokenType.T_MENOS:
+                formas[id(nodo)] = (subtrair(a_esquerda, a_direita), subtrair(b_esquerda, b_direita))
+            elif nodo.operador is TokenType.T_VEZES and a_esquerda is None:
+                formas[id(nodo)] = (multiplicar(b_esquerda, a_direita), multiplicar(b_esquerda, b_direita))
+            elif nodo.operador is TokenType.T_VEZES and a_direita is None:
+                formas[id(nodo)] = (multiplicar(a_esquerda, b_direita), multiplicar(b_esquerda, b_direita))
+            else:
+                return None
+        elif e_variavel(nodo, nome, normalizados):
+            formas[id(nodo)] = (Constante(1), None)
+        else:
+            formas[id(nodo)] = (None, nodo)
+    return formas[id(expressao)]
+
+# Parcelas de uma soma, como (positiva, nodo): "a - (b + c) + d" tem a, b, c e d,
+# com b e c negativas
+def parcelas(expressao):
+    lista = []
+    pendentes = [(expressao, True)]
+    while pendentes:
+        nodo, positiva = pendentes.pop()
+        nodo = sem_parenteses(nodo)
+        if nodo.__class__ is Binaria and nodo.operador is TokenType.T_MAIS:
+            pendentes += ((nodo.direita, positiva), (nodo.esquerda, positiva))
+        elif nodo.__class__ is Binaria and nodo.operador is TokenType.T_MENOS:
+            pendentes += ((nodo.direita, not positiva), (nodo.esquerda, positiva))
+        else:
+            lista.append((positiva, nodo))
+    return lista
+
+# Troca por fórmulas fechadas os laços que só somam (ver o começo do arquivo),
+# de dentro para fora
+class FechadorReducoes(Visitante):
+    def __init__(self, temporarias, relatorio):
+        self.temporarias = temporarias
+        self.identificadores = temporarias.identificadores
+        self.normalizados = self.identificadores.normalizados
+        self.relatorio = relatorio
+        self.inteiras = set()  # Nomes que só recebem int (ver lacos.variaveis_inteiras)
+
+    def anotar(self, linha, mensagem):
+        self.relatorio.append(f"Linha {linha}: {mensagem}")
+
+    # Se a expressão é int, sem nenhum dos nomes proibidos e só com variáveis
+    # int que certamente têm valor (estão no BAGULHOS com o nome usado)
+    def inteira(self, expressao, proibidas):
+        nomes = nomes_se_inteira(expressao, self.normalizados)
+        return (nomes is not None and nomes <= self.inteiras and not nomes & proibidas
+                and all(nome in self.identificadores.ids for nome in nomes))
+
+    # Somas do corpo de um laço de variável de indução v: acumulador ->
+    # (Variavel do acumulador, [(positiva, a, b)]), ou None se o corpo tem
+    # outra coisa ou uma soma que não dá para fechar. A soma pode ter várias
+    # parcelas, como em "acc <- acc + v * 3 + n". Nos comandos a partir de
+    # depois, v já foi somada de passo (o "v <- v + k" do while veio antes).
+    def somas(self, comandos, variavel, depois=None, passo=0):
+        termos = {}
+        for posicao, comando in enumerate(comandos):
+            if comando.__class__ is not Atribuicao:
+                return None
+            acumulador = self.normalizados[comando.alvo.simbolo]
+            lista = parcelas(comando.valor)
+            for indice, (positiva, parcela) in enumerate(lista):
+                if positiva and e_variavel(parcela, acumulador, self.normalizados):
+                    break
+            else:
+                return None
+            if acumulador == variavel:
+                return None
+            del lista[indice]
+            deslocamento = passo if depois is not None and posicao >= depois else 0
+            termos.setdefault(acumulador, (comando.alvo, []))[1].extend(
+                (positiva, parcela, deslocamento) for positiva, parcela in lista)
+        acumuladores = set(termos)
+        formas = {}
+        for acumulador, (alvo, lista) in termos.items():
+            if acumulador not in self.inteiras or acumulador not in self.identificadores.ids:
+                return None
+            afins = []
+            for positiva, parcela, deslocamento in lista:
+                forma = forma_afim(parcela, variavel, self.normalizados)
+                if forma is None or not self.inteira(parcela, acumuladores):
+                    return None
+                a, b = forma
+                if deslocamento and a is not None:
+                    b = somar(b, multiplicar(a, Constante(deslocamento)))
+                afins.append((positiva, a, b))
+            formas[acumulador] = (alvo, afins)
+        return formas
+
+    # Atribuições que fazem de uma vez as somas de n voltas, com v valendo
+    # inicio, inicio + passo, ...
+    def fechar(self, formas, voltas, inicio, passo, linha):
+        metade = operar(TokenType.T_DIVIDIDO, multiplicar(voltas, subtrair(voltas, Constante(1))), Constante(2))
+        soma_v = somar(multiplicar(voltas, inicio), multiplicar(Constante(passo), metade))
+        comandos = []
+        for alvo, afins in formas.values():
+            mais = menos = None
+            for positiva, a, b in afins:
+                termo = somar(multiplicar(a, soma_v), multiplicar(b, voltas))
+                if positiva:
+                    mais = somar(mais, termo)
+                else:
+                    menos = somar(menos, termo)
+            if mais is None and menos is None:
+                continue
+            valor = alvo if mais is None else Binaria(TokenType.T_MAIS, alvo, mais)
+            if menos is not None:
+                valor = Binaria(TokenType.T_MENOS, valor, menos)
+            comandos.append(Atribuicao(alvo, valor, linha))
+        return comandos
+
+    # "if condicao:" com as somas de n voltas (n > 0 quando a condição vale) e,
+    # se variavel não é None, o valor final dela; n vai para uma temporária se
+    # é uma conta usada mais de uma vez
+    def condicional(self, condicao, voltas, inicio, passo, formas, variavel, linha):
+        usos = 0 if variavel is None else 1
+        for _, afins in formas.values():
+            usos += sum((a is not None) * 2 + (b is not None) for _, a, b in afins)
+        comandos = []
+        if usos > 1 and voltas.__class__ is not Variavel:
+            temporaria = self.temporarias.criar('_voltas', linha)
+            comandos.append(Atribuicao(temporaria, voltas, linha))
+            voltas = temporaria
+        comandos += self.fechar(formas, voltas, inicio, passo, linha)
+        if variavel is not None:
+            if passo > 0:
+                final = somar(variavel, multiplicar(voltas, Constante(passo)))
+            else:
+                final = subtrair(variavel, multiplicar(voltas, Constante(-passo)))
+            comandos.append(Atribuicao(variavel, final, linha))
+        self.anotar_fechado(linha, formas, variavel)
+        return Se(condicao, Bloco(comandos), None, linha)
+
+    def anotar_fechado(self, linha, formas, variavel, voltas=None):
+        if formas:
+            mensagem = "laço de somas trocado pela fórmula fechada"
+        else:
+            mensagem = f"laço que só conta trocado pelo valor final de {self.normalizados[variavel.simbolo]}"
+        if voltas is not None:
+            mensagem += f" ({plural(voltas, 'volta', 'voltas')})"
+        self.anotar(linha, mensagem)
+
+    def visitar_programa(self, nodo):
+        self.inteiras = variaveis_inteiras(nodo)
+        bloco = yield nodo.bloco
+        return Programa(nodo.declaracoes, bloco, self.identificadores)
+
+    # Um laço trocado pelas contas volta como um Bloco, cujos comandos entram no lugar dele
+    def visitar_bloco(self, nodo):
+        comandos = []
+        for comando in nodo.comandos:
+            novo = yield comando
+            if novo.__class__ is Bloco:
+                comandos.extend(novo.comandos)
+            else:
+                comandos.append(novo)
+        return Bloco(comandos)
+
+    def visitar_atribuicao(self, nodo):
+        return nodo
+
+    def visitar_ler(self, nodo):
+        return nodo
+
+    def visitar_escrever(self, nodo):
+        return nodo
+
+    def visitar_se(self, nodo):
+        entao = yield nodo.entao
+        senao = None if nodo.senao is None else (yield nodo.senao)
+        return Se(nodo.condicao, entao, senao, nodo.linha)
+
+    # for v in range(inicio, fim, k): n é conhecido se início e fim são
+    # constantes; senão as somas ficam num "if inicio < fim" (ou >, com k < 0).
+    # Depois do for v não é lida, ou o lacos.py já atribuiu o valor final dela.
+    def visitar_para_intervalo(self, nodo):
+        corpo = yield nodo.corpo
+        laco = ParaIntervalo(nodo.variavel, nodo.inicio, nodo.fim, nodo.passo, corpo, nodo.linha)
+        formas = self.somas(corpo.comandos, self.normalizados[nodo.variavel.simbolo])
+        if formas is None:
+            return laco
+        limites = nomes_usados(nodo.inicio, self.normalizados) | nomes_usados(nodo.fim, self.normalizados)
+        if limites & set(formas):
+            return laco
+        passo = nodo.passo
+        inicio = valor_constante(sem_parenteses(nodo.inicio))
+        fim = valor_constante(sem_parenteses(nodo.fim))
+        if type(inicio) is int and type(fim) is int:
+            voltas = max(0, -((inicio - fim) // passo))
+            self.anotar_fechado(nodo.linha, formas, nodo.variavel, voltas)
+            return Bloco(self.fechar(formas, Constante(voltas), Constante(inicio), passo, nodo.linha))
+        if not formas:
+            return laco
+        if passo > 0:
+            condicao = Binaria(TokenType.T_MENOR, nodo.inicio, nodo.fim)
+            voltas = dividir_para_cima(subtrair(nodo.fim, nodo.inicio), passo)
+        else:
+            condicao = Binaria(TokenType.T_MAIOR, nodo.inicio, nodo.fim)
+            voltas = dividir_para_cima(subtrair(nodo.inicio, nodo.fim), -passo)
+        return self.condicional(condicao, voltas, nodo.inicio, passo, formas, None, nodo.linha)
+
+    # while v < limite (ou <=, >, >=) com um "v <- v + k" no corpo, k na
+    # direção da condição (senão o laço pode nunca acabar); o resto do corpo
+    # são somas, antes ou depois dele
+    def visitar_enquanto(self, nodo):
+        corpo = yield nodo.corpo
+        laco = Enquanto(nodo.condicao, corpo, nodo.linha)
+        condicao = sem_parenteses(nodo.condicao)
+        if condicao.__class__ is not Binaria or condicao.operador not in ESPELHADA:
+            return laco
+        # v é o lado da condição que o corpo muda, numa atribuição só
+        lados = ((condicao.esquerda, condicao.operador, condicao.direita),
+                 (condicao.direita, ESPELHADA[condicao.operador], condicao.esquerda))
+        for lado, operador, limite in lados:
+            lado = sem_parenteses(lado)
+            if lado.__class__ is not Variavel:
+                continue
+            variavel = self.normalizados[lado.simbolo]
+            posicoes = [posicao for posicao, comando in enumerate(corpo.comandos)
+                        if comando.__class__ is Atribuicao and self.normalizados[comando.alvo.simbolo] == variavel]
+            if len(posicoes) == 1:
+                break
+        else:
+            return laco
+        posicao = posicoes[0]
+        incremento = corpo.comandos[posicao]
+        passo = passo_do_incremento(incremento.valor, variavel, self.normalizados)
+        if passo is None or operador is TokenType.T_IGUAL or operador is TokenType.T_DIFERENTE:
+            return laco
+        if (passo > 0) != (operador in (TokenType.T_MENOR, TokenType.T_MENOR_IGUAL)):
+            return laco
+        formas = self.somas(corpo.comandos[:posicao] + corpo.comandos[posicao + 1:], variavel, posicao, passo)
+        if (formas is None or variavel not in self.inteiras or variavel not in self.identificadores.ids
+                or not self.inteira(limite, set(formas) | {variavel})):
+            return laco
+        if passo > 0:
+            diferenca = subtrair(limite, incremento.alvo)
+        else:
+            diferenca = subtrair(incremento.alvo, limite)
+        if operador in (TokenType.T_MENOR, TokenType.T_MAIOR):
+            voltas = dividir_para_cima(diferenca, abs(passo))
+        elif abs(passo) == 1:
+            voltas = somar(diferenca, Constante(1))
+        else:
+            voltas = somar(operar(TokenType.T_DIVIDIDO, diferenca, Constante(abs(passo))), Constante(1))
+        return self.condicional(nodo.condicao, voltas, incremento.alvo, passo, formas, incremento.alvo,
+                                nodo.linha)
+
+# Move as expressões invariantes para antes dos laços numa passada só, de
+# cima para baixo. O nível de uma expressão é a profundidade do laço mais
+# interno (dos que a envolvem) que muda alguma das suas variáveis; ela é
+# invariante nos laços mais fundos que isso, e vai para antes do primeiro
+# deles. Uma subexpressão que vai para o mesmo laço que a expressão em volta
+# dela vai junto; uma de nível menor vai para um laço mais externo, e a
+# temporária dela entra na conta da outra.
+#
+# Uma variável certamente já tem valor antes do laço se ela está no BAGULHOS
+# com o nome usado (a iniciação "x = 0" só sai, no nível 2, quando toda leitura
+# de x vem depois de uma atribuição a x, que então também vem antes do laço,
+# já que o laço não muda x); "X" declarada e usada como "x" fica no laço.
+class MovedorInvariantes(Visitante):
+    def __init__(self, temporarias, relatorio):
+        self.temporarias = temporarias
+        self.identificadores = temporarias.identificadores
+        self.normalizados = self.identificadores.normalizados
+        self.relatorio = relatorio
+        self.inteiras = set()  # Nomes que só recebem int (ver lacos.variaveis_inteiras)
+        self.atribuidas = {}  # id(bloco) -> nomes Python que recebem valor no bloco
+        self.profundidade = {}  # Nome -> profundidade do laço mais interno que o muda
+        self.lacos = []  # Laços em volta do comando atual, o mais interno no fim
+        self.chaves = {}  # Estrutura de uma expressão -> número que a identifica
+
+    def anotar(self, linha, mensagem):
+        self.relatorio.append(f"Linha {linha}: {mensagem}")
+
+    # Número que identifica a estrutura de uma expressão; os parênteses não contam
+    def chave(self, estrutura):
+        return self.chaves.setdefault(estrutura, len(self.chaves))
+
+    # Nível, segurança (se pode sair do laço) e chave de cada nodo da
+    # expressão, de baixo para cima: id(nodo) -> (nivel, segura, folha, chave)
+    def examinar(self, expressao):
+        dados = {}
+        pendentes = [(expressao, False)]
+        while pendentes:
+            nodo, pronto = pendentes.pop()
+            classe = nodo.__class__
+            if classe is Variavel:
+                nome = self.normalizados[nodo.simbolo]
+                segura = nome in self.inteiras and nome in self.identificadores.ids
+                dados[id(nodo)] = (self.profundidade.get(nome, 0), segura, True, self.chave(('v', nome)))
+            elif classe is Parenteses or classe is Binaria:
+                filhos = (nodo.expressao,) if classe is Parenteses else (nodo.esquerda, nodo.direita)
+                if not pronto:
+                    pendentes.append((nodo, True))
+                    pendentes.extend((filho, False) for filho in filhos)
+                elif classe is Parenteses:
+                    dados[id(nodo)] = dados[id(nodo.expressao)]
+                else:
+                    nivel_e, segura_e, _, chave_e = dados[id(nodo.esquerda)]
+                    nivel_d, segura_d, _, chave_d = dados[id(nodo.direita)]
+                    segura = segura_e and segura_d
+                    if nodo.operador is TokenType.T_DIVIDIDO or nodo.operador is TokenType.T_RESTO:
+                        divisor = valor_constante(sem_parenteses(nodo.direita))
+                        segura = segura and type(divisor) is int and divisor != 0
+                    elif nodo.operador not in OPERACOES_SEGURAS:
+                        segura = False
+                    dados[id(nodo)] = (max(nivel_e, nivel_d), segura, False,
+                                       self.chave((nodo.operador, chave_e, chave_d)))
+            else:
+                valor = valor_constante(nodo)
+                dados[id(nodo)] = (0, type(valor) is int, True, self.chave(('c', repr(valor))))
+        return dados
+
+    # Laço (1 é o mais externo) para onde a subexpressão vai, ou 0 se ela fica
+    def destino(self, dado):
+        nivel, segura, folha, _ = dado
+        if not segura or folha or nivel >= len(self.lacos):
+            return 0
+        return nivel + 1
+
+    # Expressão com as partes invariantes trocadas por temporárias atribuídas
+    # antes dos laços para onde elas vão
+    def mover(self, expressao):
+        if not self.lacos:
+            return expressao
+        dados = self.examinar(expressao)
+        resultados = []
+        pendentes = [(expressao, 0, False)]  # (nodo, destino do nodo em volta, pronto)
+        while pendentes:
+            nodo, destino_pai, pronto = pendentes.pop()
+            classe = nodo.__class__
+            destino = self.destino(dados[id(nodo)])
+            if classe is not Binaria and classe is not Parenteses:
+                resultados.append(nodo)
+                continue
+            if not pronto:
+                pendentes.append((nodo, destino_pai, True))
+                if classe is Parenteses:
+                    pendentes.append((nodo.expressao, destino, False))
+                else:
+                    pendentes.append((nodo.direita, destino, False))
+                    pendentes.append((nodo.esquerda, destino, False))
+                continue
+            if classe is Parenteses:
+                novo = Parenteses(resultados.pop())
+            else:
+                direita = resultados.pop()
+                novo = Binaria(nodo.operador, resultados.pop(), direita)
+            if destino and destino != destino_pai:
+                novo = self.temporaria(destino, dados[id(nodo)][3], novo)
+            resultados.append(novo)
+        return resultados[0]
+
+    # Uso da temporária que guarda a expressão antes do laço de destino,
+    # criada na primeira vez que a expressão aparece nele
+    def temporaria(self, destino, chave, expressao):
+        laco = self.lacos[destino - 1]
+        variavel = laco['temporarias'].get(chave)
+        if variavel is None:
+            variavel = self.temporarias.criar('_inv', laco['linha'])
+            laco['temporarias'][chave] = variavel
+            laco['atribuicoes'].append(Atribuicao(variavel, sem_parenteses(expressao), laco['linha']))
+        return variavel
+
+    # Entra num laço que muda as variáveis informadas
+    def entrar(self, variantes, linha):
+        profundidade = len(self.lacos) + 1
+        anteriores = {nome: self.profundidade.get(nome) for nome in variantes}
+        for nome in variantes:
+            self.profundidade[nome] = profundidade
+        self.lacos.append({'linha': linha, 'anteriores': anteriores, 'temporarias': {}, 'atribuicoes': []})
+
+    # Sai do laço; retorna o laço reconstruído, precedido das temporárias
+    def sair(self, laco):
+        dados = self.lacos.pop()
+        for nome, anterior in dados['anteriores'].items():
+            if anterior is None:
+                del self.profundidade[nome]
+            else:
+                self.profundidade[nome] = anterior
+        if not dados['atribuicoes']:
+            return laco
+        self.anotar(dados['linha'], plural(len(dados['atribuicoes']), "expressão invariante calculada",
+                                           "expressões invariantes calculadas") + " antes do laço")
+        return Bloco(dados['atribuicoes'] + [laco])
+
+    def visitar_programa(self, nodo):
+        self.inteiras = variaveis_inteiras(nodo)
+        self.atribuidas = atribuicoes_por_bloco(nodo.bloco, self.normalizados)
+        bloco = yield nodo.bloco
+        return Programa(nodo.declaracoes, bloco, self.identificadores)
+
+    # Um laço com temporárias volta como um Bloco, cujos comandos entram no lugar dele
+    def visitar_bloco(self, nodo):
+        comandos = []
+        for comando in nodo.comandos:
+            novo = yield comando
+            if novo.__class__ is Bloco:
+                comandos.extend(novo.comandos)
+            else:
+                comandos.append(novo)
+        return Bloco(comandos)
+
+    def visitar_atribuicao(self, nodo):
+        return Atribuicao(nodo.alvo, self.mover(nodo.valor), nodo.linha)
+
+    def visitar_ler(self, nodo):
+        return nodo
+
+    def visitar_escrever(self, nodo):
+        if nodo.valor.__class__ is Texto:
+            return nodo
+        return Escrever(self.mover(nodo.valor), nodo.linha)
+
+    def visitar_se(self, nodo):
+        condicao = self.mover(nodo.condicao)
+        entao = yield nodo.entao
+        senao = None if nodo.senao is None else (yield nodo.senao)
+        return Se(condicao, entao, senao, nodo.linha)
+
+    def visitar_enquanto(self, nodo):
+        self.entrar(self.atribuidas[id(nodo.corpo)], nodo.linha)
+        condicao = self.mover(nodo.condicao)
+        corpo = yield nodo.corpo
+        return self.sair(Enquanto(condicao, corpo, nodo.linha))
+
+    # O início e o fim do range() são avaliados uma vez, fora do laço
+    def visitar_para_intervalo(self, nodo):
+        inicio = self.mover(nodo.inicio)
+        fim = self.mover(nodo.fim)
+        self.entrar(self.atribuidas[id(nodo.corpo)] | {self.normalizados[nodo.variavel.simbolo]}, nodo.linha)
+        corpo = yield nodo.corpo
+        return self.sair(ParaIntervalo(nodo.variavel, inicio, fim, nodo.passo, corpo, nodo.linha))
+
+# Cópia de um bloco com cada leitura de uma variável trocada por
+# "variavel + deslocamento"
+class Deslocador(Visitante):
+    def __init__(self, normalizados, nome, deslocamento):
+        self.normalizados = normalizados
+        self.nome = nome
+        self.deslocamento = deslocamento
+
+    def visitar_bloco(self, nodo):
+        comandos = []
+        for comando in nodo.comandos:
+            comandos.append((yield comando))
+        return Bloco(comandos)
+
+    def visitar_atribuicao(self, nodo):
+        return Atribuicao(nodo.alvo, (yield nodo.valor), nodo.linha)
+
+    def visitar_ler(self, nodo):
+        return nodo
+
+    def visitar_escrever(self, nodo):
+        if nodo.valor.__class__ is Texto:
+            return nodo
+        return Escrever((yield nodo.valor), nodo.linha)
+
+    def visitar_se(self, nodo):
+        condicao = yield nodo.condicao
+        entao = yield nodo.entao
+        senao = None if nodo.senao is None else (yield nodo.senao)
+        return Se(condicao, entao, senao, nodo.linha)
+
+    def visitar_enquanto(self, nodo):
+        condicao = yield nodo.condicao
+        return Enquanto(condicao, (yield nodo.corpo), nodo.linha)
+
+    def visitar_para_intervalo(self, nodo):
+        inicio = yield nodo.inicio
+        fim = yield nodo.fim
+        return ParaIntervalo(nodo.variavel, inicio, fim, nodo.passo, (yield nodo.corpo), nodo.linha)
+
+    def visitar_variavel(self, nodo):
+        if self.normalizados[nodo.simbolo] != self.nome:
+            return nodo
+        if self.deslocamento > 0:
+            return Binaria(TokenType.T_MAIS, nodo, Constante(self.deslocamento))
+        return Binaria(TokenType.T_MENOS, nodo, Constante(-self.deslocamento))
+
+    def visitar_numero(self, nodo):
+        return nodo
+
+    def visitar_constante(self, nodo):
+        return nodo
+
+    def visitar_parenteses(self, nodo):
+        return Parenteses((yield nodo.expressao))
+
+    def visitar_binaria(self, nodo):
+        esquerda = yield nodo.esquerda
+        return Binaria(nodo.operador, esquerda, (yield nodo.direita))
+
+# Número de nodos de um bloco, parando assim que passa do limite
+def tamanho_ate(bloco, limite):
+    total = 0
+    pendentes = [bloco]
+    while pendentes and total <= limite:
+        nodo = pendentes.pop()
+        total += 1
+        classe = nodo.__class__
+        if classe is Bloco:
+            pendentes.extend(nodo.comandos)
+        elif classe is Atribuicao:
+            pendentes.append(nodo.valor)
+        elif classe is Escrever:
+            pendentes.append(nodo.valor)
+        elif classe is Se:
+            pendentes.append(nodo.condicao)
+            pendentes.append(nodo.entao)
+            if nodo.senao is not None:
+                pendentes.append(nodo.senao)
+        elif classe is Enquanto:
+            pendentes.append(nodo.condicao)
+            pendentes.append(nodo.corpo)
+        elif classe is ParaIntervalo:
+            pendentes += (nodo.inicio, nodo.fim, nodo.corpo)
+        elif classe is Binaria:
+            pendentes.append(nodo.esquerda)
+            pendentes.append(nodo.direita)
+        elif classe is Parenteses:
+            pendentes.append(nodo.expressao)
+    return total
+
+# Desenrola os for com range() de poucas voltas conhecidas, de dentro para
+# fora (um laço interno já desenrolado conta no tamanho do corpo do externo)
+class Desenrolador(Visitante):
+    def __init__(self, identificadores, relatorio, fator):
+        self.normalizados = identificadores.normalizados
+        self.relatorio = relatorio
+        self.fator = fator
+
+    def anotar(self, linha, mensagem):
+        self.relatorio.append(f"Linha {linha}: {mensagem}")
+
+    def visitar_programa(self, nodo):
+        bloco = yield nodo.bloco
+        return Programa(nodo.declaracoes, bloco, nodo.identificadores)
+
+    def visitar_bloco(self, nodo):
+        comandos = []
+        for comando in nodo.comandos:
+            novo = yield comando
+            if novo.__class__ is Bloco:
+                comandos.extend(novo.comandos)
+            else:
+                comandos.append(novo)
+        return Bloco(comandos)
+
+    def visitar_atribuicao(self, nodo):
+        return nodo
+
+    def visitar_ler(self, nodo):
+        return nodo
+
+    def visitar_escrever(self, nodo):
+        return nodo
+
+    def visitar_se(self, nodo):
+        entao = yield nodo.entao
+        senao = None if nodo.senao is None else (yield nodo.senao)
+        return Se(nodo.condicao, entao, senao, nodo.linha)
+
+    def visitar_enquanto(self, nodo):
+        return Enquanto(nodo.condicao, (yield nodo.corpo), nodo.linha)
+
+    # for v in range(a, b, k) com n voltas vira um for de passo fator * k com
+    # o corpo repetido para v, v + k, ..., e um for das n % fator voltas
+    # restantes com o corpo original
+    def visitar_para_intervalo(self, nodo):
+        corpo = yield nodo.corpo
+        laco = ParaIntervalo(nodo.variavel, nodo.inicio, nodo.fim, nodo.passo, corpo, nodo.linha)
+        inicio = valor_constante(sem_parenteses(nodo.inicio))
+        fim = valor_constante(sem_parenteses(nodo.fim))
+        if type(inicio) is not int or type(fim) is not int:
+            return laco
+        passo = nodo.passo
+        voltas = max(0, -((inicio - fim) // passo))
+        if (voltas < self.fator or voltas > LIMITE_VOLTAS_DESENROLAR
+                or tamanho_ate(corpo, LIMITE_NODOS_DESENROLAR) > LIMITE_NODOS_DESENROLAR):
+            return laco
+        nome = self.normalizados[nodo.variavel.simbolo]
+        comandos = list(corpo.comandos)
+        for copia in range(1, self.fator):
+            comandos += Deslocador(self.normalizados, nome, copia * passo).visitar(corpo).comandos
+        meio = inicio + voltas // self.fator * self.fator * passo
+        lacos = [ParaIntervalo(nodo.variavel, nodo.inicio, Constante(meio), passo * self.fator, Bloco(comandos),
+                               nodo.linha)]
+        sobra = voltas % self.fator
+        mensagem = f"MANDALEMBRAR de {voltas} voltas desenrolado {self.fator} vezes"
+        if sobra:
+            lacos.append(ParaIntervalo(nodo.variavel, Constante(meio), nodo.fim, passo, corpo, nodo.linha))
+            mensagem += f", com outro laço para {plural(sobra, 'volta que sobra', 'voltas que sobram')}"
+        self.anotar(nodo.linha, mensagem)
+        return Bloco(lacos)
+
+# Otimiza os laços de uma árvore já com os MANDALEMBRAR traduzidos (só no
+# nível 3); fator é quantas vezes o corpo dos laços desenrolados se repete
+# (1 não desenrola nada). O que foi feito é anotado na lista relatorio.
+def otimizar_lacos(arvore, nivel=3, relatorio=None, fator=FATOR_DESENROLAR):
+    if nivel < 3:
+        return arvore
+    relatorio = [] if relatorio is None else relatorio
+    temporarias = Temporarias(arvore.identificadores)
+    arvore = FechadorReducoes(temporarias, relatorio).visitar(arvore)
+    arvore = MovedorInvariantes(temporarias, relatorio).visitar(arvore)
+    if fator > 1:
+        arvore = Desenrolador(arvore.identificadores, relatorio, fator).visitar(arvore)
+    return arvore
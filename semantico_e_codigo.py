@@ -1,53 +1,13 @@
 import sys
-from enum import Enum, auto
-
-class TokenType(Enum):
-    T_ENOIS         = auto()
-    T_PARTIU        = auto()
-    T_BAGULHOS      = auto()
-    T_VIRGULA       = auto()
-    T_PONTO_VIRGULA = auto()
-    T_SEPA          = auto()
-    T_NAOFOI        = auto()
-    T_FIMSEPA       = auto()
-    T_MANDAENQUANTO = auto()
-    T_PARAMANDA     = auto()
-    T_MANDALEMBRAR  = auto()
-    T_SETA          = auto()
-    T_ATEALILA      = auto()
-    T_DESENCANA     = auto()
-    T_OLHA          = auto()
-    T_ABRE_PAR      = auto()
-    T_FECHA_PAR     = auto()
-    T_FALA          = auto()
-    T_MAIOR         = auto()
-    T_MENOR         = auto()
-    T_MAIOR_IGUAL   = auto()
-    T_MENOR_IGUAL   = auto()
-    T_IGUAL         = auto()
-    T_DIFERENTE     = auto()
-    T_MAIS          = auto()
-    T_MENOS         = auto()
-    T_VEZES         = auto()
-    T_DIVIDIDO      = auto()
-    T_RESTO         = auto()
-    T_ELEVADO       = auto()
-    T_NUMERO        = auto()
-    T_ID            = auto()
-    T_STRING        = auto()
-    T_FIM_FONTE     = auto()
-    T_ERRO_LEX      = auto()
-    T_NULO          = auto()
-
-class Token:
-    def __init__(self, tipo: TokenType, lexema, linha, coluna):
-        self.tipo = tipo
-        self.lexema = lexema
-        self.linha = linha
-        self.coluna = coluna
+from functools import partial
 
-    def __str__(self):
-        return f"{self.tipo.name} | {self.lexema} | linha {self.linha} | coluna {self.coluna}"
+from arvore import Texto, Visitante
+from io_rapido import CODIGO_CHAMADA_RAPIDA, CODIGO_ENTRADA_RAPIDA, CODIGO_SAIDA_RAPIDA, IMPORT_SYS
+from lacos import traduzir_lacos
+from sintatico import SintaticoCria
+from tipos import CODIGO_DIVIDIR, INTEIRO, REAL, inferir_tipos
+from tokens import BufferTokens, TokenType, carregar_lex
+from vetorizador import REDUCOES, TAMANHO_BLOCO_VETOR
 
 class ErroSemanticoException(Exception):
     pass
@@ -58,26 +18,157 @@ class ErroSintaticoException(Exception):
 class ErroLexicoException(Exception):
     pass
 
+# Mensagens dos erros semânticos de variável, também usadas pelo servidor de linguagem
+def mensagem_ja_declarada(nome, linha):
+    return f"Variável {nome} já declarada! linha: {linha}"
+
+def mensagem_nao_declarada(nome, linha):
+    return f"Variável {nome} não está declarada! linha: {linha}"
+
+# Nodo da pilha semântica. Folhas (variável, número, string) guardam o
+# código; as operações e os parênteses guardam o operador Python e os
+# operandos, e viram texto uma vez só, quando o comando é emitido (ver
+# renderizar), em vez de cada regra concatenar e normalizar de novo o texto
+# de toda a subexpressão.
 class NodoPilhaSemantica:
-    def __init__(self, codigo, tipo):
-        self.codigo = codigo
+    __slots__ = ('codigo', 'tipo', 'simbolo', 'minusculo', 'operador', 'operandos')
+
+    def __init__(self, codigo, tipo, simbolo=None, minusculo=None, operador=None, operandos=()):
+        self.codigo = codigo  # None nas operações
         self.tipo = tipo
-    
+        self.simbolo = simbolo  # ID do identificador, quando o nodo é uma variável
+        self.minusculo = minusculo  # Código já normalizado, quando conhecido
+        self.operador = operador  # Operador Python, '()' nos parênteses, None nas folhas
+        self.operandos = operandos
+
     def getCodigo(self):
+        if self.codigo is None:
+            return renderizar(self)
         return self.codigo
-    
+
     def getCodigoMinusculo(self):
-        return self.codigo.lower()
+        if self.minusculo is None:
+            self.minusculo = renderizar(self) if self.codigo is None else self.codigo.lower()
+        return self.minusculo
     
     def getTipo(self):
         return self.tipo
 
+    def getSimbolo(self):
+        return self.simbolo
+
+# Regra semântica de cada operador binário
+REGRA_DO_OPERADOR = {
+    TokenType.T_MAIS: 5, TokenType.T_MENOS: 6, TokenType.T_VEZES: 7,
+    TokenType.T_DIVIDIDO: 8, TokenType.T_RESTO: 9, TokenType.T_ELEVADO: 10,
+    TokenType.T_MAIOR: 19, TokenType.T_MENOR: 20, TokenType.T_MAIOR_IGUAL: 21,
+    TokenType.T_MENOR_IGUAL: 22, TokenType.T_IGUAL: 23, TokenType.T_DIFERENTE: 24,
+}
+
+# Método de SemanticoCria que trata cada regra semântica
+TRATADORES_DAS_REGRAS = {
+    0: 'regra_inicio_programa', 1: 'regra_fim_programa', 3: 'regra_atribuicao', 4: 'regra_variavel_alvo',
+    8: 'regra_divisao', 11: 'regra_variavel_expressao', 12: 'regra_numero', 13: 'regra_parenteses', 14: 'regra_ler',
+    15: 'regra_inicio_enquanto', 16: 'regra_fim_bloco', 17: 'regra_inicio_se', 18: 'regra_senao',
+    25: 'regra_escrever', 30: 'regra_para', 31: 'regra_para_vetorizado', 32: 'regra_reducao',
+}
+
+# Operador Python gerado pelas regras das operações binárias (SemanticoCria.regra_operacao)
+OPERADORES_DAS_REGRAS = {
+    5: '+', 6: '-', 7: '*', 9: '%', 10: '**',
+    19: '>', 20: '<', 21: '>=', 22: '<=', 23: '==', 24: '!=',
+}
+
+# Instrumentação das regras semânticas, ligada só quando pedida: conta
+# quantas vezes cada regra foi disparada e, com um arquivo, grava também o
+# rastro completo, uma linha por regra, na ordem em que foram disparadas
+class RastroRegras:
+    def __init__(self, arquivo=None):
+        self.contagem = {}  # Número da regra -> vezes disparada
+        self.arquivo = arquivo  # Arquivo de texto aberto para o rastro completo (None: só contagem)
+
+    def registrar(self, numero_regra):
+        self.contagem[numero_regra] = self.contagem.get(numero_regra, 0) + 1
+        if self.arquivo is not None:
+            self.arquivo.write(f"Regra Semântica {numero_regra}\n")
+
+    # Linhas do resumo da contagem, em ordem de regra
+    def resumo(self):
+        return [f"Regra Semântica {numero:2}: {vezes} vez(es)" for numero, vezes in sorted(self.contagem.items())]
+
+# Divisão do "/" (regra 8) pelo tipo dos operandos (ver tipos.py); a dos
+# MISTO é a chamada _dividir(a, b)
+OPERADORES_DIVISAO = {INTEIRO: '//', REAL: '/'}
+CHAMADA_DIVIDIR = '_dividir'
+
+# Precedência de cada operador no Python gerado (maior liga mais forte)
+PRECEDENCIA_PYTHON = {
+    CHAMADA_DIVIDIR: 5, '**': 4, '*': 3, '/': 3, '//': 3, '%': 3, '+': 2, '-': 2,
+    '>': 1, '<': 1, '>=': 1, '<=': 1, '==': 1, '!=': 1,
+}
+
+# Se o operando de uma operação precisa de parênteses no Python gerado:
+# quando liga mais fraco que o operador, ou tanto quanto ele no lado em que a
+# associatividade não agrupa ('**' agrupa à direita, as comparações não
+# agrupam, já que o Python as encadearia)
+def precisa_parenteses(operando, operador, a_direita):
+    if operando.operador is None or operando.operador == '()':
+        return False
+    interno = PRECEDENCIA_PYTHON[operando.operador]
+    externo = PRECEDENCIA_PYTHON[operador]
+    if interno != externo:
+        return interno < externo
+    if externo == 1:
+        return True
+    return a_direita != (operador == '**')
+
+# Texto Python (normalizado) de uma expressão da pilha semântica, montado
+# numa passada só com uma pilha explícita. Os parênteses da fonte são
+# mantidos; outros só entram onde a precedência exige.
+def renderizar(nodo):
+    partes = []
+    pendentes = [nodo]
+    while pendentes:
+        item = pendentes.pop()
+        if item.__class__ is str:
+            partes.append(item)
+        elif item.operador is None:
+            partes.append(item.getCodigoMinusculo())
+        elif item.operador == '()':
+            pendentes += (')', item.operandos[0], '(')
+        elif item.operador == CHAMADA_DIVIDIR:
+            pendentes += (')', item.operandos[1], ', ', item.operandos[0], CHAMADA_DIVIDIR + '(')
+        else:
+            esquerda, direita = item.operandos
+            if precisa_parenteses(direita, item.operador, True):
+                pendentes += (')', direita, '(')
+            else:
+                pendentes.append(direita)
+            pendentes.append(f' {item.operador} ')
+            if precisa_parenteses(esquerda, item.operador, False):
+                pendentes += (')', esquerda, '(')
+            else:
+                pendentes.append(esquerda)
+    return ''.join(partes)
+
+# Texto Python de uma constante calculada pelo otimizador; negativos vão
+# entre parênteses, para não mudar de sentido como operando ("(-2) ** 2")
+def texto_constante(valor):
+    texto = repr(valor)
+    if texto[0] == '-':
+        return f'({texto})'
+    return texto
+
 class PilhaSemantica:
     def __init__(self):
         self.pilha = []
-    
-    def push(self, codigo, tipo):
-        self.pilha.append(NodoPilhaSemantica(codigo, tipo))
+
+    def push(self, codigo, tipo, simbolo=None, minusculo=None):
+        self.pilha.append(NodoPilhaSemantica(codigo, tipo, simbolo, minusculo))
+
+    # Empilha uma operação (ou parênteses) sobre os operandos já desempilhados
+    def push_operacao(self, operador, operandos, tipo):
+        self.pilha.append(NodoPilhaSemantica(None, tipo, operador=operador, operandos=operandos))
     
     def pop(self):
         if self.pilha:
@@ -87,560 +178,485 @@ class PilhaSemantica:
     def isEmpty(self):
         return len(self.pilha) == 0
 
-class SemanticoCria:
-    def __init__(self, arquivo_lex):
-        self.tokens = []
+# Tabela de símbolos indexada pelo ID denso de cada identificador (ver
+# tokens.Identificadores): declarar e consultar uma variável é só acessar
+# uma posição de bytearray, sem hash de strings
+class TabelaSimbolos:
+    def __init__(self, identificadores):
+        self.identificadores = identificadores
+        self.declarado = bytearray(len(identificadores))
+        self.declarados = []  # IDs na ordem de declaração
+
+    def declarar(self, simbolo):
+        if simbolo >= len(self.declarado):
+            self.declarado.extend(bytes(simbolo + 1 - len(self.declarado)))
+        self.declarado[simbolo] = 1
+        self.declarados.append(simbolo)
+
+    def __contains__(self, simbolo):
+        return 0 <= simbolo < len(self.declarado) and self.declarado[simbolo] == 1
+
+    # Percorre os nomes declarados, na ordem de declaração
+    def __iter__(self):
+        nomes = self.identificadores.nomes
+        return (nomes[simbolo] for simbolo in self.declarados)
+
+    def __len__(self):
+        return len(self.declarados)
+
+# Análise semântica: confere as declarações (regra 2) e os usos de variáveis
+# (regras 4 e 11) percorrendo a árvore, e para no primeiro erro
+class VerificadorSemantico(Visitante):
+    def __init__(self, tabela_simbolos):
+        self.tabela_simbolos = tabela_simbolos
+        self.nomes = tabela_simbolos.identificadores.nomes
+
+    def insere_na_tabela_simbolos(self, declaracao):
+        simbolo = declaracao.simbolo
+        if simbolo in self.tabela_simbolos:
+            raise ErroSemanticoException(mensagem_ja_declarada(self.nomes[simbolo], declaracao.linha))
+        self.tabela_simbolos.declarar(simbolo)
+
+    def verifica_se_existe_na_tabela_simbolos(self, variavel):
+        if variavel.simbolo not in self.tabela_simbolos:
+            raise ErroSemanticoException(mensagem_nao_declarada(self.nomes[variavel.simbolo], variavel.linha))
+        return True
+
+    def visitar_declaracao(self, nodo):
+        self.insere_na_tabela_simbolos(nodo)
+
+    def visitar_variavel(self, nodo):
+        self.verifica_se_existe_na_tabela_simbolos(nodo)
+
+# Geração de código: percorre a árvore já conferida pelo VerificadorSemantico
+# disparando as regras semânticas, que montam o código Python na pilha semântica
+class SemanticoCria(Visitante):
+    def __init__(self, arquivo_lex=None, tokens=None, rastro=None):
+        self.tokens = BufferTokens()
         self.erros = []
-        self.posicao = 0
         self.arquivo_lex = arquivo_lex
-        self.tabela_simbolos = {}
+        self.tabela_simbolos = TabelaSimbolos(self.tokens.identificadores)
+        self.identificadores = self.tokens.identificadores  # Tabela dos IDs da árvore sendo gerada
         self.pilha_semantica = PilhaSemantica()
         self.codigo_python = []
         self.nivel_identacao = 0
         self.ultimo_lexema = ""
+        self.ultimo_simbolo = -1
         self.linha_atual = 1
-        self.carregar_tokens()
+        self.ultimo_passo = 1  # Passo do range() do MANDALEMBRAR (regra 30)
+        self.ultimo_vetorizado = None  # ParaVetorizado sendo gerado (regras 31 e 32)
+        self.ultimo_operador = None  # Operador da redução (regra 32)
+        self.usa_numpy = False  # Se o programa gerado precisa do import do NumPy
+        self.usa_dividir = False  # Se o programa gerado precisa da função _dividir
+        self.io_rapido = False  # Entrada e saída rápidas, sem input() e print() (ver io_rapido.py)
+        self.usa_entrada = False  # Se o programa gerado tem OLHA (para o io_rapido)
+        self.usa_saida = False  # Se ele tem FALA
+        self.tipos = None  # tipos.Tipos do programa (None: inferidos da árvore gerada)
+        self.ultima_divisao = INTEIRO  # Tipo da divisão da regra 8
+        self.declaracoes = []  # Declarações do programa sendo gerado (regra 0)
+        self.rastro = rastro  # RastroRegras que acompanha as regras disparadas (None: desligado)
+        # Tratador de cada regra, indexado pelo número da regra
+        self.tratadores = [self.regra_sem_acao] * (max(TRATADORES_DAS_REGRAS) + 1)
+        for numero, metodo in TRATADORES_DAS_REGRAS.items():
+            self.tratadores[numero] = getattr(self, metodo)
+        for numero, operador in OPERADORES_DAS_REGRAS.items():
+            self.tratadores[numero] = partial(self.regra_operacao, numero, operador)
+        if tokens is None:
+            self.carregar_tokens()
+        else:
+            self.usar_tokens(tokens)
 
     def carregar_tokens(self):
         try:
-            with open(self.arquivo_lex, 'r', encoding='utf-8') as f:
-                linhas = f.readlines()
-                for linha in linhas:
-                    linha = linha.strip()
-                    if linha and not linha.startswith(('Análise Léxica', '---', 'Erro', 'terminada')):
-                        try:
-                            partes = linha.split(' | ')
-                            if len(partes) != 4:
-                                continue
-                            tipo_str, lexema, linha_str, coluna_str = partes
-                            tipo = TokenType[tipo_str]
-                            linha_num = int(linha_str.split()[-1])
-                            coluna_num = int(coluna_str.split()[-1])
-                            self.tokens.append(Token(tipo, lexema, linha_num, coluna_num))
-                        except (ValueError, KeyError):
-                            continue
-        except IOError as e:
+            self.tokens = carregar_lex(self.arquivo_lex)
+        except (IOError, ValueError) as e:
             self.erros.append(f"Erro ao ler o arquivo {self.arquivo_lex}: {e}")
-            self.tokens.append(Token(TokenType.T_FIM_FONTE, '<EOF>', 1, 1))
+        self.usar_tokens(self.tokens)
 
-    def token_atual(self):
-        return self.tokens[self.posicao] if self.posicao < len(self.tokens) else Token(TokenType.T_FIM_FONTE, '<EOF>', 1, 1)
-
-    def avancar(self):
-        if self.posicao < len(self.tokens):
-            self.ultimo_lexema = self.tokens[self.posicao].lexema
-            self.linha_atual = self.tokens[self.posicao].linha
-        self.posicao += 1
-
-    def espera(self, tipo_esperado):
-        token = self.token_atual()
-        if token.tipo == tipo_esperado:
-            self.avancar()
-            return True
-        self.erros.append(f"Erro sintático na linha {token.linha}, coluna {token.coluna}: "
-                        f"Esperado {tipo_esperado.name}, encontrado {token.tipo.name} ({token.lexema})")
-        return False
+    def usar_tokens(self, tokens):
+        self.tokens = tokens
+        self.tabela_simbolos = TabelaSimbolos(tokens.identificadores)
+        self.identificadores = tokens.identificadores
 
     def tabulacao(self, qtd):
         return "    " * qtd
 
-    def insere_na_tabela_simbolos(self, lexema):
-        if lexema in self.tabela_simbolos:
-            raise ErroSemanticoException(f"Variável {lexema} já declarada! linha: {self.linha_atual}")
-        else:
-            self.tabela_simbolos[lexema] = 0
-
-    def verifica_se_existe_na_tabela_simbolos(self, lexema):
-        if lexema not in self.tabela_simbolos:
-            raise ErroSemanticoException(f"Variável {lexema} não está declarada! linha: {self.linha_atual}")
-        return True
+    def empilha_variavel(self, simbolo, tipo):
+        identificadores = self.identificadores
+        self.pilha_semantica.push(identificadores.nomes[simbolo], tipo, simbolo,
+                                  identificadores.normalizados[simbolo])
 
+    # Dispara uma regra semântica: registra no rastro (se houver) e chama o
+    # tratador da regra na tabela, sem percorrer uma cadeia de comparações
     def regra_semantica(self, numero_regra):
-        print(f"Regra Semântica {numero_regra}")
-        
-        if numero_regra == 0:  # Início do programa
-            self.codigo_python.append("def main():")
-            self.nivel_identacao = 1
-            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "# Compilador C.R.I.A")
-            self.codigo_python.append("")
-            # Inicializar variáveis declaradas
-            for var in self.tabela_simbolos:
-                self.codigo_python.append(self.tabulacao(self.nivel_identacao) + f"{var} = 0")
-            if self.tabela_simbolos:
-                self.codigo_python.append("")
-            
-        elif numero_regra == 1:  # Fim do programa
-            # Verifica se há pelo menos um comando no bloco principal
-            if not any("pass" in linha or 
-                      any(cmd in linha for cmd in ["print", "input", "=", "if", "for", "while"]) 
-                      for linha in self.codigo_python[-5:]):
-                self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "pass")
-            self.nivel_identacao = 0
+        if self.rastro is not None:
+            self.rastro.registrar(numero_regra)
+        self.tratadores[numero_regra]()
+
+    # Regras sem ação na geração de código
+    def regra_sem_acao(self):
+        pass
+
+    def regra_inicio_programa(self):  # Regra 0
+        self.usa_numpy = False
+        self.usa_dividir = False
+        self.usa_entrada = self.usa_saida = False
+        self.codigo_python.append("def main():")
+        self.nivel_identacao = 1
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "# Compilador C.R.I.A")
+        self.codigo_python.append("")
+        # Inicializar variáveis declaradas
+        nomes = self.identificadores.nomes
+        for declaracao in self.declaracoes:
+            nome = nomes[declaracao.simbolo]
+            self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                      f"{nome} = {self.tipos.valor_inicial(nome)!r}")
+        if self.declaracoes:
             self.codigo_python.append("")
+
+    def regra_fim_programa(self):  # Regra 1
+        # Verifica se há pelo menos um comando no bloco principal
+        if not any("pass" in linha or
+                  any(cmd in linha for cmd in ["print", "_fala", "input", "=", "if", "for", "while"])
+                  for linha in self.codigo_python[-5:]):
+            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "pass")
+        self.nivel_identacao = 0
+        self.codigo_python.append("")
+        if self.io_rapido and self.usa_saida:
+            self.codigo_python += CODIGO_CHAMADA_RAPIDA.splitlines()
+        else:
             self.codigo_python.append("if __name__ == '__main__':")
             self.codigo_python.append(self.tabulacao(1) + "main()")
-            
-        elif numero_regra == 2:  # Declaração de variável
-            self.insere_na_tabela_simbolos(self.ultimo_lexema)
-            
-        elif numero_regra == 3:  # Atribuição
-            nodo_2 = self.pilha_semantica.pop()  # expressão
-            nodo_1 = self.pilha_semantica.pop()  # variável
-            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + 
-                                    f"{nodo_1.getCodigoMinusculo()} = {nodo_2.getCodigoMinusculo()}")
-            
-        elif numero_regra == 4:  # Uso de variável
-            if self.verifica_se_existe_na_tabela_simbolos(self.ultimo_lexema):
-                self.pilha_semantica.push(self.ultimo_lexema, 4)
-                
-        elif numero_regra == 5:  # Soma
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} + {nodo_2.getCodigoMinusculo()}", 5)
-            
-        elif numero_regra == 6:  # Subtração
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} - {nodo_2.getCodigoMinusculo()}", 6)
-            
-        elif numero_regra == 7:  # Multiplicação
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} * {nodo_2.getCodigoMinusculo()}", 7)
-            
-        elif numero_regra == 8:  # Divisão
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} // {nodo_2.getCodigoMinusculo()}", 8)
-            
-        elif numero_regra == 9:  # Resto
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} % {nodo_2.getCodigoMinusculo()}", 9)
-            
-        elif numero_regra == 10:  # Potência
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} ** {nodo_2.getCodigoMinusculo()}", 10)
-            
-        elif numero_regra == 11:  # Variável em expressão
-            if self.verifica_se_existe_na_tabela_simbolos(self.ultimo_lexema):
-                self.pilha_semantica.push(self.ultimo_lexema, 11)
-                
-        elif numero_regra == 12:  # Número
-            self.pilha_semantica.push(self.ultimo_lexema, 12)
-            
-        elif numero_regra == 13:  # Parênteses
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"({nodo_1.getCodigoMinusculo()})", 13)
-            
-        elif numero_regra == 14:  # Comando LER (OLHA)
-            nodo_1 = self.pilha_semantica.pop()
-            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + 
-                                    f"{nodo_1.getCodigoMinusculo()} = int(input('Informe a variável {nodo_1.getCodigoMinusculo()}: '))")
-            
-        elif numero_regra == 15:  # Início ENQUANTO (MANDAENQUANTO)
-            nodo_1 = self.pilha_semantica.pop()
-            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + 
-                                    f"while {nodo_1.getCodigoMinusculo()}:")
-            self.nivel_identacao += 1
-            
-        elif numero_regra == 16:  # Fim de bloco
-            # Verifica se o último bloco não está vazio
-            if (len(self.codigo_python) > 0 and 
-                self.codigo_python[-1].strip().endswith(":")):
-                self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "pass")
-            if self.nivel_identacao > 1:
-                self.nivel_identacao -= 1
-            
-        elif numero_regra == 17:  # Início SE (SEPA)
-            nodo_1 = self.pilha_semantica.pop()
-            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + 
-                                    f"if {nodo_1.getCodigoMinusculo()}:")
-            self.nivel_identacao += 1
-            
-        elif numero_regra == 18:  # SENÃO (NÃOFOI)
-            # Primeiro diminui a identação para sair do bloco if
+        inicio = []
+        if self.io_rapido and (self.usa_entrada or self.usa_saida):
+            inicio.append(IMPORT_SYS.strip())
+        if self.usa_numpy:
+            inicio.append("import numpy as _np")
+        if inicio:
+            inicio.append("")
+        if self.io_rapido and self.usa_saida:
+            inicio += CODIGO_SAIDA_RAPIDA.splitlines() + [""]
+        if self.io_rapido and self.usa_entrada:
+            inicio += CODIGO_ENTRADA_RAPIDA.splitlines() + [""]
+        if self.usa_dividir:
+            inicio += CODIGO_DIVIDIR.splitlines() + [""]
+        self.codigo_python[0:0] = inicio
+
+    def regra_atribuicao(self):  # Regra 3
+        nodo_2 = self.pilha_semantica.pop()  # expressão
+        nodo_1 = self.pilha_semantica.pop()  # variável
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                f"{nodo_1.getCodigoMinusculo()} = {nodo_2.getCodigoMinusculo()}")
+
+    def regra_variavel_alvo(self):  # Regra 4
+        self.empilha_variavel(self.ultimo_simbolo, 4)
+
+    # Regras 5 a 10 (aritméticas) e 19 a 24 (relacionais): junta os dois
+    # operandos do topo da pilha numa operação com o operador Python da regra
+    def regra_operacao(self, numero_regra, operador):
+        nodo_2 = self.pilha_semantica.pop()
+        nodo_1 = self.pilha_semantica.pop()
+        self.pilha_semantica.push_operacao(operador, (nodo_1, nodo_2), numero_regra)
+
+    def regra_divisao(self):  # Regra 8: o "/", com a divisão do tipo dos operandos
+        nodo_2 = self.pilha_semantica.pop()
+        nodo_1 = self.pilha_semantica.pop()
+        operador = OPERADORES_DIVISAO.get(self.ultima_divisao, CHAMADA_DIVIDIR)
+        self.usa_dividir = self.usa_dividir or operador == CHAMADA_DIVIDIR
+        self.pilha_semantica.push_operacao(operador, (nodo_1, nodo_2), 8)
+
+    def regra_variavel_expressao(self):  # Regra 11
+        self.empilha_variavel(self.ultimo_simbolo, 11)
+
+    def regra_numero(self):  # Regra 12
+        self.pilha_semantica.push(self.ultimo_lexema, 12, minusculo=self.ultimo_lexema)
+
+    def regra_parenteses(self):  # Regra 13
+        nodo_1 = self.pilha_semantica.pop()
+        self.pilha_semantica.push_operacao('()', (nodo_1,), 13)
+
+    def regra_ler(self):  # Regra 14: OLHA, com float() para as variáveis que recebem float
+        nodo_1 = self.pilha_semantica.pop()
+        nome = nodo_1.getCodigoMinusculo()
+        conversao = 'float' if self.tipos.le_real(nome) else 'int'
+        self.usa_entrada = True
+        if self.io_rapido:
+            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + f"{nome} = {conversao}(_ler())")
+            return
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                f"{nome} = {conversao}(input('Informe a variável {nome}: '))")
+
+    def regra_inicio_enquanto(self):  # Regra 15: MANDAENQUANTO
+        nodo_1 = self.pilha_semantica.pop()
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                f"while {nodo_1.getCodigoMinusculo()}:")
+        self.nivel_identacao += 1
+
+    def regra_fim_bloco(self):  # Regra 16
+        # Verifica se o último bloco não está vazio
+        if (len(self.codigo_python) > 0 and
+            self.codigo_python[-1].strip().endswith(":")):
+            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "pass")
+        if self.nivel_identacao > 1:
             self.nivel_identacao -= 1
-            # Adiciona o else com a identação correta
-            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "else:")
-            # Aumenta a identação para o bloco do else
-            self.nivel_identacao += 1
-            
-        elif numero_regra == 19:  # Maior que
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} > {nodo_2.getCodigoMinusculo()}", 19)
-            
-        elif numero_regra == 20:  # Menor que
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} < {nodo_2.getCodigoMinusculo()}", 20)
-            
-        elif numero_regra == 21:  # Maior ou igual
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} >= {nodo_2.getCodigoMinusculo()}", 21)
-            
-        elif numero_regra == 22:  # Menor ou igual
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} <= {nodo_2.getCodigoMinusculo()}", 22)
-            
-        elif numero_regra == 23:  # Igual
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} == {nodo_2.getCodigoMinusculo()}", 23)
-            
-        elif numero_regra == 24:  # Diferente
-            nodo_2 = self.pilha_semantica.pop()
-            nodo_1 = self.pilha_semantica.pop()
-            self.pilha_semantica.push(f"{nodo_1.getCodigoMinusculo()} != {nodo_2.getCodigoMinusculo()}", 24)
-            
-        elif numero_regra == 25:  # Comando ESCREVER (FALA)
-            nodo_1 = self.pilha_semantica.pop()
-            # Para strings, usar o código original sem conversão para minúsculo
-            if nodo_1.getTipo() == 12 and '"' in nodo_1.getCodigo():
-                self.codigo_python.append(self.tabulacao(self.nivel_identacao) + 
-                                        f"print({nodo_1.getCodigo()})")
-            else:
-                self.codigo_python.append(self.tabulacao(self.nivel_identacao) + 
-                                        f"print({nodo_1.getCodigoMinusculo()})")
-            
-        elif numero_regra == 30:  # Comando PARA (MANDALEMBRAR)
-            nodo_3 = self.pilha_semantica.pop()  # incremento
-            nodo_2 = self.pilha_semantica.pop()  # condição
-            nodo_1 = self.pilha_semantica.pop()  # valor inicial
-            nodo_0 = self.pilha_semantica.pop()  # variável
-            
-            # Extrai os valores da condição (var <= limite)
-            condicao_str = nodo_2.getCodigoMinusculo()
-            if "<=" in condicao_str:
-                limite = condicao_str.split("<=")[1].strip()
-            elif "<" in condicao_str:
-                limite = condicao_str.split("<")[1].strip()
-            else:
-                limite = "10"  # valor padrão
-                
-            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + 
-                                    f"for {nodo_0.getCodigoMinusculo()} in range({nodo_1.getCodigoMinusculo()}, {limite} + 1):")
-            self.nivel_identacao += 1
 
-    def programa(self):
-        if not self.espera(TokenType.T_ENOIS):
-            return False
-        # Primeiro processa as declarações para preencher a tabela de símbolos
-        if not self.declaracoes():
-            return False
-        # Depois gera o código inicial com as variáveis já declaradas
+    def regra_inicio_se(self):  # Regra 17: SEPA
+        nodo_1 = self.pilha_semantica.pop()
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                f"if {nodo_1.getCodigoMinusculo()}:")
+        self.nivel_identacao += 1
+
+    def regra_senao(self):  # Regra 18: NÃOFOI
+        # Primeiro diminui a identação para sair do bloco if
+        self.nivel_identacao -= 1
+        # Adiciona o else com a identação correta
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "else:")
+        # Aumenta a identação para o bloco do else
+        self.nivel_identacao += 1
+
+    def regra_escrever(self):  # Regra 25: FALA
+        nodo_1 = self.pilha_semantica.pop()
+        funcao = '_fala' if self.io_rapido else 'print'
+        self.usa_saida = True
+        # Para strings, usar o código original sem conversão para minúsculo
+        if nodo_1.getTipo() == 12 and '"' in nodo_1.getCodigo():
+            self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                    f"{funcao}({nodo_1.getCodigo()})")
+        else:
+            self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                    f"{funcao}({nodo_1.getCodigoMinusculo()})")
+
+    # Regra 30: MANDALEMBRAR que o lacos.py traduziu para range(); os outros
+    # viram while e usam as regras 3 e 15
+    def regra_para(self):
+        nodo_2 = self.pilha_semantica.pop()  # fim
+        nodo_1 = self.pilha_semantica.pop()  # valor inicial
+        nodo_0 = self.pilha_semantica.pop()  # variável
+        intervalo = f"{nodo_1.getCodigoMinusculo()}, {nodo_2.getCodigoMinusculo()}"
+        if self.ultimo_passo != 1:
+            intervalo += f", {self.ultimo_passo}"
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                f"for {nodo_0.getCodigoMinusculo()} in range({intervalo}):")
+        self.nivel_identacao += 1
+
+    # Regra 31: MANDALEMBRAR vetorizado pelo vetorizador.py. Abre o for dos
+    # blocos com o np.arange() das voltas de cada um e, se o laço tem limite,
+    # o if que confere a faixa dos valores (o else, com o laço original, é
+    # aberto pela regra 18)
+    def regra_para_vetorizado(self):
+        nodo_2 = self.pilha_semantica.pop()  # fim
+        nodo_1 = self.pilha_semantica.pop()  # valor inicial
+        vetorizado = self.ultimo_vetorizado
+        faixa = [self.pilha_semantica.pop().getCodigoMinusculo() for _ in vetorizado.guardadas][::-1]
+        nodo_0 = self.pilha_semantica.pop()  # variável
+        inicio, fim = nodo_1.getCodigoMinusculo(), nodo_2.getCodigoMinusculo()
+        if vetorizado.limite is not None:
+            limite = vetorizado.limite
+            self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "if " +
+                                      " and ".join(f"{-limite} <= {valor} <= {limite}" for valor in faixa) + ":")
+            self.nivel_identacao += 1
+        passo = vetorizado.passo
+        bloco = TAMANHO_BLOCO_VETOR * passo
+        if passo > 0:
+            intervalo = f"_bloco, min(_bloco + {bloco}, {fim})"
+        else:
+            intervalo = f"_bloco, max(_bloco - {-bloco}, {fim})"
+        if passo != 1:
+            intervalo += f", {passo}"
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                  f"for _bloco in range({inicio}, {fim}, {bloco}):")
+        self.nivel_identacao += 1
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                  f"{nodo_0.getCodigoMinusculo()} = _np.arange({intervalo}, dtype=_np.int64)")
+        self.usa_numpy = True
+
+    # Regra 32: redução do laço vetorizado, juntando as voltas do bloco
+    def regra_reducao(self):
+        nodo_2 = self.pilha_semantica.pop()  # expressão de cada volta
+        nodo_1 = self.pilha_semantica.pop()  # acumulador
+        operador = OPERADORES_DAS_REGRAS[REGRA_DO_OPERADOR[self.ultimo_operador]]
+        acumulador = nodo_1.getCodigoMinusculo()
+        self.codigo_python.append(self.tabulacao(self.nivel_identacao) +
+                                  f"{acumulador} = {acumulador} {operador} "
+                                  f"int(({nodo_2.getCodigoMinusculo()}).{REDUCOES[self.ultimo_operador]}())")
+
+    def visitar_programa(self, nodo):
+        if self.tipos is None:
+            self.tipos = inferir_tipos(nodo)
+        self.tipos.usar_identificadores(nodo.identificadores)
+        self.identificadores = nodo.identificadores
+        self.declaracoes = nodo.declaracoes
         self.regra_semantica(0)
-        if not self.bloco():
-            return False
-        if not self.espera(TokenType.T_PARTIU):
-            return False
+        yield nodo.bloco
         self.regra_semantica(1)
-        if self.token_atual().tipo != TokenType.T_FIM_FONTE:
-            self.erros.append(f"Erro sintático na linha {self.token_atual().linha}, coluna {self.token_atual().coluna}: "
-                            f"Esperado fim do arquivo, encontrado {self.token_atual().tipo.name}")
-            return False
-        return True
 
-    def declaracoes(self):
-        if self.token_atual().tipo == TokenType.T_BAGULHOS:
-            self.avancar()
-            if not self.lista_variaveis():
-                return False
-            if not self.espera(TokenType.T_PONTO_VIRGULA):
-                return False
-        return True
-
-    def lista_variaveis(self):
-        if not self.espera(TokenType.T_ID):
-            return False
-        self.regra_semantica(2)
-        while self.token_atual().tipo == TokenType.T_VIRGULA:
-            self.avancar()
-            if not self.espera(TokenType.T_ID):
-                return False
-            self.regra_semantica(2)
-        return True
-
-    def bloco(self):
-        tem_comandos = False
-        while self.token_atual().tipo in {TokenType.T_ID, TokenType.T_SEPA, TokenType.T_MANDAENQUANTO,
-                                        TokenType.T_MANDALEMBRAR, TokenType.T_OLHA, TokenType.T_FALA}:
-            if not self.comando():
-                return False
-            tem_comandos = True
-        
+    def visitar_bloco(self, nodo):
+        for comando in nodo.comandos:
+            yield comando
         # Se não houver comandos no bloco e estivermos dentro de uma estrutura de controle, adiciona pass
-        if not tem_comandos and self.nivel_identacao > 1:
+        if not nodo.comandos and self.nivel_identacao > 1:
             self.codigo_python.append(self.tabulacao(self.nivel_identacao) + "pass")
-        
-        return True
 
-    def comando(self):
-        token = self.token_atual()
-        if token.tipo == TokenType.T_ID:
-            return self.comando_atribuicao()
-        elif token.tipo == TokenType.T_SEPA:
-            return self.comando_se()
-        elif token.tipo == TokenType.T_MANDAENQUANTO:
-            return self.comando_enquanto()
-        elif token.tipo == TokenType.T_MANDALEMBRAR:
-            return self.comando_para()
-        elif token.tipo == TokenType.T_OLHA:
-            return self.comando_ler()
-        elif token.tipo == TokenType.T_FALA:
-            return self.comando_escrever()
-        else:
-            self.erros.append(f"Erro sintático na linha {token.linha}, coluna {token.coluna}: "
-                            f"Comando inválido: {token.tipo.name} ({token.lexema})")
-            return False
-
-    def comando_atribuicao(self):
-        if not self.espera(TokenType.T_ID):
-            return False
+    # Variável que recebe um valor (atribuição, OLHA, MANDALEMBRAR)
+    def alvo(self, nodo):
+        self.ultimo_simbolo = nodo.simbolo
+        self.linha_atual = nodo.linha
         self.regra_semantica(4)
-        if not self.espera(TokenType.T_SETA):
-            return False
-        if not self.expressao():
-            return False
+
+    def visitar_atribuicao(self, nodo):
+        self.alvo(nodo.alvo)
+        yield nodo.valor
         self.regra_semantica(3)
-        if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        return True
 
-    def comando_se(self):
-        if not self.espera(TokenType.T_SEPA):
-            return False
-        if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if not self.condicao():
-            return False
-        if not self.espera(TokenType.T_FECHA_PAR):
-            return False
+    def visitar_se(self, nodo):
+        yield nodo.condicao
         self.regra_semantica(17)  # Início do if
-        if not self.bloco():
-            return False
-        
-        if self.token_atual().tipo == TokenType.T_NAOFOI:
-            self.avancar()
+        yield nodo.entao
+        if nodo.senao is not None:
             self.regra_semantica(18)  # Início do else
-            if not self.bloco():
-                return False
+            yield nodo.senao
             self.regra_semantica(16)  # Fim do else
         else:
             self.regra_semantica(16)  # Fim do if sem else
-            
-        if not self.espera(TokenType.T_FIMSEPA):
-            return False
-        return True
 
-    def comando_enquanto(self):
-        if not self.espera(TokenType.T_MANDAENQUANTO):
-            return False
-        if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if not self.condicao():
-            return False
-        if not self.espera(TokenType.T_FECHA_PAR):
-            return False
+    def visitar_enquanto(self, nodo):
+        yield nodo.condicao
         self.regra_semantica(15)
-        if not self.bloco():
-            return False
+        yield nodo.corpo
         self.regra_semantica(16)
-        if not self.espera(TokenType.T_PARAMANDA):
-            return False
-        return True
 
-    def comando_para(self):
-        if not self.espera(TokenType.T_MANDALEMBRAR):
-            return False
-        if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if not self.espera(TokenType.T_ID):
-            return False
-        self.regra_semantica(4)
-        if not self.espera(TokenType.T_SETA):
-            return False
-        if not self.expressao():
-            return False
-        if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        if not self.condicao():
-            return False
-        if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        if not self.espera(TokenType.T_ID):
-            return False  
-        if not self.espera(TokenType.T_SETA):
-            return False
-        if not self.expressao():
-            return False
-        if not self.espera(TokenType.T_FECHA_PAR):
-            return False
+    def visitar_para_intervalo(self, nodo):
+        self.alvo(nodo.variavel)
+        yield nodo.inicio
+        yield nodo.fim
+        self.ultimo_passo = nodo.passo
         self.regra_semantica(30)
-        if not self.bloco():
-            return False
+        yield nodo.corpo
         self.regra_semantica(16)
-        if not self.espera(TokenType.T_DESENCANA):
-            return False
-        return True
 
-    def comando_ler(self):
-        if not self.espera(TokenType.T_OLHA):
-            return False
-        if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if not self.espera(TokenType.T_ID):
-            return False
-        self.regra_semantica(4)
+    def visitar_para_vetorizado(self, nodo):
+        self.alvo(nodo.variavel)
+        for expressao in nodo.guardadas:
+            yield expressao
+        yield nodo.inicio
+        yield nodo.fim
+        self.ultimo_vetorizado = nodo
+        self.regra_semantica(31)
+        for alvo, operador, expressao in nodo.reducoes:
+            self.alvo(alvo)
+            yield expressao
+            self.ultimo_operador = operador
+            self.regra_semantica(32)
+        self.regra_semantica(16)  # Fim do for dos blocos
+        if nodo.limite is not None:
+            self.regra_semantica(18)  # else com o laço original
+            yield nodo.escalar
+            self.regra_semantica(16)
+
+    def visitar_ler(self, nodo):
+        self.alvo(nodo.variavel)
         self.regra_semantica(14)
-        if not self.espera(TokenType.T_FECHA_PAR):
-            return False
-        if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        return True
 
-    def comando_escrever(self):
-        if not self.espera(TokenType.T_FALA):
-            return False
-        if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if self.token_atual().tipo == TokenType.T_STRING:
+    def visitar_escrever(self, nodo):
+        if isinstance(nodo.valor, Texto):
             # Manter o texto original da string sem conversão para minúsculo
-            self.pilha_semantica.push(f'"{self.token_atual().lexema}"', 12)
-            self.avancar()
+            self.pilha_semantica.push(f'"{nodo.valor.lexema}"', 12)
         else:
-            if not self.expressao():
-                return False
+            yield nodo.valor
         self.regra_semantica(25)
-        if not self.espera(TokenType.T_FECHA_PAR):
-            return False
-        if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        return True
 
-    def condicao(self):
-        if not self.expressao():
-            return False
-        if self.token_atual().tipo not in {TokenType.T_MAIOR, TokenType.T_MENOR, TokenType.T_MAIOR_IGUAL,
-                                        TokenType.T_MENOR_IGUAL, TokenType.T_IGUAL, TokenType.T_DIFERENTE}:
-            self.erros.append(f"Erro sintático na linha {self.token_atual().linha}, coluna {self.token_atual().coluna}: "
-                            f"Esperado operador relacional, encontrado {self.token_atual().tipo.name}")
-            return False
-        
-        op = self.token_atual().tipo
-        self.avancar()
-        if not self.expressao():
-            return False
-            
-        if op == TokenType.T_MAIOR:
-            self.regra_semantica(19)
-        elif op == TokenType.T_MENOR:
-            self.regra_semantica(20)
-        elif op == TokenType.T_MAIOR_IGUAL:
-            self.regra_semantica(21)
-        elif op == TokenType.T_MENOR_IGUAL:
-            self.regra_semantica(22)
-        elif op == TokenType.T_IGUAL:
-            self.regra_semantica(23)
-        elif op == TokenType.T_DIFERENTE:
-            self.regra_semantica(24)
-            
-        return True
+    def visitar_variavel(self, nodo):
+        self.ultimo_simbolo = nodo.simbolo
+        self.linha_atual = nodo.linha
+        self.regra_semantica(11)
+
+    def visitar_numero(self, nodo):
+        self.ultimo_lexema = nodo.lexema
+        self.regra_semantica(12)
+
+    # Valor calculado pelo otimizador: entra no código como um número
+    def visitar_constante(self, nodo):
+        self.ultimo_lexema = texto_constante(nodo.valor)
+        self.regra_semantica(12)
+
+    def visitar_parenteses(self, nodo):
+        yield nodo.expressao
+        self.regra_semantica(13)
+
+    def visitar_binaria(self, nodo):
+        yield nodo.esquerda
+        yield nodo.direita
+        if nodo.operador is TokenType.T_DIVIDIDO:
+            self.ultima_divisao = self.tipos.divisao(nodo)
+        self.regra_semantica(REGRA_DO_OPERADOR[nodo.operador])
+
+    # Conteúdo do arquivo .py: o código gerado ou os erros como comentários
+    def conteudo_resultado(self):
+        if not self.erros:
+            return ''.join(linha + '\n' for linha in self.codigo_python)
+        return "# Erros semânticos encontrados:\n" + ''.join(f"# {erro}\n" for erro in self.erros)
+
+    def salvar_resultado(self, output_file=None):
+        if output_file is None:
+            output_file = self.arquivo_lex.rsplit('.', 1)[0] + '.py'
+        try:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(self.conteudo_resultado())
+            if not self.erros:
+                print(f"Código Python gerado com sucesso em: {output_file}")
+            else:
+                print(f"Erros semânticos salvos em: {output_file}")
+        except IOError as e:
+            print(f"Erro ao salvar o arquivo {output_file}: {e}")
 
-    def expressao(self):
-        if not self.termo():
+    # Monta a árvore a partir dos tokens, quando o semântico roda sozinho (a
+    # partir do .lex); os erros sintáticos vão para a lista de erros
+    def montar_arvore(self):
+        sintatico = SintaticoCria(tokens=self.tokens)
+        arvore = sintatico.programa()
+        self.erros.extend(sintatico.erros)
+        return arvore
+
+    # Confere as variáveis e gera o código da árvore, com os MANDALEMBRAR
+    # traduzidos para range() ou while
+    def gerar(self, arvore):
+        VerificadorSemantico(self.tabela_simbolos).visitar(arvore)
+        self.visitar(traduzir_lacos(arvore))
+
+    # Só confere as variáveis, sem gerar o código em texto (para outro back
+    # end, como o gerador_ast); retorna True se não houve erros
+    def verificar(self, arvore):
+        try:
+            VerificadorSemantico(self.tabela_simbolos).visitar(arvore)
+            return True
+        except ErroSemanticoException as e:
+            self.erros.append(str(e))
             return False
-        while self.token_atual().tipo in {TokenType.T_MAIS, TokenType.T_MENOS}:
-            op = self.token_atual().tipo
-            self.avancar()
-            if not self.termo():
-                return False
-            if op == TokenType.T_MAIS:
-                self.regra_semantica(5)
-            elif op == TokenType.T_MENOS:
-                self.regra_semantica(6)
-        return True
 
-    def termo(self):
-        if not self.fator():
+    # Executa a análise semântica e a geração de código sem gravar nada;
+    # retorna True se não houve erros. Sem árvore, ela é montada dos tokens.
+    def executar(self, arvore=None):
+        if self.erros:  # Errors from loading tokens
             return False
-        while self.token_atual().tipo in {TokenType.T_VEZES, TokenType.T_DIVIDIDO, TokenType.T_RESTO}:
-            op = self.token_atual().tipo
-            self.avancar()
-            if not self.fator():
+        if arvore is None:
+            arvore = self.montar_arvore()
+            if arvore is None:
                 return False
-            if op == TokenType.T_VEZES:
-                self.regra_semantica(7)
-            elif op == TokenType.T_DIVIDIDO:
-                self.regra_semantica(8)
-            elif op == TokenType.T_RESTO:
-                self.regra_semantica(9)
-        return True
-
-    def fator(self):
-        if self.token_atual().tipo == TokenType.T_MENOS:
-            self.avancar()
-            if not self.fator():
-                return False
-        else:
-            if not self.base():
-                return False
-            while self.token_atual().tipo == TokenType.T_ELEVADO:
-                self.avancar()
-                if not self.base():
-                    return False
-                self.regra_semantica(10)
-        return True
-
-    def base(self):
-        token = self.token_atual()
-        if token.tipo == TokenType.T_ID:
-            self.avancar()
-            self.regra_semantica(11)
-            return True
-        elif token.tipo == TokenType.T_NUMERO:
-            self.avancar()
-            self.regra_semantica(12)
-            return True
-        elif token.tipo == TokenType.T_ABRE_PAR:
-            self.avancar()
-            if not self.expressao():
-                return False
-            if not self.espera(TokenType.T_FECHA_PAR):
-                return False
-            self.regra_semantica(13)
+        try:
+            self.gerar(arvore)
             return True
-        else:
-            self.erros.append(f"Erro sintático na linha {token.linha}, coluna {token.coluna}: "
-                            f"Esperado número, identificador ou '(', encontrado {token.tipo.name}")
+        except ErroSemanticoException as e:
+            self.erros.append(str(e))
             return False
 
-    def salvar_resultado(self):
-        output_file = self.arquivo_lex.rsplit('.', 1)[0] + '.py'
-        try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                if not self.erros:
-                    for linha in self.codigo_python:
-                        f.write(linha + '\n')
-                    print(f"Código Python gerado com sucesso em: {output_file}")
-                else:
-                    f.write("# Erros semânticos encontrados:\n")
-                    for erro in self.erros:
-                        f.write(f"# {erro}\n")
-                    print(f"Erros semânticos salvos em: {output_file}")
-        except IOError as e:
-            print(f"Erro ao salvar o arquivo {output_file}: {e}")
-
     def analisar(self):
         try:
             if self.erros:  # Errors from loading tokens
                 self.salvar_resultado()
                 return
-            if self.programa():
+            arvore = self.montar_arvore()
+            if arvore is not None:
+                self.gerar(arvore)
                 print("Análise semântica terminada sem erros.")
             else:
                 print("Erros semânticos encontrados.")
@@ -651,8 +667,25 @@ class SemanticoCria:
             self.salvar_resultado()
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Uso: python semantico.py <arquivo.lex>")
+    # --rastro contagem: mostra quantas vezes cada regra foi disparada;
+    # --rastro <arquivo>: grava também cada regra disparada no arquivo
+    argumentos = sys.argv[1:]
+    destino_rastro = None
+    if len(argumentos) == 3 and argumentos[0] == '--rastro':
+        destino_rastro = argumentos[1]
+        argumentos = argumentos[2:]
+    if len(argumentos) != 1:
+        print("Uso: python semantico.py [--rastro contagem | --rastro <arquivo>] <arquivo.lex>")
         sys.exit(1)
-    semantico = SemanticoCria(sys.argv[1])
-    semantico.analisar()
\ No newline at end of file
+    arquivo_rastro = None
+    if destino_rastro not in (None, 'contagem'):
+        arquivo_rastro = open(destino_rastro, 'w', encoding='utf-8')
+    rastro = None if destino_rastro is None else RastroRegras(arquivo_rastro)
+    semantico = SemanticoCria(argumentos[0], rastro=rastro)
+    semantico.analisar()
+    if rastro is not None:
+        for linha in rastro.resumo():
+            print(linha)
+    if arquivo_rastro is not None:
+        arquivo_rastro.close()
+        print(f"Rastro das regras salvo em: {destino_rastro}")
\ No newline at end of file
@@ -0,0 +1,716 @@
+import json
+import sys
+from bisect import bisect_left
+
+from lexico import FonteCria, LexicoCria
+from semantico_e_codigo import VerificadorSemantico, mensagem_ja_declarada, mensagem_nao_declarada
+from sintatico import SintaticoCria
+from tokens import BufferTokens, TokenType
+
+# Servidor de linguagem (LSP) do C.R.I.A, falando JSON-RPC pela entrada e
+# saída padrão. Cada documento aberto fica em memória: os tokens de cada
+# linha e uma árvore com os comandos de cada bloco. Numa edição só as linhas
+# alteradas passam de novo pelo léxico, e só o comando (ou a sequência de
+# comandos) do bloco mais interno que envolve a edição passa de novo pelo
+# sintático e pelo semântico. Os diagnósticos publicados são o primeiro erro
+# léxico e o primeiro erro sintático ou semântico que compilador.compilar()
+# produz para o texto inteiro: a árvore do documento depende de o sintático
+# parar no primeiro erro de cada trecho, em vez de se recuperar.
+# Uso: python servidor_lsp.py
+
+
+# Uma linha do documento e os tokens que começam nela
+class LinhaCria:
+    __slots__ = ('texto', 'tokens', 'trecho', 'erro')
+
+    def __init__(self, texto):
+        self.texto = texto
+        self.tokens = []  # (tipo, lexema, coluna) de cada token que começa na linha
+        # 1 se a análise léxica pode recomeçar do zero nesta linha, 0 se ela
+        # continua uma string aberta numa linha anterior (None: não analisada)
+        self.trecho = None
+        self.erro = None  # (coluna, comprimento) do primeiro erro léxico da linha
+
+# Comando reconhecido pelo sintático: linhas do primeiro e do último token,
+# blocos internos (na ordem) e as variáveis que o semântico confere na tabela
+# de símbolos, como (nome, linha, coluna). Na árvore do documento as linhas
+# são relativas: as do comando e as dos seus blocos contam a partir da linha
+# inicial do comando dono (pai), e as dos usos a partir da do próprio comando.
+# Assim uma edição que muda a quantidade de linhas só mexe nos comandos que
+# vêm depois dela em cada bloco, e não em tudo o que está dentro deles.
+class ComandoCria:
+    __slots__ = ('linha_ini', 'linha_fim', 'blocos', 'usos', 'pai')
+
+    def __init__(self, linha_ini):
+        self.linha_ini = linha_ini
+        self.linha_fim = linha_ini
+        self.blocos = []
+        self.usos = []
+        self.pai = None
+
+# Trecho de um bloco, do comando que falhou até o fim da região analisada,
+# que não passou na análise sintática. Com cauda=True o trecho vai até o fim
+# do documento (bloco principal, PARTIU e fim do arquivo).
+class TrechoComErro:
+    __slots__ = ('linha_ini', 'linha_fim', 'blocos', 'usos', 'pai', 'erro', 'linha_erro', 'cauda')
+
+    def __init__(self, linha_ini, linha_fim, erro, cauda):
+        self.linha_ini = linha_ini
+        self.linha_fim = linha_fim
+        self.blocos = ()
+        self.usos = ()
+        self.pai = None
+        self.erro = erro  # (mensagem, linha, coluna, comprimento)
+        self.linha_erro = linha_ini  # Linha inicial (absoluta) quando a mensagem foi gerada
+        self.cauda = cauda
+
+# Sequência de comandos entre duas linhas limite: a do último token antes do
+# bloco e a do primeiro token depois dele (no bloco principal, a do PARTIU)
+class BlocoCria:
+    __slots__ = ('limite_ini', 'limite_fim', 'comandos')
+
+    def __init__(self, limite_ini):
+        self.limite_ini = limite_ini
+        self.limite_fim = limite_ini
+        self.comandos = []
+
+def fim_do_comando(comando):
+    return comando.linha_fim
+
+# Linha inicial absoluta de um comando da árvore
+def linha_absoluta(comando):
+    linha = comando.linha_ini
+    pai = comando.pai
+    while pai is not None:
+        linha += pai.linha_ini
+        pai = pai.pai
+    return linha
+
+# Converte as linhas absolutas de comandos recém-analisados para linhas
+# relativas, como guardadas na árvore, pendurando-os no comando dono
+def relativizar(comandos, base, pai):
+    pendentes = [(comandos, base, pai)]
+    while pendentes:
+        comandos, base, pai = pendentes.pop()
+        for comando in comandos:
+            inicio = comando.linha_ini
+            comando.pai = pai
+            comando.linha_ini -= base
+            comando.linha_fim -= base
+            if comando.usos:
+                comando.usos = [(nome, linha - inicio, coluna) for nome, linha, coluna in comando.usos]
+            for bloco in comando.blocos:
+                bloco.limite_ini -= inicio
+                bloco.limite_fim -= inicio
+                pendentes.append((bloco.comandos, inicio, comando))
+
+# Percorre os comandos e tudo o que está dentro deles, em pré-ordem
+def percorrer(comandos):
+    pendentes = comandos[::-1]
+    while pendentes:
+        comando = pendentes.pop()
+        yield comando
+        for bloco in reversed(comando.blocos):
+            pendentes.extend(reversed(bloco.comandos))
+
+# Erro da análise sintática como (mensagem, linha, coluna, comprimento). O
+# analisador para no primeiro erro, sempre apontando para o token atual.
+def erro_sintatico(sintatico):
+    token = sintatico.token_atual()
+    comprimento = 0 if token.tipo == TokenType.T_FIM_FONTE else len(token.lexema)
+    return sintatico.erros[0], token.linha, token.coluna, comprimento
+
+# Converte uma coluna em unidades UTF-16 (como o LSP conta) para índice Python
+def indice_python(texto, unidades):
+    if texto.isascii():
+        return min(unidades, len(texto))
+    contadas = 0
+    for indice, caractere in enumerate(texto):
+        if contadas >= unidades:
+            return indice
+        contadas += 2 if ord(caractere) > 0xFFFF else 1
+    return len(texto)
+
+# Converte um índice Python numa coluna em unidades UTF-16
+def unidades_utf16(texto, indice):
+    if texto.isascii():
+        return min(indice, len(texto))
+    return len(texto[:indice].encode('utf-16-le')) // 2
+
+# Análise sintática que, além de montar a árvore sintática, registra os
+# blocos e comandos reconhecidos (com as linhas de cada um) para montar a
+# árvore do documento
+class SintaticoRegistro(SintaticoCria):
+    def __init__(self, tokens):
+        self.raiz = None  # Primeiro bloco analisado
+        self.inicio_raiz = 0  # Posição do primeiro token do bloco raiz
+        self.fim_raiz = None  # Posição logo depois do bloco raiz
+        self.inicio_falha = None  # Posição do comando do bloco raiz que falhou
+        self.declaracoes_lidas = None  # Nodos Declaracao do BAGULHOS
+        self.abertos = []  # Blocos e comandos em análise, do mais externo ao mais interno
+        self.inicios = []  # Posição do primeiro token de cada comando em análise
+        super().__init__(tokens=tokens, limite_erros=1)
+
+    # Linha do token na posição informada
+    def linha(self, posicao):
+        return self.tokens.linhas[min(posicao, self.fim_fonte)]
+
+    def declaracoes(self):
+        self.declaracoes_lidas = super().declaracoes()
+        return self.declaracoes_lidas
+
+    def entrar_bloco(self):
+        bloco = BlocoCria(self.linha(self.posicao - 1) if self.posicao else 0)
+        if self.abertos:
+            self.abertos[-1].blocos.append(bloco)
+        else:
+            self.raiz = bloco
+            self.inicio_raiz = self.posicao
+        self.abertos.append(bloco)
+
+    def sair_bloco(self, nodo):
+        bloco = self.abertos.pop()
+        bloco.limite_fim = self.linha(self.posicao)
+        if bloco is self.raiz:
+            self.fim_raiz = self.posicao
+
+    def entrar_comando(self):
+        self.inicios.append(self.posicao)
+        self.abertos.append(ComandoCria(self.linha(self.posicao)))
+
+    def sair_comando(self, nodo):
+        inicio = self.inicios.pop()
+        comando = self.abertos.pop()
+        bloco = self.abertos[-1]
+        if nodo is not None:
+            comando.linha_fim = self.linha(self.posicao - 1)
+            usos = UsosDoComando(self.tokens.identificadores)
+            usos.visitar(nodo)
+            comando.usos = usos.usos
+            bloco.comandos.append(comando)
+        elif bloco is self.raiz and self.inicio_falha is None:
+            self.inicio_falha = inicio
+
+# Variáveis que a análise semântica confere na tabela de símbolos para um
+# comando, como (nome, linha, coluna), sem os comandos dos blocos internos
+class UsosDoComando(VerificadorSemantico):
+    def __init__(self, identificadores):
+        self.nomes = identificadores.nomes
+        self.usos = []
+
+    def verifica_se_existe_na_tabela_simbolos(self, variavel):
+        self.usos.append((self.nomes[variavel.simbolo], variavel.linha, variavel.coluna))
+        return True
+
+    # Os comandos dos blocos internos registram os seus próprios usos
+    def visitar_bloco(self, nodo):
+        pass
+
+# Documento aberto no editor, com as análises mantidas de forma incremental
+class DocumentoCria:
+    def __init__(self, texto):
+        self.substituir(texto)
+
+    # Troca o texto inteiro do documento e refaz todas as análises
+    def substituir(self, texto):
+        self.linhas = [LinhaCria(t) for t in texto.split('\n')]
+        self.linhas_com_erro = 0
+        self.lexar_linhas(0, len(self.linhas))
+        self.analisar_tudo()
+
+    # Troca o texto entre as posições inicial e final (linha a partir de 0,
+    # coluna em caracteres) e reanalisa só o que a edição pode ter afetado
+    def editar(self, linha_ini, coluna_ini, linha_fim, coluna_fim, texto):
+        linhas = self.linhas
+        novas = (linhas[linha_ini].texto[:coluna_ini] + texto + linhas[linha_fim].texto[coluna_fim:]).split('\n')
+        # O léxico recomeça no início do trecho (string de várias linhas) da linha editada
+        inicio = linha_ini
+        while inicio > 0 and linhas[inicio].trecho == 0:
+            inicio -= 1
+        self.deslocar(linha_ini + 1, linha_fim + 1, len(novas) - (linha_fim - linha_ini + 1))
+        self.linhas_com_erro -= sum(linha.erro is not None for linha in linhas[linha_ini:linha_fim + 1])
+        linhas[linha_ini:linha_fim + 1] = [LinhaCria(t) for t in novas]
+        self.reanalisar(*self.relexar(inicio, linha_ini + len(novas)))
+
+    # Analisa as linhas [i, j) (índices a partir de 0) como um texto só e
+    # distribui os tokens pelas linhas; os tokens de erro só marcam a linha.
+    # Retorna True se o texto tem uma string sem fechamento, que pode ser
+    # fechada nas linhas seguintes.
+    def lexar_linhas(self, i, j):
+        linhas = self.linhas
+        for linha in linhas[i:j]:
+            if linha.erro is not None:
+                self.linhas_com_erro -= 1
+            linha.tokens = []
+            linha.trecho = 1
+            linha.erro = None
+        T_FIM_FONTE = TokenType.T_FIM_FONTE
+        T_ERRO_LEX = TokenType.T_ERRO_LEX
+        texto = '\n'.join([linha.texto for linha in linhas[i:j]])
+        fonte = FonteCria(texto)
+        lexico = LexicoCria(fonte, limite_erros=None)
+        atual = i  # Linha do último token
+        inicio_linha = 0
+        contado = 0
+        aberta = False  # Houve uma string sem fechamento
+        for token in lexico.tokenizar_offsets(fonte):
+            inicio = token.inicio
+            if token.tipo == T_FIM_FONTE:
+                break
+            quebras = texto.count('\n', contado, inicio)
+            if quebras:
+                atual += quebras
+                inicio_linha = texto.rfind('\n', contado, inicio) + 1
+            contado = inicio
+            if token.tipo == T_ERRO_LEX:
+                if linhas[atual].erro is None:
+                    linhas[atual].erro = (inicio - inicio_linha + 1, token.fim - inicio)
+                    self.linhas_com_erro += 1
+                # Depois de uma string sem fechamento, uma aspa em qualquer
+                # linha seguinte muda a análise desde a string
+                if texto[inicio] == '"':
+                    aberta = True
+                    for continuacao in range(atual + 1, j):
+                        linhas[continuacao].trecho = 0
+                continue
+            linhas[atual].tokens.append((token.tipo, token.lexema, inicio - inicio_linha + 1))
+            # As linhas seguintes cobertas por uma string continuam o trecho desta
+            if token.tipo == TokenType.T_STRING:
+                for continuacao in range(atual + 1, atual + texto.count('\n', inicio, token.fim) + 1):
+                    linhas[continuacao].trecho = 0
+        return aberta
+
+    # Refaz a análise léxica das linhas [i, j) e das seguintes enquanto uma
+    # string continuar aberta ou a linha seguinte continuava uma string que
+    # mudou. Retorna as linhas reanalisadas como (primeira, última), a partir de 1.
+    def relexar(self, i, j):
+        linhas = self.linhas
+        total = len(linhas)
+        while True:
+            while j < total and linhas[j].trecho == 0:
+                j += 1
+            if not self.lexar_linhas(i, j) or j == total:
+                return i + 1, j
+            j = min(total, j + max(1, j - i))
+
+    # Ajusta as linhas guardadas na árvore depois de uma edição que trocou as
+    # linhas [a, b] (numeração antiga) e mudou a quantidade de linhas em delta.
+    # Como as linhas são relativas ao comando dono, os comandos depois da
+    # edição só mudam de linha; só se desce nos que começam antes dela.
+    def deslocar(self, a, b, delta):
+        if self.arvore is None or (a == b and delta == 0):
+            return
+
+        def mover(linha):
+            if linha > b:
+                return linha + delta
+            return a if linha >= a else linha
+
+        pendentes = [(self.arvore, 0)]
+        while pendentes:
+            bloco, base = pendentes.pop()
+            bloco.limite_ini = mover(base + bloco.limite_ini) - base
+            bloco.limite_fim = mover(base + bloco.limite_fim) - base
+            comandos = bloco.comandos
+            for k in range(bisect_left(comandos, a - base, key=fim_do_comando), len(comandos)):
+                comando = comandos[k]
+                inicio = base + comando.linha_ini
+                if inicio > b:
+                    comando.linha_ini += delta
+                    comando.linha_fim += delta
+                    continue
+                # O comando vai ser analisado de novo se começa dentro da edição
+                comando.linha_ini = mover(inicio) - base
+                comando.linha_fim = mover(base + comando.linha_fim) - base
+                if inicio >= a:
+                    continue
+                usos = comando.usos
+                if usos and inicio + usos[-1][1] >= a:
+                    comando.usos = [(nome, mover(inicio + linha) - inicio, coluna) for nome, linha, coluna in usos]
+                pendentes.extend((interno, inicio) for interno in comando.blocos)
+
+    # Região de linhas [s, e] ocupada pelos comandos [lo, hi) de um bloco
+    # (cujas linhas contam a partir de base) e pelas linhas em branco ao redor
+    # deles, e se ela vai até o fim do documento. Retorna None se um dos
+    # comandos divide uma linha com algo de fora da região.
+    def limites(self, bloco, lo, hi, base):
+        comandos = bloco.comandos
+        s = (comandos[lo - 1].linha_fim if lo else bloco.limite_ini) + 1
+        if hi < len(comandos):
+            e, cauda = comandos[hi].linha_ini - 1, False
+        elif bloco is self.arvore:
+            e, cauda = len(self.linhas), True
+        else:
+            e, cauda = bloco.limite_fim - 1, False
+        if lo < hi and (comandos[lo].linha_ini < s or comandos[hi - 1].linha_fim > e):
+            return None
+        return s + base, e + base, cauda
+
+    # Comandos [lo, hi) de um bloco (cujas linhas contam a partir de base)
+    # que a reanálise das linhas [r1, r2] precisa trocar, ou None se a região
+    # deles não envolve essas linhas
+    def faixa(self, bloco, r1, r2, base):
+        comandos = bloco.comandos
+        lo = bisect_left(comandos, r1 - base, key=fim_do_comando)
+        hi = lo
+        while hi < len(comandos) and comandos[hi].linha_ini <= r2 - base:
+            hi += 1
+        # A cauda do bloco principal inclui o PARTIU, que pode estar na linha do último comando
+        if bloco is self.arvore and hi == len(comandos):
+            while lo > 0 and comandos[lo - 1].linha_fim >= bloco.limite_fim:
+                lo -= 1
+        if lo < hi:
+            while lo > 0 and comandos[lo - 1].linha_fim >= comandos[lo].linha_ini:
+                lo -= 1
+            hi = self.estender(comandos, hi)
+        regiao = self.limites(bloco, lo, hi, base)
+        if regiao is None or regiao[0] > r1 or regiao[1] < r2:
+            return None
+        return lo, hi
+
+    # Encontra o bloco mais interno cuja região envolve as linhas [r1, r2].
+    # Retorna o caminho [(bloco, lo, hi, base, dono), ...] desde o bloco
+    # principal, ou None se a edição atinge linhas do próprio bloco
+    # (cabeçalho, fim).
+    def localizar(self, bloco, r1, r2, base=0, dono=None):
+        faixa = self.faixa(bloco, r1, r2, base)
+        if faixa is None:
+            return None
+        caminho = []
+        while faixa is not None:
+            lo, hi = faixa
+            caminho.append((bloco, lo, hi, base, dono))
+            if hi - lo != 1:
+                break
+            # Desce para o bloco interno do comando que envolve a edição, se houver
+            dono = bloco.comandos[lo]
+            base += dono.linha_ini
+            faixa = None
+            for bloco in dono.blocos:
+                faixa = self.faixa(bloco, r1, r2, base)
+                if faixa is not None:
+                    break
+        return caminho
+
+    # Inclui os comandos que começam na mesma linha em que o anterior termina
+    def estender(self, comandos, hi):
+        while 0 < hi < len(comandos) and comandos[hi].linha_ini <= comandos[hi - 1].linha_fim:
+            hi += 1
+        return hi
+
+    # Reanalisa (sintático e semântico) o menor trecho da árvore que envolve
+    # as linhas [r1, r2]. Se os comandos do trecho não fecham sozinhos (o
+    # bloco para antes do fim ou o erro cai no token seguinte), o trecho cresce
+    # para o próximo comando do bloco e, no fim do bloco, para o comando dono.
+    def reanalisar(self, r1, r2):
+        caminho = None if self.arvore is None else self.localizar(self.arvore, r1, r2)
+        while caminho:
+            bloco, lo, hi, base, dono = caminho.pop()
+            while True:
+                regiao = self.limites(bloco, lo, hi, base)
+                if regiao is None or self.pode_ser_declaracao(bloco, lo, regiao[0], regiao[1]):
+                    break
+                novos = self.analisar_regiao(*regiao)
+                if novos is not None:
+                    self.trocar_comandos(bloco, lo, hi, novos, base, dono)
+                    return
+                if hi == len(bloco.comandos):
+                    break
+                hi = self.estender(bloco.comandos, hi + 1)
+        self.analisar_tudo()
+
+    # Sem BAGULHOS no cabeçalho, um BAGULHOS no início do bloco principal
+    # muda o cabeçalho, e o documento precisa ser analisado por inteiro
+    def pode_ser_declaracao(self, bloco, lo, s, e):
+        if bloco is not self.arvore or lo > 0 or self.com_declaracoes:
+            return False
+        for numero in range(s, e + 1):
+            for tipo, _, _ in self.linhas[numero - 1].tokens:
+                return tipo == TokenType.T_BAGULHOS
+        return False
+
+    # BufferTokens com os tokens das linhas [s, e], terminado pelo fim de
+    # fonte real (cauda=True) ou por um fim de fonte logo depois da região
+    def tokens_linhas(self, s, e, cauda):
+        tokens = BufferTokens()
+        adicionar = tokens.adicionar
+        linhas = self.linhas
+        for numero in range(s, e + 1):
+            for tipo, lexema, coluna in linhas[numero - 1].tokens:
+                adicionar(tipo, lexema, numero, coluna)
+        if not cauda:
+            fim = e + 1
+        elif linhas[-1].texto:
+            fim = len(linhas) + 1
+        else:
+            fim = len(linhas)
+        adicionar(TokenType.T_FIM_FONTE, '<EOF>', fim, 1)
+        return tokens
+
+    # Analisa os comandos das linhas [s, e]. Retorna a nova lista de comandos
+    # da região (terminada por um TrechoComErro se houve erro) ou None se o
+    # resultado depende do que vem depois da região.
+    def analisar_regiao(self, s, e, cauda):
+        tokens = self.tokens_linhas(s, e, cauda)
+        sintatico = SintaticoRegistro(tokens)
+        if cauda:
+            ok = sintatico.corpo_programa()
+        else:
+            ok = sintatico.bloco()
+            if ok and sintatico.posicao < sintatico.fim_fonte:
+                return None
+            if not ok and sintatico.posicao >= sintatico.fim_fonte:
+                return None
+        return self.montar_comandos(sintatico, ok, e, cauda)
+
+    # Monta a lista de comandos de uma região a partir do sintático que a analisou
+    def montar_comandos(self, sintatico, ok, e, cauda):
+        comandos = sintatico.raiz.comandos
+        limite = sintatico.fim_raiz
+        if cauda:
+            self.arvore.limite_fim = sintatico.linha(limite)
+        if not ok and sintatico.inicio_falha is not None:
+            limite = sintatico.inicio_falha
+        if not ok:
+            linha_falha = min(sintatico.linha(limite), e)
+            while comandos and comandos[-1].linha_fim >= linha_falha:
+                linha_falha = min(linha_falha, comandos.pop().linha_ini)
+            comandos.append(TrechoComErro(linha_falha, e, erro_sintatico(sintatico), cauda))
+        return comandos
+
+    # Troca os comandos [lo, hi) do bloco pelos novos (com linhas absolutas),
+    # atualizando os conjuntos de trechos com erro e de comandos com
+    # variáveis não declaradas
+    def trocar_comandos(self, bloco, lo, hi, novos, base=0, dono=None):
+        for comando in percorrer(bloco.comandos[lo:hi]):
+            self.trechos_com_erro.discard(comando)
+            self.usos_invalidos.discard(comando)
+            if comando is self.primeiro_invalido:
+                self.primeiro_invalido = None
+        relativizar(novos, base, dono)
+        bloco.comandos[lo:hi] = novos
+        for comando in percorrer(novos):
+            if isinstance(comando, TrechoComErro):
+                self.trechos_com_erro.add(comando)
+                continue
+            uso = self.primeiro_uso_invalido(comando)
+            if uso is None:
+                continue
+            self.usos_invalidos.add(comando)
+            # Deslocar não muda a ordem dos comandos, então o primeiro só
+            # precisa ser procurado de novo quando ele próprio sai da árvore
+            if self.primeiro_invalido is not None and uso < self.primeiro_uso_invalido(self.primeiro_invalido):
+                self.primeiro_invalido = comando
+
+    # Refaz a análise sintática e semântica do documento inteiro
+    def analisar_tudo(self):
+        self.arvore = None
+        self.erro_programa = None  # Erro no cabeçalho, antes do bloco principal
+        self.declarados = set()
+        self.redeclaracao = None  # Primeira variável declarada duas vezes
+        self.com_declaracoes = False  # O cabeçalho tem BAGULHOS
+        self.trechos_com_erro = set()
+        self.usos_invalidos = set()
+        self.primeiro_invalido = None  # Comando com a primeira variável não declarada (None: procurar)
+        tokens = self.tokens_linhas(1, len(self.linhas), True)
+        sintatico = SintaticoRegistro(tokens)
+        ok = sintatico.programa()
+        if sintatico.raiz is None:
+            self.erro_programa = erro_sintatico(sintatico)
+            return
+        # Um BAGULHOS sempre declara pelo menos uma variável
+        self.com_declaracoes = bool(sintatico.declaracoes_lidas)
+        nomes = tokens.identificadores.nomes
+        for declaracao in sintatico.declaracoes_lidas:
+            nome = nomes[declaracao.simbolo]
+            if nome in self.declarados and self.redeclaracao is None:
+                self.redeclaracao = (nome, declaracao.linha, declaracao.coluna)
+            self.declarados.add(nome)
+        self.arvore = BlocoCria(sintatico.raiz.limite_ini)
+        self.trocar_comandos(self.arvore, 0, 0, self.montar_comandos(sintatico, ok, len(self.linhas), True))
+
+    # Primeira variável não declarada conferida pelo comando, como (linha, coluna, nome)
+    def primeiro_uso_invalido(self, comando):
+        for nome, linha, coluna in comando.usos:
+            if nome not in self.declarados:
+                return linha_absoluta(comando) + linha, coluna, nome
+        return None
+
+    # Diagnósticos na mesma ordem de Resultado.diagnosticos (léxico,
+    # sintático, semântico), cada um como (mensagem, linha, coluna, comprimento)
+    def diagnosticos(self):
+        diagnosticos = []
+        if self.linhas_com_erro:
+            diagnosticos.append(self.erro_lexico())
+        if self.arvore is None:
+            diagnosticos.append(self.erro_programa)
+        elif self.trechos_com_erro:
+            diagnosticos.append(self.primeiro_erro_sintatico())
+        elif self.redeclaracao is not None:
+            nome, linha, coluna = self.redeclaracao
+            diagnosticos.append((mensagem_ja_declarada(nome, linha), linha, coluna, len(nome)))
+        elif self.usos_invalidos:
+            if self.primeiro_invalido is None:
+                self.primeiro_invalido = min(self.usos_invalidos, key=self.primeiro_uso_invalido)
+            linha, coluna, nome = self.primeiro_uso_invalido(self.primeiro_invalido)
+            diagnosticos.append((mensagem_nao_declarada(nome, linha), linha, coluna, len(nome)))
+        return diagnosticos
+
+    # Primeiro erro léxico do documento. A mensagem é gerada de novo a partir
+    # do início do trecho, já com a numeração de linhas atual.
+    def erro_lexico(self):
+        linhas = self.linhas
+        indice = next(k for k, linha in enumerate(linhas) if linha.erro is not None)
+        inicio = indice
+        while inicio > 0 and linhas[inicio].trecho == 0:
+            inicio -= 1
+        fonte = FonteCria('\n'.join([linha.texto for linha in linhas[inicio:indice + 1]]), linha_inicial=inicio + 1)
+        lexico = LexicoCria(fonte, limite_erros=1)
+        for _ in lexico.tokenizar_offsets(fonte):
+            if lexico.erros:
+                break
+        coluna, comprimento = linhas[indice].erro
+        return lexico.erro, indice + 1, coluna, comprimento
+
+    # Primeiro erro sintático do documento. Se o trecho mudou de linha desde
+    # que a mensagem foi gerada, ele é analisado de novo para atualizá-la.
+    def primeiro_erro_sintatico(self):
+        trecho = min(self.trechos_com_erro, key=linha_absoluta)
+        inicio = linha_absoluta(trecho)
+        if trecho.linha_erro != inicio:
+            novos = self.analisar_regiao(inicio, inicio + trecho.linha_fim - trecho.linha_ini, trecho.cauda)
+            if novos and isinstance(novos[-1], TrechoComErro):
+                trecho.erro = novos[-1].erro
+            trecho.linha_erro = inicio
+        return trecho.erro
+
+    # Texto atual do documento
+    def texto(self):
+        return '\n'.join([linha.texto for linha in self.linhas])
+
+# Servidor LSP: lê mensagens JSON-RPC (cabeçalho Content-Length) da entrada e
+# publica os diagnósticos de cada documento a cada abertura ou edição
+class ServidorCria:
+    TRATADORES = {
+        'initialize': 'inicializar',
+        'shutdown': 'encerrar',
+        'textDocument/didOpen': 'abrir',
+        'textDocument/didChange': 'alterar',
+        'textDocument/didClose': 'fechar',
+    }
+
+    def __init__(self, entrada, saida):
+        self.entrada = entrada
+        self.saida = saida
+        self.documentos = {}  # URI -> DocumentoCria
+        self.encerrado = False
+
+    # Lê a próxima mensagem (None se a entrada terminou)
+    def ler_mensagem(self):
+        tamanho = None
+        while True:
+            linha = self.entrada.readline()
+            if not linha:
+                return None
+            linha = linha.strip()
+            if not linha:
+                break
+            nome, _, valor = linha.decode('ascii').partition(':')
+            if nome.strip().lower() == 'content-length':
+                tamanho = int(valor)
+        if tamanho is None:
+            return None
+        return json.loads(self.entrada.read(tamanho).decode('utf-8'))
+
+    def enviar(self, mensagem):
+        corpo = json.dumps(mensagem, ensure_ascii=False).encode('utf-8')
+        self.saida.write(b'Content-Length: %d\r\n\r\n' % len(corpo) + corpo)
+        self.saida.flush()
+
+    # Atende mensagens até receber "exit"; retorna o código de saída
+    def executar(self):
+        while True:
+            mensagem = self.ler_mensagem()
+            if mensagem is None:
+                return 1
+            metodo = mensagem.get('method')
+            if metodo == 'exit':
+                return 0 if self.encerrado else 1
+            tratador = self.TRATADORES.get(metodo)
+            if tratador is not None:
+                resultado = getattr(self, tratador)(mensagem.get('params') or {})
+                if 'id' in mensagem:
+                    self.enviar({'jsonrpc': '2.0', 'id': mensagem['id'], 'result': resultado})
+            elif 'id' in mensagem:
+                self.enviar({'jsonrpc': '2.0', 'id': mensagem['id'],
+                             'error': {'code': -32601, 'message': f"Método não suportado: {metodo}"}})
+
+    def inicializar(self, params):
+        return {
+            'capabilities': {'textDocumentSync': {'openClose': True, 'change': 2}},
+            'serverInfo': {'name': 'cria-lsp'},
+        }
+
+    def encerrar(self, params):
+        self.encerrado = True
+        return None
+
+    def abrir(self, params):
+        documento = params['textDocument']
+        self.documentos[documento['uri']] = DocumentoCria(documento['text'])
+        self.publicar(documento['uri'])
+
+    # Aplica as mudanças na ordem recebida: com "range" é uma edição
+    # incremental, sem "range" é o texto inteiro
+    def alterar(self, params):
+        uri = params['textDocument']['uri']
+        documento = self.documentos[uri]
+        for mudanca in params['contentChanges']:
+            if 'range' not in mudanca:
+                documento.substituir(mudanca['text'])
+                continue
+            linha_ini, coluna_ini = self.posicao(documento, mudanca['range']['start'])
+            linha_fim, coluna_fim = self.posicao(documento, mudanca['range']['end'])
+            documento.editar(linha_ini, coluna_ini, linha_fim, coluna_fim, mudanca['text'])
+        self.publicar(uri)
+
+    def fechar(self, params):
+        uri = params['textDocument']['uri']
+        self.documentos.pop(uri, None)
+        self.enviar({'jsonrpc': '2.0', 'method': 'textDocument/publishDiagnostics',
+                     'params': {'uri': uri, 'diagnostics': []}})
+
+    # Posição LSP (linha, caractere UTF-16) -> (linha, índice Python)
+    def posicao(self, documento, posicao):
+        linhas = documento.linhas
+        if posicao['line'] >= len(linhas):
+            return len(linhas) - 1, len(linhas[-1].texto)
+        texto = linhas[posicao['line']].texto
+        return posicao['line'], indice_python(texto, posicao['character'])
+
+    def publicar(self, uri):
+        documento = self.documentos[uri]
+        linhas = documento.linhas
+        diagnosticos = []
+        for mensagem, linha, coluna, comprimento in documento.diagnosticos():
+            indice = min(linha, len(linhas)) - 1
+            texto = linhas[indice].texto
+            inicio = coluna - 1 if linha <= len(linhas) else len(texto)
+            diagnosticos.append({
+                'range': {
+                    'start': {'line': indice, 'character': unidades_utf16(texto, inicio)},
+                    'end': {'line': indice, 'character': unidades_utf16(texto, inicio + comprimento)},
+                },
+                'severity': 1,
+                'source': 'cria',
+                'message': mensagem,
+            })
+        self.enviar({'jsonrpc': '2.0', 'method': 'textDocument/publishDiagnostics',
+                     'params': {'uri': uri, 'diagnostics': diagnosticos}})
+
+# Ponto de entrada do programa
+if __name__ == '__main__':
+    saida = sys.stdout.buffer
+    # Qualquer print das etapas vai para a saída de erros, sem corromper o protocolo
+    sys.stdout = sys.stderr
+    sys.exit(ServidorCria(sys.stdin.buffer, saida).executar())
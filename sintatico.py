@@ -1,93 +1,116 @@
 import sys
-from enum import Enum, auto
-
-# Definição da enumeração para tipos de tokens
-class TokenType(Enum):
-    T_ENOIS         = auto()  # Token para a palavra reservada "ÉNOIS"
-    T_PARTIU        = auto()  # Token para a palavra reservada "PARTIU"
-    T_BAGULHOS      = auto()  # Token para a palavra reservada "BAGULHOS"
-    T_VIRGULA       = auto()  # Token para o símbolo de vírgula
-    T_PONTO_VIRGULA = auto()  # Token para o símbolo de ponto e vírgula
-    T_SEPA          = auto()  # Token para a palavra reservada "SEPA"
-    T_NAOFOI        = auto()  # Token para a palavra reservada "NÃOFOI"
-    T_FIMSEPA       = auto()  # Token para a palavra reservada "FIMSEPA"
-    T_MANDAENQUANTO = auto()  # Token para a palavra reservada "MANDAENQUANTO"
-    T_PARAMANDA     = auto()  # Token para a palavra reservada "PARAMANDA"
-    T_MANDALEMBRAR  = auto()  # Token para a palavra reservada "MANDALEMBRAR"
-    T_SETA          = auto()  # Token para o símbolo de atribuição "<-"
-    T_ATEALILA      = auto()  # Token para a palavra reservada "ATEALILA"
-    T_DESENCANA     = auto()  # Token para a palavra reservada "DESENCANA"
-    T_OLHA          = auto()  # Token para a palavra reservada "OLHA"
-    T_ABRE_PAR      = auto()  # Token para o símbolo de abertura de parênteses
-    T_FECHA_PAR     = auto()  # Token para o símbolo de fechamento de parênteses
-    T_FALA          = auto()  # Token para a palavra reservada "FALA"
-    T_MAIOR         = auto()  # Token para o operador relacional ">"
-    T_MENOR         = auto()  # Token para o operador relacional "<"
-    T_MAIOR_IGUAL   = auto()  # Token para o operador relacional ">="
-    T_MENOR_IGUAL   = auto()  # Token para o operador relacional "<="
-    T_IGUAL         = auto()  # Token para o operador relacional "=="
-    T_DIFERENTE     = auto()  # Token para o operador relacional "<>"
-    T_MAIS          = auto()  # Token para o operador aritmético "+"
-    T_MENOS         = auto()  # Token para o operador aritmético "-"
-    T_VEZES         = auto()  # Token para o operador aritmético "*"
-    T_DIVIDIDO      = auto()  # Token para o operador aritmético "/"
-    T_RESTO         = auto()  # Token para o operador aritmético "%"
-    T_ELEVADO       = auto()  # Token para o operador aritmético "**"
-    T_NUMERO        = auto()  # Token para números (inteiros ou decimais)
-    T_ID            = auto()  # Token para identificadores (nomes de variáveis)
-    T_STRING        = auto()  # Token para strings literais
-    T_FIM_FONTE     = auto()  # Token para o fim do arquivo fonte
-    T_ERRO_LEX      = auto()  # Token para erros léxicos
-    T_NULO          = auto()  # Token para valor nulo
-
-# Classe que representa um token com tipo, lexema, linha e coluna
-class Token:
-    def __init__(self, tipo: TokenType, lexema, linha, coluna):
-        self.tipo = tipo
-        self.lexema = lexema
-        self.linha = linha
-        self.coluna = coluna
 
-    # Método para formatar a representação em string do token
-    def __str__(self):
-        return f"{self.tipo.name} | {self.lexema} | linha {self.linha} | coluna {self.coluna}"
+from arvore import (OPERADORES_RELACIONAIS, Atribuicao, Binaria, Bloco, Declaracao, Enquanto, Escrever, Ler,
+                    Numero, Para, Parenteses, Programa, Se, Texto, Variavel)
+from tokens import LIMITE_ERROS, TIPOS_POR_CODIGO, BufferTokens, TokenType, VisaoToken, carregar_lex
+
+# Tokens que podem começar um comando
+PRIMEIROS_COMANDO = frozenset({TokenType.T_ID, TokenType.T_SEPA, TokenType.T_MANDAENQUANTO,
+                               TokenType.T_MANDALEMBRAR, TokenType.T_OLHA, TokenType.T_FALA})
+
+# Comandos compostos e a palavra que encerra cada um
+FECHAMENTOS = {
+    TokenType.T_SEPA: TokenType.T_FIMSEPA,
+    TokenType.T_MANDAENQUANTO: TokenType.T_PARAMANDA,
+    TokenType.T_MANDALEMBRAR: TokenType.T_DESENCANA,
+}
+
+# Pontos de sincronização do modo pânico: depois de um erro, os tokens são
+# descartados até o fim de um comando simples (';'), uma palavra que fecha ou
+# divide um bloco, o fim do programa ou uma palavra que só pode começar um comando
+SINCRONIA = frozenset({TokenType.T_PONTO_VIRGULA, TokenType.T_NAOFOI, TokenType.T_PARTIU,
+                       TokenType.T_FIM_FONTE, *FECHAMENTOS.values()}) | (PRIMEIROS_COMANDO - {TokenType.T_ID})
+
+# Onde para o descarte de um cabeçalho com erro (o ';' faz parte do MANDALEMBRAR)
+PARADAS_CABECALHO = SINCRONIA - {TokenType.T_PONTO_VIRGULA}
+
+# Operadores binários aritméticos: (precedência, associativo à direita). Maior
+# precedência liga mais forte, como no Python gerado.
+OPERADORES_BINARIOS = {
+    TokenType.T_MAIS: (1, False),
+    TokenType.T_MENOS: (1, False),
+    TokenType.T_VEZES: (2, False),
+    TokenType.T_DIVIDIDO: (2, False),
+    TokenType.T_RESTO: (2, False),
+    TokenType.T_ELEVADO: (3, True),
+}
+
+# Troca os dois operandos do topo pela operação com o operador do topo
+def reduzir(operandos, operadores):
+    direita = operandos.pop()
+    operandos[-1] = Binaria(operadores.pop(), operandos[-1], direita)
+
+# True se o token encerra o bloco atual do comando aberto: a palavra que
+# fecha o comando ou, no primeiro bloco do SEPA, o NÃOFOI
+def fecha(aberto, tipo):
+    if tipo == FECHAMENTOS[aberto.tipo]:
+        return True
+    return tipo == TokenType.T_NAOFOI and aberto.tipo == TokenType.T_SEPA and not aberto.blocos
 
-# Classe responsável pela análise sintática do arquivo léxico
+# Monta o nodo de um comando composto já fechado, com o cabeçalho e os
+# blocos (None se o cabeçalho tinha erro)
+def montar_comando(aberto):
+    if aberto.cabecalho is None:
+        return None
+    if aberto.tipo == TokenType.T_SEPA:
+        senao = aberto.blocos[1] if len(aberto.blocos) > 1 else None
+        return Se(aberto.cabecalho, aberto.blocos[0], senao, aberto.linha)
+    if aberto.tipo == TokenType.T_MANDAENQUANTO:
+        return Enquanto(aberto.cabecalho, aberto.blocos[0], aberto.linha)
+    return Para(*aberto.cabecalho, aberto.blocos[0], aberto.linha)
+
+# Comando composto cujo bloco está em análise; a pilha destes comandos
+# substitui a recursão bloco -> comando -> bloco
+class ComandoAberto:
+    __slots__ = ('tipo', 'linha', 'cabecalho', 'blocos', 'externos')
+
+    def __init__(self, tipo, linha, cabecalho, externos):
+        self.tipo = tipo  # Palavra que abriu o comando
+        self.linha = linha
+        self.cabecalho = cabecalho  # Resultado de cabecalho() (None se teve erro)
+        self.blocos = []  # Blocos já analisados (o do SEPA e o do NÃOFOI)
+        self.externos = externos  # Comandos do bloco que contém este comando
+
+# Classe responsável pela análise sintática do arquivo léxico; além de
+# verificar, monta a árvore sintática do programa (ver arvore.py). Depois de
+# um erro a análise se recupera em modo pânico (ver SINCRONIA) e continua,
+# até limite_erros erros.
 class SintaticoCria:
-    def __init__(self, arquivo_lex):
-        # Inicializa o analisador sintático com o arquivo de tokens
-        self.tokens = []
+    def __init__(self, arquivo_lex=None, tokens=None, limite_erros=LIMITE_ERROS):
+        # Inicializa o analisador sintático com o arquivo de tokens ou com um
+        # BufferTokens já em memória
+        self.tokens = BufferTokens()
         self.erros = []  # Lista para armazenar erros sintáticos
+        self.limite_erros = limite_erros  # None: analisa até o fim, qualquer que seja a quantidade de erros
+        self.interrompida = False  # A análise parou no limite de erros
         self.posicao = 0  # Posição atual na lista de tokens
         self.arquivo_lex = arquivo_lex
-        self.carregar_tokens()  # Carrega os tokens do arquivo
+        if tokens is None:
+            self.carregar_tokens()  # Carrega os tokens do arquivo
+        else:
+            self.usar_tokens(tokens)
 
     # Carrega os tokens do arquivo gerado pela análise léxica
     def carregar_tokens(self):
         try:
-            with open(self.arquivo_lex, 'r', encoding='utf-8') as f:
-                linhas = f.readlines()
-                for linha in linhas:
-                    linha = linha.strip()
-                    if linha and not linha.startswith(('Análise Léxica', '---', 'Erro encontrado')):
-                        try:
-                            partes = linha.split(' | ')
-                            if len(partes) != 4:
-                                continue
-                            tipo_str, lexema, linha_str, coluna_str = partes
-                            tipo = TokenType[tipo_str]
-                            linha_num = int(linha_str.split()[-1])
-                            coluna_num = int(coluna_str.split()[-1])
-                            self.tokens.append(Token(tipo, lexema, linha_num, coluna_num))
-                        except (ValueError, KeyError):
-                            continue
-        except IOError as e:
+            self.tokens = carregar_lex(self.arquivo_lex)
+        except (IOError, ValueError) as e:
             self.erros.append(f"Erro ao ler o arquivo {self.arquivo_lex}: {e}")
-            self.tokens.append(Token(TokenType.T_FIM_FONTE, '<EOF>', 1, 1))
+        self.usar_tokens(self.tokens)
+
+    # Passa a analisar os tokens do buffer informado
+    def usar_tokens(self, tokens):
+        self.tokens = tokens
+        self.tokens.garantir_fim()
+        self.fim_fonte = len(self.tokens) - 1  # Índice do token de fim de fonte
 
     # Retorna o token atual na análise
     def token_atual(self):
-        return self.tokens[self.posicao] if self.posicao < len(self.tokens) else Token(TokenType.T_FIM_FONTE, '<EOF>', 1, 1)
+        return VisaoToken(self.tokens, min(self.posicao, self.fim_fonte))
+
+    # Retorna o tipo do token atual sem criar uma visão do token
+    def tipo_atual(self):
+        return TIPOS_POR_CODIGO[self.tokens.tipos[min(self.posicao, self.fim_fonte)]]
 
     # Avança para o próximo token
     def avancar(self):
@@ -95,235 +118,412 @@ class SintaticoCria:
 
     # Verifica se o token atual é do tipo esperado
     def espera(self, tipo_esperado):
-        token = self.token_atual()
-        if token.tipo == tipo_esperado:
+        if self.tipo_atual() == tipo_esperado:
             self.avancar()
             return True
+        token = self.token_atual()
         self.erros.append(f"Erro sintático na linha {token.linha}, coluna {token.coluna}: "
                         f"Esperado {tipo_esperado.name}, encontrado {token.tipo.name} ({token.lexema})")
         return False
 
-    # Verifica a estrutura geral do programa
+    # Consome um identificador e retorna a Variavel correspondente
+    def espera_variavel(self):
+        posicao = self.posicao
+        if not self.espera(TokenType.T_ID):
+            return None
+        return Variavel(self.tokens.simbolo(posicao), self.tokens.linhas[posicao], self.tokens.colunas[posicao])
+
+    # Chamado depois de cada erro: True se o limite de erros foi atingido e a
+    # análise deve parar; senão quem chamou se recupera e continua
+    def desistir(self):
+        if self.limite_erros is None or len(self.erros) < self.limite_erros:
+            return False
+        if not self.interrompida:
+            self.interrompida = True
+            self.erros.append(f"Análise sintática interrompida: limite de {self.limite_erros} erros atingido")
+        return True
+
+    # Modo pânico: descarta tokens até um ponto de sincronização. Um ';' é
+    # consumido, porque o próximo comando começa depois dele; os outros
+    # pontos ficam para quem chamou.
+    def sincronizar(self):
+        while self.tipo_atual() not in SINCRONIA:
+            self.avancar()
+        if self.tipo_atual() == TokenType.T_PONTO_VIRGULA:
+            self.avancar()
+
+    # Descarta um token fora de lugar onde deveria começar um comando: uma
+    # palavra de fechamento sem comando aberto, um NÃOFOI fora do SEPA, um ';'
+    # sobrando, ou qualquer outro token junto com o que vier até a sincronização
+    def descartar_sobra(self):
+        if self.tipo_atual() in SINCRONIA:
+            self.avancar()
+        else:
+            self.sincronizar()
+
+    # Depois de um erro no cabeçalho de um comando composto, pula até o ')'
+    # que fecha o cabeçalho, para o bloco do comando ser analisado mesmo
+    # assim; para antes de uma palavra que não pode estar no cabeçalho
+    def pular_cabecalho(self, inicio):
+        tipos = self.tokens.tipos
+        abre, fecha = TokenType.T_ABRE_PAR.value, TokenType.T_FECHA_PAR.value
+        profundidade = 0
+        for posicao in range(inicio, min(self.posicao, self.fim_fonte)):
+            profundidade += (tipos[posicao] == abre) - (tipos[posicao] == fecha)
+        profundidade = max(profundidade, 1)
+        while True:
+            tipo = self.tipo_atual()
+            if tipo in PARADAS_CABECALHO:
+                return
+            self.avancar()
+            if tipo == TokenType.T_ABRE_PAR:
+                profundidade += 1
+            elif tipo == TokenType.T_FECHA_PAR:
+                profundidade -= 1
+                if profundidade == 0:
+                    return
+
+    # Linha do token atual, guardada nos comandos da árvore
+    def linha_atual(self):
+        return self.tokens.linhas[min(self.posicao, self.fim_fonte)]
+
+    # Verifica a estrutura geral do programa e retorna sua árvore (None se houve erro)
     def programa(self):
-        if not self.espera(TokenType.T_ENOIS):
-            return False
-        if not self.declaracoes():
-            return False
-        if not self.bloco():
-            return False
-        if not self.espera(TokenType.T_PARTIU):
-            return False
-        if self.token_atual().tipo != TokenType.T_FIM_FONTE:
+        if not self.espera(TokenType.T_ENOIS) and self.desistir():
+            return None
+        declaracoes = self.declaracoes()
+        if declaracoes is None:
+            return None
+        bloco = self.corpo_programa()
+        if bloco is None or self.erros:
+            return None
+        return Programa(declaracoes, bloco, self.tokens.identificadores)
+
+    # Verifica o bloco principal e o encerramento do programa (PARTIU e fim
+    # do arquivo). Retorna None só se a análise parou no limite de erros.
+    def corpo_programa(self):
+        bloco = self.bloco()
+        if bloco is None:
+            return None
+        while not self.espera(TokenType.T_PARTIU):
+            if self.desistir() or self.tipo_atual() == TokenType.T_FIM_FONTE:
+                return None
+            # Token que sobrou no bloco principal: descarta e continua nos comandos seguintes
+            self.descartar_sobra()
+            resto = self.bloco()
+            if resto is None:
+                return None
+            bloco.comandos.extend(resto.comandos)
+        if self.tipo_atual() != TokenType.T_FIM_FONTE:
             self.erros.append(f"Erro sintático na linha {self.token_atual().linha}, coluna {self.token_atual().coluna}: "
-                            f"Esperado fim do arquivo, encontrado {self.token_atual().tipo.name}")
-            return False
-        return True
+                            f"Esperado fim do arquivo, encontrado {self.tipo_atual().name}")
+            return None
+        return bloco
 
     # Verifica a seção de declarações de variáveis
     def declaracoes(self):
-        if self.token_atual().tipo == TokenType.T_BAGULHOS:
+        if self.tipo_atual() == TokenType.T_BAGULHOS:
             self.avancar()
-            if not self.lista_variaveis():
-                return False
-            if not self.espera(TokenType.T_PONTO_VIRGULA):
-                return False
-        return True
+            declaracoes = self.lista_variaveis()
+            if declaracoes is not None and self.espera(TokenType.T_PONTO_VIRGULA):
+                return declaracoes
+            if self.desistir():
+                return None
+            self.sincronizar()
+        return []
 
     # Verifica a lista de variáveis declaradas
     def lista_variaveis(self):
-        if not self.espera(TokenType.T_ID):
-            return False
-        while self.token_atual().tipo == TokenType.T_VIRGULA:
+        declaracoes = []
+        while True:
+            variavel = self.espera_variavel()
+            if variavel is None:
+                return None
+            declaracoes.append(Declaracao(variavel.simbolo, variavel.linha, variavel.coluna))
+            if self.tipo_atual() != TokenType.T_VIRGULA:
+                return declaracoes
             self.avancar()
-            if not self.espera(TokenType.T_ID):
-                return False
-        return True
 
-    # Verifica um bloco de comandos
+    # Ganchos chamados ao entrar e sair de cada bloco e de cada comando (nodo
+    # None quando a análise falhou). Não fazem nada aqui; subclasses, como a
+    # do servidor de linguagem, usam os ganchos para acompanhar a estrutura.
+    def entrar_bloco(self):
+        pass
+
+    def sair_bloco(self, bloco):
+        pass
+
+    def entrar_comando(self):
+        pass
+
+    def sair_comando(self, nodo):
+        pass
+
+    # Verifica um bloco de comandos. Os comandos compostos (SEPA,
+    # MANDAENQUANTO, MANDALEMBRAR) não chamam bloco() de novo: ficam numa
+    # pilha explícita, então o aninhamento não depende do limite de recursão.
+    # Retorna None só se a análise parou no limite de erros.
     def bloco(self):
-        while self.token_atual().tipo in {TokenType.T_ID, TokenType.T_SEPA, TokenType.T_MANDAENQUANTO,
-                                        TokenType.T_MANDALEMBRAR, TokenType.T_OLHA, TokenType.T_FALA}:
-            if not self.comando():
-                return False
-        return True
+        abertos = []  # ComandoAberto, do mais externo ao mais interno
+        comandos = []  # Comandos do bloco atual
+        self.entrar_bloco()
+        while True:
+            tipo = self.tipo_atual()
+            if tipo in PRIMEIROS_COMANDO:
+                self.entrar_comando()
+                if tipo in FECHAMENTOS:
+                    linha = self.linha_atual()
+                    inicio = self.posicao
+                    cabecalho = self.cabecalho(tipo)
+                    if cabecalho is None:
+                        if self.desistir():
+                            self.sair_comando(None)
+                            return self.desfazer(abertos)
+                        self.pular_cabecalho(inicio)
+                    abertos.append(ComandoAberto(tipo, linha, cabecalho, comandos))
+                    comandos = []
+                    self.entrar_bloco()
+                else:
+                    nodo = self.comando()
+                    self.sair_comando(nodo)
+                    if nodo is not None:
+                        comandos.append(nodo)
+                    elif self.desistir():
+                        return self.desfazer(abertos)
+                    else:
+                        self.sincronizar()
+                continue
 
-    # Identifica e verifica o tipo de comando
+            # Fim do bloco atual: ele fecha o comando composto mais interno
+            if not abertos:
+                bloco = Bloco(comandos)
+                self.sair_bloco(bloco)
+                return bloco
+            aberto = abertos[-1]
+            if not fecha(aberto, tipo):
+                self.espera(FECHAMENTOS[aberto.tipo])
+                if self.desistir():
+                    return self.desfazer(abertos)
+                if tipo in (TokenType.T_PARTIU, TokenType.T_FIM_FONTE) or any(fecha(a, tipo) for a in abertos):
+                    # Falta o fechamento: o comando fica de fora e o token
+                    # é conferido de novo com o comando de fora
+                    self.sair_bloco(None)
+                    abertos.pop()
+                    self.sair_comando(None)
+                    comandos = aberto.externos
+                else:
+                    self.descartar_sobra()
+                continue
+            bloco = Bloco(comandos)
+            self.sair_bloco(bloco)
+            aberto.blocos.append(bloco)
+            self.avancar()
+            if tipo == TokenType.T_NAOFOI:
+                comandos = []
+                self.entrar_bloco()
+                continue
+            abertos.pop()
+            nodo = montar_comando(aberto)
+            self.sair_comando(nodo)
+            comandos = aberto.externos
+            if nodo is not None:
+                comandos.append(nodo)
+
+    # Depois de um erro dentro de bloco(), fecha (nos ganchos) o bloco atual
+    # e os comandos compostos ainda abertos, do mais interno para fora
+    def desfazer(self, abertos):
+        self.sair_bloco(None)
+        while abertos:
+            abertos.pop()
+            self.sair_comando(None)
+            self.sair_bloco(None)
+        return None
+
+    # Identifica e verifica um comando simples (atribuição, OLHA, FALA); os
+    # compostos são tratados por bloco()
     def comando(self):
-        token = self.token_atual()
-        if token.tipo == TokenType.T_ID:
+        tipo = self.tipo_atual()
+        if tipo == TokenType.T_ID:
             return self.comando_atribuicao()
-        elif token.tipo == TokenType.T_SEPA:
-            return self.comando_se()
-        elif token.tipo == TokenType.T_MANDAENQUANTO:
-            return self.comando_enquanto()
-        elif token.tipo == TokenType.T_MANDALEMBRAR:
-            return self.comando_para()
-        elif token.tipo == TokenType.T_OLHA:
+        elif tipo == TokenType.T_OLHA:
             return self.comando_ler()
-        elif token.tipo == TokenType.T_FALA:
+        elif tipo == TokenType.T_FALA:
             return self.comando_escrever()
         else:
+            token = self.token_atual()
             self.erros.append(f"Erro sintático na linha {token.linha}, coluna {token.coluna}: "
                             f"Comando inválido: {token.tipo.name} ({token.lexema})")
-            return False
-
-    # Verifica o comando de atribuição
-    def comando_atribuicao(self):
-        if not self.espera(TokenType.T_ID):
-            return False
-        if not self.espera(TokenType.T_SETA):
-            return False
-        if not self.expressao():
-            return False
-        if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        return True
+            return None
 
-    # Verifica o comando de controle "se"
-    def comando_se(self):
-        if not self.espera(TokenType.T_SEPA):
-            return False
+    # Verifica o cabeçalho de um comando composto, até o "(...)" antes do
+    # bloco: a condição (SEPA, MANDAENQUANTO) ou as partes do MANDALEMBRAR
+    def cabecalho(self, tipo):
+        if tipo == TokenType.T_MANDALEMBRAR:
+            return self.cabecalho_para()
+        if not self.espera(tipo):
+            return None
         if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if not self.condicao():
-            return False
+            return None
+        condicao = self.condicao()
+        if condicao is None:
+            return None
         if not self.espera(TokenType.T_FECHA_PAR):
-            return False
-        if not self.bloco():
-            return False
-        if self.token_atual().tipo == TokenType.T_NAOFOI:
-            self.avancar()
-            if not self.bloco():
-                return False
-        if not self.espera(TokenType.T_FIMSEPA):
-            return False
-        return True
-
-    # Verifica o comando de repetição "enquanto"
-    def comando_enquanto(self):
-        if not self.espera(TokenType.T_MANDAENQUANTO):
-            return False
-        if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if not self.condicao():
-            return False
-        if not self.espera(TokenType.T_FECHA_PAR):
-            return False
-        if not self.bloco():
-            return False
-        if not self.espera(TokenType.T_PARAMANDA):
-            return False
-        return True
+            return None
+        return condicao
 
-    # Verifica o comando de repetição "para"
-    def comando_para(self):
+    # Verifica o cabeçalho do comando de repetição "para"
+    def cabecalho_para(self):
         if not self.espera(TokenType.T_MANDALEMBRAR):
-            return False
+            return None
         if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if not self.espera(TokenType.T_ID):
-            return False
+            return None
+        variavel = self.espera_variavel()
+        if variavel is None:
+            return None
         if not self.espera(TokenType.T_SETA):
-            return False
-        if not self.expressao():
-            return False
+            return None
+        inicio = self.expressao()
+        if inicio is None:
+            return None
         if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        if not self.condicao():
-            return False
+            return None
+        condicao = self.condicao()
+        if condicao is None:
+            return None
         if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        if not self.espera(TokenType.T_ID):
-            return False
+            return None
+        alvo_incremento = self.espera_variavel()
+        if alvo_incremento is None:
+            return None
         if not self.espera(TokenType.T_SETA):
-            return False
-        if not self.expressao():
-            return False
+            return None
+        incremento = self.expressao()
+        if incremento is None:
+            return None
         if not self.espera(TokenType.T_FECHA_PAR):
-            return False
-        if not self.bloco():
-            return False
-        if not self.espera(TokenType.T_DESENCANA):
-            return False
-        return True
+            return None
+        return variavel, inicio, condicao, alvo_incremento, incremento
+
+    # Verifica o comando de atribuição
+    def comando_atribuicao(self):
+        linha = self.linha_atual()
+        alvo = self.espera_variavel()
+        if alvo is None:
+            return None
+        if not self.espera(TokenType.T_SETA):
+            return None
+        valor = self.expressao()
+        if valor is None:
+            return None
+        if not self.espera(TokenType.T_PONTO_VIRGULA):
+            return None
+        return Atribuicao(alvo, valor, linha)
 
     # Verifica o comando de leitura
     def comando_ler(self):
+        linha = self.linha_atual()
         if not self.espera(TokenType.T_OLHA):
-            return False
+            return None
         if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if not self.espera(TokenType.T_ID):
-            return False
+            return None
+        variavel = self.espera_variavel()
+        if variavel is None:
+            return None
         if not self.espera(TokenType.T_FECHA_PAR):
-            return False
+            return None
         if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        return True
+            return None
+        return Ler(variavel, linha)
 
     # Verifica o comando de escrita
     def comando_escrever(self):
+        linha = self.linha_atual()
         if not self.espera(TokenType.T_FALA):
-            return False
+            return None
         if not self.espera(TokenType.T_ABRE_PAR):
-            return False
-        if self.token_atual().tipo == TokenType.T_STRING:
+            return None
+        if self.tipo_atual() == TokenType.T_STRING:
+            valor = Texto(self.tokens.lexema(self.posicao))
             self.avancar()
         else:
-            if not self.expressao():
-                return False
+            valor = self.expressao()
+            if valor is None:
+                return None
         if not self.espera(TokenType.T_FECHA_PAR):
-            return False
+            return None
         if not self.espera(TokenType.T_PONTO_VIRGULA):
-            return False
-        return True
+            return None
+        return Escrever(valor, linha)
 
     # Verifica uma condição (expressão relacional)
     def condicao(self):
-        if not self.expressao():
-            return False
-        if self.token_atual().tipo not in {TokenType.T_MAIOR, TokenType.T_MENOR, TokenType.T_MAIOR_IGUAL,
-                                        TokenType.T_MENOR_IGUAL, TokenType.T_IGUAL, TokenType.T_DIFERENTE}:
+        esquerda = self.expressao()
+        if esquerda is None:
+            return None
+        operador = self.tipo_atual()
+        if operador not in OPERADORES_RELACIONAIS:
             self.erros.append(f"Erro sintático na linha {self.token_atual().linha}, coluna {self.token_atual().coluna}: "
-                            f"Esperado operador relacional, encontrado {self.token_atual().tipo.name}")
-            return False
+                            f"Esperado operador relacional, encontrado {self.tipo_atual().name}")
+            return None
         self.avancar()
-        if not self.expressao():
-            return False
-        return True
+        direita = self.expressao()
+        if direita is None:
+            return None
+        return Binaria(operador, esquerda, direita)
 
-    # Verifica uma expressão aritmética
+    # Verifica uma expressão aritmética por precedência de operadores, com
+    # pilhas explícitas de operandos e operadores em vez de recursão. A tabela
+    # OPERADORES_BINARIOS dá a precedência do Python gerado; cada '(' aberto
+    # fica na pilha de operadores como None até o ')' correspondente.
     def expressao(self):
-        if not self.termo():
-            return False
-        while self.token_atual().tipo in {TokenType.T_MAIS, TokenType.T_MENOS, TokenType.T_VEZES,
-                                        TokenType.T_DIVIDIDO, TokenType.T_RESTO, TokenType.T_ELEVADO}:
-            self.avancar()
-            if not self.expressao():
-                return False
-        return True
+        operandos = []
+        operadores = []
+        while True:
+            # Operando: número, identificador ou '(' abrindo uma subexpressão
+            tipo = self.tipo_atual()
+            if tipo == TokenType.T_NUMERO:
+                operandos.append(Numero(self.tokens.lexema(self.posicao)))
+                self.avancar()
+            elif tipo == TokenType.T_ID:
+                operandos.append(self.espera_variavel())
+            elif tipo == TokenType.T_ABRE_PAR:
+                operadores.append(None)
+                self.avancar()
+                continue
+            else:
+                token = self.token_atual()
+                self.erros.append(f"Erro sintático na linha {token.linha}, coluna {token.coluna}: "
+                                f"Esperado número, identificador ou '(', encontrado {token.tipo.name}")
+                return None
 
-    # Verifica um termo em uma expressão
-    def termo(self):
-        token = self.token_atual()
-        if token.tipo == TokenType.T_NUMERO or token.tipo == TokenType.T_ID:
-            self.avancar()
-            return True
-        elif token.tipo == TokenType.T_ABRE_PAR:
-            self.avancar()
-            if not self.expressao():
-                return False
-            if not self.espera(TokenType.T_FECHA_PAR):
-                return False
-            return True
-        else:
-            self.erros.append(f"Erro sintático na linha {token.linha}, coluna {token.coluna}: "
-                            f"Esperado número, identificador ou '(', encontrado {token.tipo.name}")
-            return False
+            # Depois do operando: um operador binário, o ')' de uma
+            # subexpressão ou o fim da expressão
+            while True:
+                tipo = self.tipo_atual()
+                operador = OPERADORES_BINARIOS.get(tipo)
+                if operador is not None:
+                    precedencia, a_direita = operador
+                    while operadores and operadores[-1] is not None:
+                        anterior = OPERADORES_BINARIOS[operadores[-1]][0]
+                        if anterior < precedencia or (anterior == precedencia and a_direita):
+                            break
+                        reduzir(operandos, operadores)
+                    operadores.append(tipo)
+                    self.avancar()
+                    break
+                while operadores and operadores[-1] is not None:
+                    reduzir(operandos, operadores)
+                if not operadores:
+                    return operandos[0]
+                if not self.espera(TokenType.T_FECHA_PAR):
+                    return None
+                operadores.pop()
+                operandos[-1] = Parenteses(operandos[-1])
 
     # Salva o resultado da análise sintática em um arquivo
-    def salvar_resultado(self):
-        output_file = self.arquivo_lex.rsplit('.', 1)[0] + '.syn'
+    def salvar_resultado(self, output_file=None):
+        if output_file is None:
+            output_file = self.arquivo_lex.rsplit('.', 1)[0] + '.syn'
         try:
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write(f"Análise Sintática - Arquivo: {self.arquivo_lex}\n")
@@ -344,7 +544,7 @@ class SintaticoCria:
         if self.erros:  # Verifica erros ao carregar tokens
             self.salvar_resultado()
             return
-        if self.programa():
+        if self.programa() is not None:
             print("Análise sintática terminada sem erros.")
         else:
             print("Erros sintáticos encontrados.")
@@ -353,9 +553,14 @@ class SintaticoCria:
 # Ponto de entrada do programa
 if __name__ == '__main__':
     # Verifica se o argumento do arquivo foi fornecido
-    if len(sys.argv) != 2:
-        print("Uso: python sintatico_cria.py <arquivo.lex>")
+    argumentos = sys.argv[1:]
+    limite_erros = LIMITE_ERROS
+    if len(argumentos) == 3 and argumentos[0] == '--limite-erros' and argumentos[1].isdigit():
+        limite_erros = int(argumentos[1]) or None
+        argumentos = argumentos[2:]
+    if len(argumentos) != 1:
+        print("Uso: python sintatico_cria.py [--limite-erros N] <arquivo.lex>")
         sys.exit(1)
     # Cria instância do analisador sintático e executa a análise
-    sintatico = SintaticoCria(sys.argv[1])
+    sintatico = SintaticoCria(argumentos[0], limite_erros=limite_erros)
     sintatico.analisar()
\ No newline at end of file
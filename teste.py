@@ -12,7 +12,7 @@ def main():
         print("X é maior que Y")
     else:
         print("Y é maior ou igual a X")
-    for i in range(1, 20 + 1):
+    for i in range(1, 21):
         resultado = resultado + i
     while x < 100:
         x = x + 10
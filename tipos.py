@@ -0,0 +1,214 @@
+from arvore import (OPERADORES_RELACIONAIS, Atribuicao, Binaria, Constante, Enquanto, Ler, Numero, Para,
+                    ParaIntervalo, Parenteses, Se, Variavel)
+from tokens import TokenType
+
+# Inferência de tipos do C.R.I.A, feita logo depois da análise semântica,
+# antes do otimizador. O T_NUMERO aceita decimais, então uma variável pode
+# guardar int ou float; o tipo de cada uma é o conjunto dos tipos que ela
+# pode ter na execução, como bits: INTEIRO, REAL ou MISTO (os dois).
+#
+# O "/" do C.R.I.A é a divisão inteira entre dois int e a divisão real
+# quando um dos lados é float (ver dividir). Com os tipos, cada gerador
+# escolhe na compilação: "//" entre int, "/" com float, e só quando um lado
+# é MISTO a escolha fica para a execução (_dividir no código gerado). Uma
+# variável que só recebe float começa em 0.0, e não em 0, e o OLHA a lê com
+# float(input()); as que recebem int e float (as MISTO) começam em 0 como
+# sempre, são lidas com float() e ganham um aviso.
+#
+# O tipo de uma variável é o de todos os valores atribuídos a ela (com "<-"
+# ou no MANDALEMBRAR); o 0 do BAGULHOS e o OLHA seguem o tipo dela e não
+# contam. Os tipos crescem em rodadas a partir de "sem tipo" (0), e uma conta
+# com uma variável ainda sem tipo fica sem tipo até ela ganhar um. As que
+# sobram sem tipo dependem só umas das outras ("s <- s + 0.5"): nelas o 0
+# inicial é neutro, então s é o tipo do resto da conta (REAL aqui), e as que
+# nem assim ganham tipo são INTEIRO; com isso as rodadas continuam.
+
+INTEIRO = 1
+REAL = 2
+MISTO = INTEIRO | REAL
+
+NOMES_TIPOS = {0: 'desconhecido', INTEIRO: 'int', REAL: 'float', MISTO: 'int ou float'}
+
+# Como dividir() no código gerado, para as divisões com um lado MISTO
+CODIGO_DIVIDIR = '''def _dividir(a, b):
+    if type(a) is float or type(b) is float:
+        return a / b
+    return a // b
+'''
+
+# O "/" do C.R.I.A com os valores já calculados
+def dividir(a, b):
+    if type(a) is float or type(b) is float:
+        return a / b
+    return a // b
+
+def tipo_do_valor(valor):
+    return REAL if type(valor) is float else INTEIRO
+
+# Tipo de uma conta aritmética entre dois tipos: int com int dá int e
+# qualquer float dá float; um lado sem tipo, como o 0 neutro, dá o do outro
+def combinar(esquerda, direita):
+    if esquerda == REAL or direita == REAL:
+        return REAL
+    return esquerda | direita
+
+# Tipo de uma expressão, com o tipo de cada variável dado por
+# tipo_da_variavel(nome). Uma conta com um lado sem tipo (0) fica sem tipo,
+# ou, com neutro=True, tem o tipo do outro lado (ver o começo do arquivo).
+def tipo_expressao(expressao, tipo_da_variavel, normalizados, neutro=False):
+    resultados = []
+    pendentes = [(expressao, False)]
+    while pendentes:
+        nodo, pronto = pendentes.pop()
+        classe = nodo.__class__
+        if classe is Parenteses:
+            pendentes.append((nodo.expressao, False))
+            continue
+        if classe is not Binaria:
+            if classe is Variavel:
+                resultados.append(tipo_da_variavel(normalizados[nodo.simbolo]))
+            elif classe is Numero:
+                resultados.append(REAL if '.' in nodo.lexema else INTEIRO)
+            elif classe is Constante:
+                resultados.append(tipo_do_valor(nodo.valor))
+            else:
+                resultados.append(MISTO)
+            continue
+        if not pronto:
+            pendentes += ((nodo, True), (nodo.direita, False), (nodo.esquerda, False))
+            continue
+        direita = resultados.pop()
+        esquerda = resultados.pop()
+        if nodo.operador in OPERADORES_RELACIONAIS:
+            resultados.append(INTEIRO)
+        elif not esquerda or not direita:
+            resultados.append(combinar(esquerda, direita) if neutro else 0)
+        elif nodo.operador is TokenType.T_ELEVADO and esquerda == INTEIRO and direita == INTEIRO:
+            # int ** int só é int com expoente constante não negativo
+            expoente = nodo.direita
+            while expoente.__class__ is Parenteses:
+                expoente = expoente.expressao
+            if expoente.__class__ is Numero:
+                resultados.append(INTEIRO)
+            elif expoente.__class__ is Constante and type(expoente.valor) is int:
+                resultados.append(INTEIRO if expoente.valor >= 0 else REAL)
+            else:
+                resultados.append(MISTO)
+        else:
+            resultados.append(combinar(esquerda, direita))
+    return resultados[0]
+
+# Tipos inferidos de um programa: o de cada variável (pelo nome Python) e
+# os avisos sobre as que misturam int e float. Nomes que não estão na
+# tabela, como os temporários dos otimizadores, são int.
+class Tipos:
+    def __init__(self, identificadores, variaveis=None, avisos=None):
+        self.normalizados = identificadores.normalizados
+        self.variaveis = {} if variaveis is None else variaveis  # Nome Python -> INTEIRO, REAL ou MISTO
+        self.avisos = [] if avisos is None else avisos
+        self.expressoes = {}  # id(nodo) -> tipo, das expressões já consultadas
+
+    # Passa a achar os nomes das variáveis na tabela informada, como a da
+    # árvore otimizada, que também tem as temporárias
+    def usar_identificadores(self, identificadores):
+        if identificadores.normalizados is not self.normalizados:
+            self.normalizados = identificadores.normalizados
+            self.expressoes = {}
+
+    def da_variavel(self, nome):
+        return self.variaveis.get(nome, INTEIRO)
+
+    # Valor com que o BAGULHOS inicia a variável
+    def valor_inicial(self, nome):
+        return 0.0 if self.da_variavel(nome) == REAL else 0
+
+    # Se o OLHA lê a variável com float() em vez de int()
+    def le_real(self, nome):
+        return self.da_variavel(nome) & REAL != 0
+
+    def da_expressao(self, nodo):
+        tipo = self.expressoes.get(id(nodo))
+        if tipo is None:
+            tipo = self.expressoes[id(nodo)] = tipo_expressao(nodo, self.da_variavel, self.normalizados)
+        return tipo
+
+    # Divisão que uma Binaria com "/" faz: INTEIRO ("//"), REAL ("/") ou
+    # MISTO (decidida na execução)
+    def divisao(self, nodo):
+        return combinar(self.da_expressao(nodo.esquerda), self.da_expressao(nodo.direita))
+
+# Atribuições do programa como (nome Python, expressão, linha), na ordem da
+# fonte, e os nomes lidos pelo OLHA
+def atribuicoes_do_programa(programa):
+    normalizados = programa.identificadores.normalizados
+    atribuicoes = []
+    lidas = set()
+    pendentes = [programa.bloco]
+    while pendentes:
+        comandos = pendentes.pop().comandos
+        internos = []
+        for comando in comandos:
+            classe = comando.__class__
+            if classe is Atribuicao:
+                atribuicoes.append((normalizados[comando.alvo.simbolo], comando.valor, comando.linha))
+            elif classe is Ler:
+                lidas.add(normalizados[comando.variavel.simbolo])
+            elif classe is Para:
+                atribuicoes.append((normalizados[comando.variavel.simbolo], comando.inicio, comando.linha))
+                atribuicoes.append((normalizados[comando.alvo_incremento.simbolo], comando.incremento, comando.linha))
+                internos.append(comando.corpo)
+            elif classe is ParaIntervalo:
+                atribuicoes.append((normalizados[comando.variavel.simbolo], Constante(0), comando.linha))
+                internos.append(comando.corpo)
+            elif classe is Se:
+                internos.append(comando.entao)
+                if comando.senao is not None:
+                    internos.append(comando.senao)
+            elif classe is Enquanto:
+                internos.append(comando.corpo)
+        pendentes.extend(reversed(internos))
+    return atribuicoes, lidas
+
+# Tipos de um programa já conferido pelo semântico (ver o começo do arquivo)
+def inferir_tipos(programa):
+    identificadores = programa.identificadores
+    nomes = identificadores.nomes
+    normalizados = identificadores.normalizados
+    atribuicoes, lidas = atribuicoes_do_programa(programa)
+    todas = {nomes[declaracao.simbolo] for declaracao in programa.declaracoes} | lidas
+    todas.update(nome for nome, _, _ in atribuicoes)
+    sementes = {}  # Tipo mínimo das variáveis que ficaram sem tipo numa rodada
+    tipos = {}
+
+    def tipo_da_variavel(nome):
+        return tipos.get(nome, 0)
+
+    while True:
+        # Cada rodada só aumenta os tipos, então isso termina
+        novos = dict(sementes)
+        for nome, expressao, _ in atribuicoes:
+            novos[nome] = novos.get(nome, 0) | tipo_expressao(expressao, tipo_da_variavel, normalizados)
+        if novos != tipos:
+            tipos = novos
+            continue
+        sem_tipo = {nome for nome in todas if not tipos.get(nome)}
+        if not sem_tipo:
+            break
+        for nome, expressao, _ in atribuicoes:
+            if nome in sem_tipo:
+                sementes[nome] = sementes.get(nome, 0) | tipo_expressao(expressao, tipo_da_variavel, normalizados,
+                                                                        neutro=True)
+        for nome in sem_tipo:
+            sementes[nome] = sementes.get(nome) or INTEIRO
+        tipos = {}
+    # Aviso na primeira atribuição que junta int e float na mesma variável
+    avisos = []
+    vistos = {}
+    for nome, expressao, linha in sorted(atribuicoes, key=lambda atribuicao: atribuicao[2]):
+        if tipos[nome] != MISTO or vistos.get(nome) == MISTO:
+            continue
+        vistos[nome] = vistos.get(nome, 0) | tipo_expressao(expressao, tipo_da_variavel, normalizados)
+        if vistos[nome] == MISTO:
+            avisos.append(f"Aviso na linha {linha}: a variável {nome} recebe valores int e float; "
+                          "o \"/\" com ela é decidido na execução")
+    return Tipos(identificadores, tipos, avisos)
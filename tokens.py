@@ -0,0 +1,632 @@
+import sys
+import tempfile
+from array import array
+from enum import Enum, auto
+from itertools import accumulate, chain
+
+# Definição da enumeração para tipos de tokens
+class TokenType(Enum):
+    T_ENOIS         = auto()  # Token para a palavra reservada "ÉNOIS"
+    T_PARTIU        = auto()  # Token para a palavra reservada "PARTIU"
+    T_BAGULHOS      = auto()  # Token para a palavra reservada "BAGULHOS"
+    T_VIRGULA       = auto()  # Token para o símbolo de vírgula
+    T_PONTO_VIRGULA = auto()  # Token para o símbolo de ponto e vírgula
+    T_SEPA          = auto()  # Token para a palavra reservada "SEPA"
+    T_NAOFOI        = auto()  # Token para a palavra reservada "NÃOFOI"
+    T_FIMSEPA       = auto()  # Token para a palavra reservada "FIMSEPA"
+    T_MANDAENQUANTO = auto()  # Token para a palavra reservada "MANDAENQUANTO"
+    T_PARAMANDA     = auto()  # Token para a palavra reservada "PARAMANDA"
+    T_MANDALEMBRAR  = auto()  # Token para a palavra reservada "MANDALEMBRAR"
+    T_SETA          = auto()  # Token para o símbolo de atribuição "<-"
+    T_ATEALILA      = auto()  # Token para a palavra reservada "ATEALILA"
+    T_DESENCANA     = auto()  # Token para a palavra reservada "DESENCANA"
+    T_OLHA          = auto()  # Token para a palavra reservada "OLHA"
+    T_ABRE_PAR      = auto()  # Token para o símbolo de abertura de parênteses
+    T_FECHA_PAR     = auto()  # Token para o símbolo de fechamento de parênteses
+    T_FALA          = auto()  # Token para a palavra reservada "FALA"
+    T_MAIOR         = auto()  # Token para o operador relacional ">"
+    T_MENOR         = auto()  # Token para o operador relacional "<"
+    T_MAIOR_IGUAL   = auto()  # Token para o operador relacional ">="
+    T_MENOR_IGUAL   = auto()  # Token para o operador relacional "<="
+    T_IGUAL         = auto()  # Token para o operador relacional "=="
+    T_DIFERENTE     = auto()  # Token para o operador relacional "<>"
+    T_MAIS          = auto()  # Token para o operador aritmético "+"
+    T_MENOS         = auto()  # Token para o operador aritmético "-"
+    T_VEZES         = auto()  # Token para o operador aritmético "*"
+    T_DIVIDIDO      = auto()  # Token para o operador aritmético "/"
+    T_RESTO         = auto()  # Token para o operador aritmético "%"
+    T_ELEVADO       = auto()  # Token para o operador aritmético "**"
+    T_NUMERO        = auto()  # Token para números (inteiros ou decimais)
+    T_ID            = auto()  # Token para identificadores (nomes de variáveis)
+    T_STRING        = auto()  # Token para strings literais
+    T_FIM_FONTE     = auto()  # Token para o fim do arquivo fonte
+    T_ERRO_LEX      = auto()  # Token para erros léxicos
+    T_NULO          = auto()  # Token para valor nulo
+
+# Classe que representa um token com tipo, lexema, linha e coluna (e o
+# offset do início na fonte, 0 se desconhecido)
+class Token:
+    __slots__ = ('tipo', 'lexema', 'linha', 'coluna', 'offset')
+
+    def __init__(self, tipo: TokenType, lexema, linha, coluna, offset=0):
+        self.tipo = tipo
+        self.lexema = lexema
+        self.linha = linha
+        self.coluna = coluna
+        self.offset = offset
+
+    # Método para formatar a representação em string do token
+    def __str__(self):
+        return f"{self.tipo.name} | {self.lexema} | linha {self.linha} | coluna {self.coluna}"
+
+# Quantidade padrão de erros que cada análise (léxica, sintática) relata
+# antes de desistir; None não tem limite
+LIMITE_ERROS = 100
+
+# Tipo de token correspondente a cada código guardado em BufferTokens.tipos
+TIPOS_POR_CODIGO = [None] * (max(t.value for t in TokenType) + 1)
+for _tipo in TokenType:
+    TIPOS_POR_CODIGO[_tipo.value] = _tipo
+
+# Tabela de identificadores: cada nome distinto recebe um ID inteiro denso
+# (0, 1, 2, ...) no momento em que é internado, junto com a grafia
+# normalizada (minúscula) usada pelo gerador de código.
+class Identificadores:
+    def __init__(self):
+        self.ids = {}  # Nome -> ID
+        self.nomes = []  # ID -> nome como escrito na fonte
+        self.normalizados = []  # ID -> nome em minúsculas
+
+    # Retorna o ID do nome, criando um novo se ainda não existir
+    def internar(self, nome):
+        simbolo = self.ids.get(nome)
+        if simbolo is None:
+            simbolo = len(self.nomes)
+            self.ids[nome] = simbolo
+            self.nomes.append(nome)
+            self.normalizados.append(nome.lower())
+        return simbolo
+
+    # Cópia independente, para quem precisa de IDs novos (as temporárias dos
+    # otimizadores) sem mexer na tabela dos tokens
+    def copiar(self):
+        copia = Identificadores()
+        copia.ids = dict(self.ids)
+        copia.nomes = list(self.nomes)
+        copia.normalizados = list(self.normalizados)
+        return copia
+
+    def __len__(self):
+        return len(self.nomes)
+
+# Sequência de tokens em colunas paralelas (struct-of-arrays): tipo, offset na
+# fonte, linha, coluna e índice do lexema numa tabela de lexemas internados.
+# Cada token ocupa poucos bytes nos arrays em vez de um objeto Python inteiro.
+class BufferTokens:
+    def __init__(self):
+        self.tipos = array('B')  # Código (TokenType.value) de cada token
+        self.offsets = array('I')  # Offset do início do token na fonte (0 se desconhecido)
+        self.linhas = array('I')
+        self.colunas = array('I')
+        self.lexemas = array('I')  # Índice em tabela_lexemas
+        self.tabela_lexemas = []  # Lexemas distintos, cada um guardado uma única vez
+        self.indice_lexemas = {}  # Lexema -> índice em tabela_lexemas
+        self.identificadores = Identificadores()
+        self.simbolo_do_lexema = array('i')  # Índice do lexema -> ID do identificador (-1 se não for)
+        self.fonte = None  # Nome do arquivo fonte, se conhecido
+        self.erros = []  # Mensagens dos erros léxicos, na ordem da fonte
+
+    # Primeiro erro léxico (None se não houve nenhum)
+    @property
+    def erro(self):
+        return self.erros[0] if self.erros else None
+
+    # Retorna o índice do lexema na tabela, internando-o se for novo
+    def internar(self, lexema):
+        indice = self.indice_lexemas.get(lexema)
+        if indice is None:
+            indice = len(self.tabela_lexemas)
+            self.indice_lexemas[lexema] = indice
+            self.tabela_lexemas.append(lexema)
+            self.simbolo_do_lexema.append(-1)
+        return indice
+
+    # Acrescenta um token ao final do buffer; identificadores também são
+    # internados na tabela de identificadores
+    def adicionar(self, tipo, lexema, linha, coluna, offset=0):
+        indice = self.internar(lexema)
+        if tipo == TokenType.T_ID and self.simbolo_do_lexema[indice] < 0:
+            self.simbolo_do_lexema[indice] = self.identificadores.internar(lexema)
+        self.tipos.append(tipo.value)
+        self.offsets.append(offset)
+        self.linhas.append(linha)
+        self.colunas.append(coluna)
+        self.lexemas.append(indice)
+
+    # Monta a tabela de identificadores a partir das colunas já preenchidas
+    # (usado depois de decodificar o formato binário), em ordem de ocorrência
+    def indexar_identificadores(self):
+        self.identificadores = Identificadores()
+        self.simbolo_do_lexema = array('i', [-1]) * len(self.tabela_lexemas)
+        codigo_id = TokenType.T_ID.value
+        for tipo, indice in zip(self.tipos, self.lexemas):
+            if tipo == codigo_id and self.simbolo_do_lexema[indice] < 0:
+                self.simbolo_do_lexema[indice] = self.identificadores.internar(self.tabela_lexemas[indice])
+
+    def __len__(self):
+        return len(self.tipos)
+
+    def __getitem__(self, indice):
+        if indice < 0:
+            indice += len(self.tipos)
+        if not 0 <= indice < len(self.tipos):
+            raise IndexError(indice)
+        return VisaoToken(self, indice)
+
+    def __iter__(self):
+        for indice in range(len(self.tipos)):
+            yield VisaoToken(self, indice)
+
+    # Garante que o último token é T_FIM_FONTE, para que quem percorre o
+    # buffer nunca precise criar um token de fim de fonte
+    def garantir_fim(self, linha=1, coluna=1):
+        if not self.tipos or self.tipos[-1] != TokenType.T_FIM_FONTE.value:
+            self.adicionar(TokenType.T_FIM_FONTE, '<EOF>', linha, coluna)
+
+    # Acesso direto às colunas, sem criar uma visão
+    def tipo(self, indice):
+        return TIPOS_POR_CODIGO[self.tipos[indice]]
+
+    def lexema(self, indice):
+        return self.tabela_lexemas[self.lexemas[indice]]
+
+    # ID do identificador do token (-1 se o token não for um identificador)
+    def simbolo(self, indice):
+        return self.simbolo_do_lexema[self.lexemas[indice]]
+
+# Visão leve de um token dentro de um BufferTokens, com a mesma interface de Token
+class VisaoToken:
+    __slots__ = ('buffer', 'indice')
+
+    def __init__(self, buffer, indice):
+        self.buffer = buffer
+        self.indice = indice
+
+    @property
+    def tipo(self):
+        return TIPOS_POR_CODIGO[self.buffer.tipos[self.indice]]
+
+    @property
+    def lexema(self):
+        return self.buffer.tabela_lexemas[self.buffer.lexemas[self.indice]]
+
+    @property
+    def linha(self):
+        return self.buffer.linhas[self.indice]
+
+    @property
+    def coluna(self):
+        return self.buffer.colunas[self.indice]
+
+    @property
+    def offset(self):
+        return self.buffer.offsets[self.indice]
+
+    @property
+    def simbolo(self):
+        return self.buffer.simbolo(self.indice)
+
+    def __str__(self):
+        return f"{self.tipo.name} | {self.lexema} | linha {self.linha} | coluna {self.coluna}"
+
+# --- FORMATO BINÁRIO DO .lex ---
+# Cabeçalho: MAGICO_LEX, byte de versão, nome da fonte, mensagens de erro
+# léxico (separadas por quebra de linha) e a tabela de tipos (nome de cada
+# código usado no arquivo, para o formato não depender da ordem do
+# TokenType). Depois vêm o pool de lexemas distintos
+# (tamanhos + texto UTF-8 concatenado), a quantidade de tokens, um byte de tipo
+# por token, os índices de lexema com largura fixa (1, 2 ou 4 bytes, little
+# endian) e as posições (linha, coluna e offset) como varints LEB128. Colunas
+# que nunca diminuem (linha e offset) são gravadas como diferenças.
+MAGICO_LEX = b'CRIALEX\0'
+VERSAO_LEX = 1
+
+# Codifica uma sequência de inteiros não negativos como varints
+def codificar_varints(valores):
+    if not valores or max(valores) < 0x80:
+        return array('B', valores).tobytes()
+    saida = bytearray()
+    for valor in valores:
+        while valor >= 0x80:
+            saida.append((valor & 0x7f) | 0x80)
+            valor >>= 7
+        saida.append(valor)
+    return bytes(saida)
+
+# Decodifica varints de uma só vez; sem bytes de continuação, cada byte já é um valor
+def decodificar_varints(dados):
+    dados = bytes(dados)
+    if not dados or max(dados) < 0x80:
+        return array('I', array('B', dados))
+    valores = array('I')
+    valor = 0
+    deslocamento = 0
+    for byte in dados:
+        valor |= (byte & 0x7f) << deslocamento
+        if byte & 0x80:
+            deslocamento += 7
+        else:
+            valores.append(valor)
+            valor = 0
+            deslocamento = 0
+    return valores
+
+# Erros que um arquivo binário truncado ou corrompido provoca na leitura;
+# quem decodifica um arquivo inteiro os troca por um ValueError
+ERROS_DECODIFICACAO = (IndexError, KeyError, UnicodeDecodeError, OverflowError, TypeError)
+
+# Confere que os dados vão até fim (exclusive)
+def conferir_fim(dados, fim):
+    if fim > len(dados):
+        raise ValueError("Fim inesperado dos dados")
+    return fim
+
+# Lê um único varint a partir de pos, retornando o valor e a nova posição
+def ler_varint(dados, pos):
+    valor = 0
+    deslocamento = 0
+    while True:
+        byte = dados[conferir_fim(dados, pos + 1) - 1]
+        pos += 1
+        valor |= (byte & 0x7f) << deslocamento
+        if not byte & 0x80:
+            return valor, pos
+        deslocamento += 7
+
+def escrever_varint(saida, valor):
+    saida += codificar_varints([valor])
+
+def escrever_texto(saida, texto):
+    dados = texto.encode('utf-8')
+    escrever_varint(saida, len(dados))
+    saida += dados
+
+def ler_texto(dados, pos):
+    tamanho, pos = ler_varint(dados, pos)
+    fim = conferir_fim(dados, pos + tamanho)
+    return bytes(dados[pos:fim]).decode('utf-8'), fim
+
+# Seção de inteiros: 1 byte dizendo se está em diferenças, tamanho e varints
+def escrever_secao(saida, valores):
+    diferencas = [b - a for a, b in zip(valores, valores[1:])]
+    delta = all(d >= 0 for d in diferencas)
+    if delta and valores:
+        valores = [valores[0]] + diferencas
+    dados = codificar_varints(valores)
+    saida.append(1 if delta else 0)
+    escrever_varint(saida, len(dados))
+    saida += dados
+
+def ler_secao(dados, pos):
+    delta = dados[conferir_fim(dados, pos + 1) - 1]
+    tamanho, pos = ler_varint(dados, pos + 1)
+    fim = conferir_fim(dados, pos + tamanho)
+    if tamanho and dados[fim - 1] & 0x80:
+        raise ValueError("Varint incompleto no fim da seção")
+    valores = decodificar_varints(dados[pos:fim])
+    if delta:
+        valores = array('I', accumulate(valores))
+    return valores, fim
+
+# Seção de inteiros com largura fixa: código do array ('B', 'H' ou 'I') e os bytes
+def escrever_secao_fixa(saida, valores):
+    maximo = max(valores, default=0)
+    codigo = 'B' if maximo < 1 << 8 else 'H' if maximo < 1 << 16 else 'I'
+    valores = array(codigo, valores)
+    if sys.byteorder == 'big':
+        valores.byteswap()
+    saida += codigo.encode('ascii')
+    escrever_varint(saida, len(valores))
+    saida += valores.tobytes()
+
+def ler_secao_fixa(dados, pos):
+    codigo = chr(dados[conferir_fim(dados, pos + 1) - 1])
+    if codigo not in 'BHI':
+        raise ValueError(f"Largura {codigo!r} desconhecida numa seção")
+    quantidade, pos = ler_varint(dados, pos + 1)
+    valores = array(codigo)
+    fim = conferir_fim(dados, pos + quantidade * valores.itemsize)
+    valores.frombytes(dados[pos:fim])
+    if sys.byteorder == 'big':
+        valores.byteswap()
+    return array('I', valores) if codigo != 'I' else valores, fim
+
+# Serializa um BufferTokens no formato binário
+def codificar_lex_binario(tokens):
+    saida = bytearray(MAGICO_LEX)
+    saida.append(VERSAO_LEX)
+    escrever_texto(saida, tokens.fonte or '')
+    escrever_texto(saida, '\n'.join(tokens.erros))
+    # Tabela de tipos: só os códigos que aparecem, numerados na ordem de uso
+    usados = sorted(set(tokens.tipos))
+    escrever_varint(saida, len(usados))
+    for codigo in usados:
+        escrever_texto(saida, TIPOS_POR_CODIGO[codigo].name)
+    mapa = bytearray(256)
+    for indice, codigo in enumerate(usados):
+        mapa[codigo] = indice
+    # Pool de lexemas
+    escrever_varint(saida, len(tokens.tabela_lexemas))
+    escrever_secao(saida, array('I', map(len, tokens.tabela_lexemas)))
+    escrever_texto(saida, ''.join(tokens.tabela_lexemas))
+    # Colunas dos tokens
+    escrever_varint(saida, len(tokens))
+    saida += tokens.tipos.tobytes().translate(mapa)
+    escrever_secao(saida, tokens.linhas)
+    escrever_secao(saida, tokens.colunas)
+    escrever_secao_fixa(saida, tokens.lexemas)
+    escrever_secao(saida, tokens.offsets)
+    return bytes(saida)
+
+TAMANHO_PEDACO_LEX = 1 << 16  # Tokens juntados na memória antes de ir para os temporários
+
+def copiar_temporario(arquivo, saida):
+    arquivo.seek(0)
+    while True:
+        pedaco = arquivo.read(1 << 20)
+        if not pedaco:
+            return
+        saida.write(pedaco)
+
+# Coluna de inteiros de um EscritorLexBinario, guardada num arquivo
+# temporário em varints à medida que os tokens chegam. Enquanto os valores não
+# diminuem também é guardada a versão em diferenças, que escrever_secao
+# escolheria; os valores ficam num array só até juntar TAMANHO_PEDACO_LEX.
+class ColunaTemporaria:
+    def __init__(self):
+        self.valores = array('I')
+        self.arquivo = tempfile.TemporaryFile()
+        self.diferencas = tempfile.TemporaryFile()
+        self.anterior = None  # Último valor já descarregado (None: nenhum)
+
+    def descarregar(self):
+        valores = self.valores
+        if not valores:
+            return
+        self.arquivo.write(codificar_varints(valores))
+        if self.diferencas is not None:
+            anterior = valores[0] if self.anterior is None else self.anterior
+            diferencas = [b - a for a, b in zip(chain((anterior,), valores), valores)]
+            if all(d >= 0 for d in diferencas):
+                if self.anterior is None:
+                    diferencas[0] = valores[0]  # O primeiro valor vai inteiro
+                self.diferencas.write(codificar_varints(diferencas))
+            else:
+                self.diferencas.close()
+                self.diferencas = None
+        self.anterior = valores[-1]
+        self.valores = array('I')
+
+    # Escreve a coluna no formato de escrever_secao
+    def escrever(self, saida):
+        self.descarregar()
+        arquivo = self.arquivo if self.diferencas is None else self.diferencas
+        saida.write(bytes([self.diferencas is not None]))
+        saida.write(codificar_varints([arquivo.tell()]))
+        copiar_temporario(arquivo, saida)
+
+    def fechar(self):
+        self.arquivo.close()
+        if self.diferencas is not None:
+            self.diferencas.close()
+
+# Escreve um .lex binário à medida que os tokens chegam, sem guardar um
+# BufferTokens: cada coluna vai para um arquivo temporário e só os lexemas
+# distintos ficam na memória. No fim o arquivo é montado na ordem do formato
+# (o cabeçalho depende dos erros e dos tipos de todos os tokens), com os
+# mesmos bytes que codificar_lex_binario daria para os mesmos tokens.
+class EscritorLexBinario:
+    def __init__(self):
+        self.indice_lexemas = {}
+        self.tamanhos = array('I')  # Tamanho de cada lexema distinto
+        self.lexemas_distintos = []
+        self.quantidade = 0
+        self.usados = set()  # Códigos de tipo que aparecem
+        self.maior_lexema = 0
+        self.tipos = array('B')
+        self.arquivo_tipos = tempfile.TemporaryFile()
+        self.lexemas = array('I')
+        self.arquivo_lexemas = tempfile.TemporaryFile()
+        self.colunas = [ColunaTemporaria() for _ in range(3)]  # Linhas, colunas e offsets
+
+    def adicionar(self, tipo, lexema, linha, coluna, offset=0):
+        indice = self.indice_lexemas.get(lexema)
+        if indice is None:
+            indice = self.indice_lexemas[lexema] = len(self.lexemas_distintos)
+            self.lexemas_distintos.append(lexema)
+            self.tamanhos.append(len(lexema))
+            self.maior_lexema = indice
+        self.usados.add(tipo.value)
+        self.tipos.append(tipo.value)
+        self.lexemas.append(indice)
+        linhas, colunas, offsets = self.colunas
+        linhas.valores.append(linha)
+        colunas.valores.append(coluna)
+        offsets.valores.append(offset)
+        self.quantidade += 1
+        if len(self.tipos) >= TAMANHO_PEDACO_LEX:
+            self.descarregar()
+
+    def descarregar(self):
+        self.arquivo_tipos.write(self.tipos.tobytes())
+        self.tipos = array('B')
+        self.arquivo_lexemas.write(self.lexemas.tobytes())
+        self.lexemas = array('I')
+        for coluna in self.colunas:
+            coluna.descarregar()
+
+    # Monta o .lex no arquivo binário saida
+    def escrever(self, saida, fonte, erros):
+        self.descarregar()
+        cabecalho = bytearray(MAGICO_LEX)
+        cabecalho.append(VERSAO_LEX)
+        escrever_texto(cabecalho, fonte or '')
+        escrever_texto(cabecalho, '\n'.join(erros))
+        usados = sorted(self.usados)
+        escrever_varint(cabecalho, len(usados))
+        for codigo in usados:
+            escrever_texto(cabecalho, TIPOS_POR_CODIGO[codigo].name)
+        mapa = bytearray(256)
+        for indice, codigo in enumerate(usados):
+            mapa[codigo] = indice
+        escrever_varint(cabecalho, len(self.lexemas_distintos))
+        escrever_secao(cabecalho, self.tamanhos)
+        escrever_texto(cabecalho, ''.join(self.lexemas_distintos))
+        escrever_varint(cabecalho, self.quantidade)
+        saida.write(cabecalho)
+        self.arquivo_tipos.seek(0)
+        while True:
+            pedaco = self.arquivo_tipos.read(1 << 20)
+            if not pedaco:
+                break
+            saida.write(pedaco.translate(mapa))
+        linhas, colunas, offsets = self.colunas
+        linhas.escrever(saida)
+        colunas.escrever(saida)
+        # Índices de lexema com a largura de escrever_secao_fixa
+        codigo = 'B' if self.maior_lexema < 1 << 8 else 'H' if self.maior_lexema < 1 << 16 else 'I'
+        saida.write(codigo.encode('ascii') + codificar_varints([self.quantidade]))
+        self.arquivo_lexemas.seek(0)
+        largura = array('I').itemsize
+        while True:
+            pedaco = self.arquivo_lexemas.read(largura << 18)
+            if not pedaco:
+                break
+            valores = array('I')
+            valores.frombytes(pedaco)
+            valores = array(codigo, valores)
+            if sys.byteorder == 'big':
+                valores.byteswap()
+            saida.write(valores.tobytes())
+        offsets.escrever(saida)
+
+    def fechar(self):
+        self.arquivo_tipos.close()
+        self.arquivo_lexemas.close()
+        for coluna in self.colunas:
+            coluna.fechar()
+
+# Reconstrói um BufferTokens a partir do formato binário. Um arquivo
+# truncado ou corrompido dá ValueError, como um de outra versão.
+def decodificar_lex_binario(dados):
+    dados = memoryview(dados)
+    if bytes(dados[:len(MAGICO_LEX)]) != MAGICO_LEX:
+        raise ValueError("Não é um arquivo .lex binário do C.R.I.A")
+    if len(dados) <= len(MAGICO_LEX):
+        raise ValueError("Arquivo .lex truncado ou corrompido: falta a versão")
+    versao = dados[len(MAGICO_LEX)]
+    if versao != VERSAO_LEX:
+        raise ValueError(f"Versão {versao} do formato .lex não suportada (esperada {VERSAO_LEX})")
+    try:
+        return ler_lex_binario(dados)
+    except ERROS_DECODIFICACAO as e:
+        raise ValueError(f"Arquivo .lex truncado ou corrompido ({e.__class__.__name__})") from e
+    except ValueError as e:
+        raise ValueError(f"Arquivo .lex truncado ou corrompido: {e}") from e
+
+# Lê as seções de um .lex binário depois do cabeçalho
+def ler_lex_binario(dados):
+    tokens = BufferTokens()
+    pos = len(MAGICO_LEX) + 1
+    tokens.fonte, pos = ler_texto(dados, pos)
+    erros, pos = ler_texto(dados, pos)
+    tokens.erros = erros.split('\n') if erros else []
+    # Tabela de tipos do arquivo -> códigos do TokenType atual
+    quantidade, pos = ler_varint(dados, pos)
+    mapa = bytearray(256)
+    for indice in range(quantidade):
+        nome, pos = ler_texto(dados, pos)
+        if nome not in TokenType.__members__:
+            raise ValueError(f"Tipo de token {nome!r} desconhecido")
+        mapa[indice] = TokenType[nome].value
+    tipos_validos = quantidade
+    # Pool de lexemas
+    quantidade, pos = ler_varint(dados, pos)
+    tamanhos, pos = ler_secao(dados, pos)
+    texto, pos = ler_texto(dados, pos)
+    fins = list(accumulate(tamanhos))
+    if len(tamanhos) != quantidade or (fins[-1] if fins else 0) != len(texto):
+        raise ValueError("Pool de lexemas inconsistente")
+    tokens.tabela_lexemas = [texto[a:b] for a, b in zip([0] + fins, fins)]
+    tokens.indice_lexemas = dict(zip(tokens.tabela_lexemas, range(quantidade)))
+    # Colunas dos tokens
+    quantidade, pos = ler_varint(dados, pos)
+    tipos = bytes(dados[pos:conferir_fim(dados, pos + quantidade)])
+    if tipos and max(tipos) >= tipos_validos:
+        raise ValueError("Token com tipo fora da tabela de tipos")
+    tokens.tipos = array('B', tipos.translate(mapa))
+    pos += quantidade
+    tokens.linhas, pos = ler_secao(dados, pos)
+    tokens.colunas, pos = ler_secao(dados, pos)
+    tokens.lexemas, pos = ler_secao_fixa(dados, pos)
+    tokens.offsets, pos = ler_secao(dados, pos)
+    colunas = (tokens.linhas, tokens.colunas, tokens.lexemas, tokens.offsets)
+    if any(len(coluna) != quantidade for coluna in colunas):
+        raise ValueError("Colunas dos tokens com tamanhos diferentes")
+    if tokens.lexemas and max(tokens.lexemas) >= len(tokens.tabela_lexemas):
+        raise ValueError("Token com lexema fora do pool")
+    tokens.indexar_identificadores()
+    return tokens
+
+# Escreve os tokens no formato texto do .lex (dump legível para depuração)
+def escrever_lex_texto(tokens, f):
+    f.write("Análise Léxica - Arquivo: {}\n".format(tokens.fonte))
+    f.write("----------------------------------------\n")
+    for token in tokens:
+        f.write(str(token) + '\n')
+    f.write("----------------------------------------\n")
+    for erro in tokens.erros:
+        f.write("Erro encontrado: {}\n".format(erro))
+    if not tokens.erros:
+        f.write("Análise léxica terminada sem erros.\n")
+
+# Carrega os tokens de um arquivo .lex gerado pela análise léxica. O formato
+# (binário ou texto) é identificado pelo cabeçalho do arquivo.
+def carregar_lex(caminho):
+    with open(caminho, 'rb') as f:
+        if f.read(len(MAGICO_LEX)) == MAGICO_LEX:
+            return decodificar_lex_binario(MAGICO_LEX + f.read())
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return carregar_lex_texto(f)
+
+# Interpreta as linhas do formato texto do .lex. O tipo é separado pelo
+# primeiro " | " e linha/coluna pelos dois últimos, então lexemas que contêm
+# " | " (strings) não são perdidos.
+def carregar_lex_texto(linhas):
+    tokens = BufferTokens()
+    for linha in linhas:
+        linha = linha.strip()
+        if linha.startswith('Análise Léxica - Arquivo: '):
+            tokens.fonte = linha[len('Análise Léxica - Arquivo: '):]
+        elif linha.startswith('Erro encontrado: '):
+            tokens.erros.append(linha[len('Erro encontrado: '):])
+        elif linha and not linha.startswith(('Análise Léxica', '---', 'Erro')):
+            try:
+                tipo_str, resto = linha.split(' | ', 1)
+                lexema, linha_str, coluna_str = resto.rsplit(' | ', 2)
+                tipo = TokenType[tipo_str]
+                if tipo == TokenType.T_ERRO_LEX:
+                    continue  # Erros léxicos não chegam ao sintático
+                linha_num = int(linha_str.split()[-1])
+                coluna_num = int(coluna_str.split()[-1])
+                tokens.adicionar(tipo, lexema, linha_num, coluna_num)
+            except (ValueError, KeyError):
+                continue
+    return tokens
+
+# Mostra um .lex (binário ou texto) no formato texto
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Uso: python tokens.py <arquivo.lex>")
+        sys.exit(1)
+    escrever_lex_texto(carregar_lex(sys.argv[1]), sys.stdout)
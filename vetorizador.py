@@ -0,0 +1,281 @@
+from arvore import (Atribuicao, Binaria, Bloco, Enquanto, ParaIntervalo, ParaVetorizado, Programa, Se, Variavel,
+                    Visitante)
+from lacos import nomes_se_inteira, sem_parenteses, variaveis_inteiras
+from otimizador import atribuicoes_por_bloco, valor_constante
+from otimizador_lacos import parcelas, plural
+from tokens import TokenType
+
+# Vetorização com NumPy, pedida com --numpy e feita por último, depois dos
+# otimizadores: um for com range() cujo corpo só faz reduções sobre a
+# variável do laço, como
+#   MANDALEMBRAR (i <- 0; i < n; i <- i + 1)
+#       soma <- soma + i * i % 7;
+#   DESENCANA
+# vira blocos de até TAMANHO_BLOCO_VETOR voltas, cada um com
+# i = np.arange(...) e soma = soma + int((i * i % 7).sum()). Só entram
+# laços cujo corpo é uma lista de "acc <- acc + e", "acc <- acc - e" ou
+# "acc <- acc * e" (a última vira .prod()), um por acumulador, com e usando a
+# variável do laço e nenhum acumulador (nada mais passa de uma volta para a
+# outra). Nada de OLHA, FALA, SEPA ou laço no corpo.
+#
+# O NumPy calcula em int64, que estoura calado, e o Python gerado não. Então
+# e só pode ter +, -, * e // ou % por uma constante diferente de 0 (que
+# nunca falham, como no otimizador_lacos) e ** por uma constante inteira não
+# negativa, com variáveis int que certamente têm valor, e os acumuladores
+# também têm que ser int. Por análise de intervalos é calculado o maior M
+# tal que, com a variável do laço e as outras variáveis de e entre -M e M,
+# nenhuma conta, nem a soma (ou o produto) das voltas de um bloco, passa do
+# int64; o laço vetorizado só roda se o início, o fim e essas variáveis
+# estiverem nessa faixa (conferido na compilação quando todos são
+# constantes, ou por um "if" antes do laço), e senão roda o for original.
+
+TAMANHO_BLOCO_VETOR = 1 << 16  # Voltas por bloco (um array de 512 KB)
+LIMITE_MINIMO_VETOR = 1024  # Com M menor que isso o laço não é vetorizado
+VOLTAS_MINIMAS_VETOR = 256  # Nem um laço com menos voltas conhecidas na compilação
+MAIOR_INT64 = (1 << 63) - 1
+
+# Operação de cada redução aceita e o método do NumPy que junta as voltas
+REDUCOES = {TokenType.T_MAIS: 'sum', TokenType.T_MENOS: 'sum', TokenType.T_VEZES: 'prod'}
+
+# Nomes que o código vetorizado usa além das variáveis: se o programa tiver
+# uma variável com um desses nomes, nada é vetorizado
+USOS_VETOR = frozenset({'int', 'min', 'max', 'range'})
+
+# Intervalo (mínimo, máximo) dos valores da expressão, com cada variável
+# entre -m e m, ou None se algum valor intermediário pode passar do int64
+# ou se a expressão tem algo que não pode ser vetorizado
+def intervalo(expressao, m):
+    resultados = []
+    pendentes = [(expressao, False)]
+    while pendentes:
+        nodo, pronto = pendentes.pop()
+        nodo = sem_parenteses(nodo)
+        if nodo.__class__ is not Binaria:
+            valor = valor_constante(nodo)
+            if nodo.__class__ is Variavel:
+                resultados.append((-m, m))
+            elif type(valor) is int:
+                resultados.append((valor, valor))
+            else:
+                return None
+            continue
+        if not pronto:
+            pendentes += ((nodo, True), (nodo.direita, False), (nodo.esquerda, False))
+            continue
+        (c, d) = resultados.pop()
+        (a, b) = resultados.pop()
+        operador = nodo.operador
+        if operador is TokenType.T_MAIS:
+            novo = (a + c, b + d)
+        elif operador is TokenType.T_MENOS:
+            novo = (a - d, b - c)
+        elif operador is TokenType.T_VEZES:
+            produtos = (a * c, a * d, b * c, b * d)
+            novo = (min(produtos), max(produtos))
+        elif operador in (TokenType.T_DIVIDIDO, TokenType.T_RESTO):
+            divisor = valor_constante(sem_parenteses(nodo.direita))
+            if type(divisor) is not int or divisor == 0:
+                return None
+            if operador is TokenType.T_RESTO:
+                novo = (0, divisor - 1) if divisor > 0 else (divisor + 1, 0)
+            else:
+                novo = tuple(sorted((a // divisor, b // divisor)))
+        elif operador is TokenType.T_ELEVADO:
+            expoente = valor_constante(sem_parenteses(nodo.direita))
+            if type(expoente) is not int or expoente < 0:
+                return None
+            maior = max(abs(a), abs(b))
+            if maior.bit_length() * expoente > 64:
+                return None
+            novo = (1, 1) if expoente == 0 else (-maior ** expoente, maior ** expoente)
+        else:
+            return None
+        if max(abs(novo[0]), abs(novo[1])) > MAIOR_INT64:
+            return None
+        resultados.append(novo)
+    return resultados[0]
+
+# Se as reduções de um laço com variáveis entre -m e m cabem no int64: cada
+# volta, e a soma e o produto das voltas de um bloco (no máximo 2m + 1 e
+# TAMANHO_BLOCO_VETOR), que é juntado ao acumulador já como int do Python
+def cabe_em_int64(reducoes, m):
+    voltas = min(2 * m + 1, TAMANHO_BLOCO_VETOR)
+    for _, operador, expressao in reducoes:
+        faixa = intervalo(expressao, m)
+        if faixa is None:
+            return False
+        maior = max(abs(faixa[0]), abs(faixa[1]))
+        if REDUCOES[operador] == 'sum':
+            if maior * voltas > MAIOR_INT64:
+                return False
+        elif maior > 1 and (maior.bit_length() - 1) * voltas >= 63:
+            return False
+        elif maior > 1 and maior ** voltas > MAIOR_INT64:
+            return False
+    return True
+
+# Maior M (até 2 ** 62) com que as reduções cabem no int64, por busca binária
+# (o intervalo só cresce com M), ou None se nem com M = 0 elas cabem
+def maior_faixa(reducoes):
+    if not cabe_em_int64(reducoes, 0):
+        return None
+    baixo, alto = 0, 1 << 62
+    while baixo < alto:
+        meio = (baixo + alto + 1) // 2
+        if cabe_em_int64(reducoes, meio):
+            baixo = meio
+        else:
+            alto = meio - 1
+    return baixo
+
+class Vetorizador(Visitante):
+    def __init__(self, identificadores, relatorio):
+        self.identificadores = identificadores
+        self.normalizados = identificadores.normalizados
+        self.relatorio = relatorio
+        self.inteiras = set()  # Nomes que só recebem int (ver lacos.variaveis_inteiras)
+
+    def anotar(self, linha, mensagem):
+        self.relatorio.append(f"Linha {linha}: {mensagem}")
+
+    def visitar_programa(self, nodo):
+        nomes = nodo.identificadores.nomes
+        atribuidos = atribuicoes_por_bloco(nodo.bloco, self.normalizados)[id(nodo.bloco)]
+        atribuidos |= {nomes[declaracao.simbolo] for declaracao in nodo.declaracoes}
+        if atribuidos & USOS_VETOR:
+            return nodo
+        self.inteiras = variaveis_inteiras(nodo)
+        bloco = yield nodo.bloco
+        return Programa(nodo.declaracoes, bloco, nodo.identificadores)
+
+    def visitar_bloco(self, nodo):
+        comandos = []
+        for comando in nodo.comandos:
+            comandos.append((yield comando))
+        return Bloco(comandos)
+
+    def visitar_atribuicao(self, nodo):
+        return nodo
+
+    def visitar_ler(self, nodo):
+        return nodo
+
+    def visitar_escrever(self, nodo):
+        return nodo
+
+    def visitar_se(self, nodo):
+        entao = yield nodo.entao
+        senao = None if nodo.senao is None else (yield nodo.senao)
+        return Se(nodo.condicao, entao, senao, nodo.linha)
+
+    def visitar_enquanto(self, nodo):
+        return Enquanto(nodo.condicao, (yield nodo.corpo), nodo.linha)
+
+    # Um laço que não pode ser vetorizado ainda pode ter no corpo laços que podem
+    def visitar_para_intervalo(self, nodo):
+        vetorizado = self.vetorizado(nodo)
+        if vetorizado is not None:
+            return vetorizado
+        corpo = yield nodo.corpo
+        return ParaIntervalo(nodo.variavel, nodo.inicio, nodo.fim, nodo.passo, corpo, nodo.linha)
+
+    def e_variavel(self, nodo, nome):
+        return nodo.__class__ is Variavel and self.normalizados[nodo.simbolo] == nome
+
+    # (operador, expressao) da redução "acumulador <- valor": numa soma o
+    # acumulador é uma das parcelas positivas e as outras formam a expressão
+    # ("s <- s + a - b" soma a - b, "s <- s - a - b" subtrai a + b); num
+    # produto ele é um dos fatores. None se o valor não é uma redução.
+    def reducao(self, valor, acumulador):
+        valor = sem_parenteses(valor)
+        if valor.__class__ is Binaria and valor.operador is TokenType.T_VEZES:
+            if self.e_variavel(sem_parenteses(valor.esquerda), acumulador):
+                return TokenType.T_VEZES, sem_parenteses(valor.direita)
+            if self.e_variavel(sem_parenteses(valor.direita), acumulador):
+                return TokenType.T_VEZES, sem_parenteses(valor.esquerda)
+            return None
+        lista = parcelas(valor)
+        for indice, (positiva, nodo) in enumerate(lista):
+            if positiva and self.e_variavel(nodo, acumulador):
+                break
+        else:
+            return None
+        resto = lista[:indice] + lista[indice + 1:]
+        if not resto:
+            return None
+        positivas = [nodo for positiva, nodo in resto if positiva]
+        negativas = [nodo for positiva, nodo in resto if not positiva]
+        operador = TokenType.T_MAIS
+        if not positivas:
+            operador, positivas, negativas = TokenType.T_MENOS, negativas, []
+        expressao = positivas[0]
+        for nodo in positivas[1:]:
+            expressao = Binaria(TokenType.T_MAIS, expressao, nodo)
+        for nodo in negativas:
+            expressao = Binaria(TokenType.T_MENOS, expressao, nodo)
+        return operador, expressao
+
+    # Reduções do corpo do laço, (alvo, operador, expressao), ou None se o
+    # corpo tem outra coisa
+    def reducoes(self, corpo, variavel):
+        reducoes = []
+        acumuladores = set()
+        for comando in corpo.comandos:
+            if comando.__class__ is not Atribuicao:
+                return None
+            acumulador = self.normalizados[comando.alvo.simbolo]
+            if acumulador == variavel or acumulador in acumuladores or acumulador not in self.inteiras:
+                return None
+            reducao = self.reducao(comando.valor, acumulador)
+            if reducao is None:
+                return None
+            acumuladores.add(acumulador)
+            reducoes.append((comando.alvo,) + reducao)
+        return reducoes or None
+
+    # ParaVetorizado equivalente ao laço, ou None se ele não pode ser vetorizado
+    def vetorizado(self, nodo):
+        variavel = self.normalizados[nodo.variavel.simbolo]
+        reducoes = self.reducoes(nodo.corpo, variavel)
+        if reducoes is None:
+            return None
+        acumuladores = {self.normalizados[alvo.simbolo] for alvo, _, _ in reducoes}
+        guardadas = set()
+        for _, _, expressao in reducoes:
+            nomes = nomes_se_inteira(expressao, self.normalizados)
+            if nomes is None or variavel not in nomes or nomes & acumuladores:
+                return None
+            guardadas |= nomes - {variavel}
+        if not guardadas <= self.inteiras or not all(nome in self.identificadores.ids for nome in guardadas):
+            return None
+        limite = maior_faixa(reducoes)
+        if limite is None or limite < LIMITE_MINIMO_VETOR:
+            return None
+        # Expressões conferidas antes do laço: o início e o fim que não são
+        # constantes e as outras variáveis das reduções
+        conferidas = [Variavel(self.identificadores.ids[nome], nodo.linha, 0) for nome in sorted(guardadas)]
+        constantes = []
+        for expressao in (nodo.fim, nodo.inicio):
+            valor = valor_constante(sem_parenteses(expressao))
+            if type(valor) is int:
+                constantes.append(valor)
+            else:
+                conferidas.insert(0, expressao)
+        if any(abs(valor) > limite for valor in constantes):
+            return None
+        mensagem = f"MANDALEMBRAR vetorizado com NumPy ({plural(len(reducoes), 'redução', 'reduções')})"
+        if not conferidas:
+            inicio, fim = constantes[1], constantes[0]
+            if max(0, -((inicio - fim) // nodo.passo)) < VOLTAS_MINIMAS_VETOR:
+                return None
+            limite = None
+        else:
+            mensagem += f", com o laço original para valores além de {limite}"
+        self.anotar(nodo.linha, mensagem)
+        return ParaVetorizado(nodo.variavel, nodo.inicio, nodo.fim, nodo.passo, reducoes, limite, conferidas, nodo,
+                              nodo.linha)
+
+# Árvore com os laços de reduções vetorizados (ver o começo do arquivo); o
+# que foi vetorizado é anotado na lista relatorio
+def vetorizar(arvore, relatorio=None):
+    return Vetorizador(arvore.identificadores, [] if relatorio is None else relatorio).visitar(arvore)